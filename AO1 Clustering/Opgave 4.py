@@ -1,6 +1,6 @@
 import pyomo.environ as pyomo       # Used for modelling the IP
-import matplotlib.pyplot as plt     # Used to plot the instance
-import numpy as np                  # Used for calculating distances
+import numpy as np                  # Used for storing the distance matrix
+import distanceMatrix as dm         # Used for calculating distances
 import readAndWriteJson as rwJson   # Used to read data from Json file
 
 
@@ -8,22 +8,15 @@ import readAndWriteJson as rwJson   # Used to read data from Json file
 #MinMax Lokationsbaseret Clustering
 #Her ønsker vi at minimere den maksimale afstand fra et dataobjekt til en (dens) repræsentant
 
-def makeLpNormDistanceMatrix(data: dict, p: int) -> list:
-    points = np.column_stack((data['Murder'], data['Assault'],data["UrbanPop"],data["Rape"]))
-    nrPoints = len(data['State'])
-    dist = []
-    for i in range(0, nrPoints):
-        dist.append([])
-        for j in range(0, nrPoints):
-            dist[i].append(np.linalg.norm(points[i] - points[j], p))
-    return dist
+def makeLpNormDistanceMatrix(data: dict, p: int) -> np.ndarray:
+    return dm.distanceMatrixFromData(data, ['Murder', 'Assault', 'UrbanPop', 'Rape'], p)
 
 
 def readData(clusterData: str) -> dict():
     data = rwJson.readJsonFileToDictionary(clusterData)
     data['nrPoints'] = len(data['State'])
     # data['dist'] = makeEuclideanDistanceMatrix(data)
-     data['dist'] = makeLpNormDistanceMatrix(data,2)
+    data['dist'] = makeLpNormDistanceMatrix(data,2)
     return data
 
 
@@ -92,6 +85,7 @@ def displaySolution(model: pyomo.ConcreteModel()):
                     labels[j] = i
             print('\n')
     # Plot with different colors
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
     plt.scatter(model.xCoordinates, model.yCoordinates, c=labels)
     for i, label in enumerate(ptNumber):
         plt.annotate(ptNumber[i], (model.xCoordinates[i], model.yCoordinates[i]))
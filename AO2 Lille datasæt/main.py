@@ -1,6 +1,4 @@
 import pyomo.environ as pyomo       # Used for modelling the IP
-import matplotlib.pyplot as plt     # Used to plot the instance
-import numpy as np                  # Used for calculating distances
 import readAndWriteJson as rwJson   # Used to read data from Json file
 
 
@@ -1,8 +1,4 @@
-import importlib
-
 import pyomo.environ as pyomo       # Used for modelling the IP
-import matplotlib.pyplot as plt     # Used to plot the instance
-import numpy as np                  # Used for calculating distances
 import readAndWriteJson as rwJson   # Used to read data from Json file
 
 #-----------------------------------------------#
@@ -13,7 +9,8 @@ import readAndWriteJson as rwJson   # Used to read data from Json file
 
 
 def readData(filename: str) -> dict:
-    data=rwJson.readJsonFileToDictionary(filename)
+    # Only the keys used by the model are decoded from the data file
+    data = rwJson.readJsonFileLazily(filename)
     return data
 
 
@@ -1,12 +1,9 @@
-import importlib
-
 import pyomo.environ as pyomo       # Used for modelling the IP
-import matplotlib.pyplot as plt     # Used to plot the instance
-import numpy as np                  # Used for calculating distances
 import readAndWriteJson as rwJson   # Used to read data from Json file
 ##opgave2 er det her
 def readData(filename: str) -> dict:
-    data=rwJson.readJsonFileToDictionary(filename)
+    # Only the keys used by the model are decoded from the data file
+    data = rwJson.readJsonFileLazily(filename)
     return data
 
 
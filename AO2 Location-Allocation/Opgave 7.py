@@ -1,10 +1,5 @@
-import importlib
-
 import pyomo.environ as pyomo       # Used for modelling the IP
-import matplotlib.pyplot as plt     # Used to plot the instance
-import numpy as np                  # Used for calculating distances
 import readAndWriteJson as rwJson   # Used to read data from Json file
-from termcolor import colored
 
 
 #-----------------------------------------------#
@@ -26,7 +21,8 @@ from termcolor import colored
 
 
 def readData(filename: str) -> dict:
-    data=rwJson.readJsonFileToDictionary(filename)
+    # Only the keys used by the model are decoded from the data file
+    data = rwJson.readJsonFileLazily(filename)
     return data
 
 
@@ -92,6 +88,7 @@ def displaySolution(model: pyomo.ConcreteModel()):
         if pyomo.value(model.y[i]) == 1:
             print(model.kommune_labels[i], end=',')
     print('\nCustomers are covered as follows:')
+    from termcolor import colored  # Only needed when the solution is printed
     for j in model.kommune:
         if pyomo.value(model.z[j]) == 1:
             print(colored(model.kommune_labels[j], 'green'),end='->\t')
@@ -1,7 +1,5 @@
 import pyomo.environ as pyomo
 import readAndWriteJson as rwJson
-import matplotlib.pyplot as plt
-import numpy as np
 
 
 #-------------Materials requirement planning------------#
@@ -101,6 +99,8 @@ def displaySolution(model: pyomo.ConcreteModel()):
     # Number of periods - used to control placement on the x-axis
     numPeriods = len(model.period_labels)
     # Position of bars on x-axis
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
+    import numpy as np  # Only needed for the plot
     pos = np.arange(numPeriods)
 
     print("")
@@ -1,11 +1,10 @@
 import pyomo.environ as pyomo       # Used for modelling the IP
-import matplotlib.pyplot as plt     # Used to plot the instance
-import numpy as np                  # Used for calculating distances
 import readAndWriteJson as rwJson   # Used to read data from Json file
 
 
 def readData(clusterData: str) -> dict():
-    data = rwJson.readJsonFileToDictionary(clusterData)
+    # Only the keys used by the model are decoded from the data file
+    data = rwJson.readJsonFileLazily(clusterData)
     return data
 
 
@@ -78,6 +77,7 @@ def displaySolution(model: pyomo.ConcreteModel()):
                     labels[j] = i
             print('\n')
     # Plot with different colors
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
     plt.scatter(model.xCoordinates, model.yCoordinates, c=labels)
     for i, label in enumerate(ptNumber):
         plt.annotate(ptNumber[i], (model.xCoordinates[i], model.yCoordinates[i]))
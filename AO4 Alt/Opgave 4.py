@@ -16,11 +16,11 @@
 
 import pyomo.environ as pyomo       # Used to model the IP
 import readAndWriteJson as rwJson   # Used for reading the data file in Json format
-import matplotlib.pyplot as plt     # Used for plotting the result
 
 
 def readData(filename: str) -> dict:
-    data = rwJson.readJsonFileToDictionary(filename)
+    # Only the keys used by the model are decoded from the data file
+    data = rwJson.readJsonFileLazily(filename)
     return data
 
 
@@ -96,6 +96,7 @@ def displaySolution(model: pyomo.ConcreteModel(), data: dict):
         if curNode < 1:
             break
     # Start plotting the solution to a coordinate system
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
     if coordinatesPresent:
         plt.plot(displayX, displayY, '-o')
         for i, label in enumerate(labels):
@@ -1,6 +1,4 @@
 import readAndWriteJson as rwJson   # Used to read the data from a Json file
-from sklearn.cluster import KMeans  # Used for the K-means algorithm
-import matplotlib.pyplot as plt     # Used for plotting the results
 
 
 #------------------------------------------#
@@ -17,6 +15,8 @@ def main():
     # Make a list of list with x as first column and y as second
     points = list(zip(data['x'], data['y']))
     # Create a k-means object with data['k'] clusters
+    from sklearn.cluster import KMeans  # Used for the K-means algorithm
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
     kmeans = KMeans(n_clusters=data['k'])
     # Run the k-means algorithm on the data
     kmeans.fit(points)
@@ -12,9 +12,10 @@
 # Read data function also computes the distance matrix
 
 import pyomo.environ as pyomo       # Used for modelling the IP
-import matplotlib.pyplot as plt     # Used to plot the instance
-import numpy as np                  # Used for calculating distances
+import numpy as np                  # Used for storing the distance matrix
+import distanceMatrix as dm         # Used for calculating distances
 import readAndWriteJson as rwJson   # Used to read data from Json file
+import candidateGraph as cg         # Used for building a sparse candidate graph of the pairs of points
 
 
 
@@ -31,15 +32,8 @@ import readAndWriteJson as rwJson   # Used to read data from Json file
 
 
 
-def makeLpNormDistanceMatrix(data: dict, p: int) -> list:
-    points = np.column_stack((data['x'], data['y']))
-    nrPoints = len(data['x'])
-    dist = []
-    for i in range(0, nrPoints):
-        dist.append([])
-        for j in range(0, nrPoints):
-            dist[i].append(np.linalg.norm(points[i] - points[j], p))
-    return dist
+def makeLpNormDistanceMatrix(data: dict, p: int) -> np.ndarray:
+    return dm.distanceMatrixFromData(data, ['x', 'y'], p)
 
 
 def readData(clusterData: str) -> dict():
@@ -50,6 +44,11 @@ def readData(clusterData: str) -> dict():
     return data
 
 
+# Returns coefficient*outside[j], if point j may pay the bound instead of being represented, and 0 otherwise
+def outsideTerm(model: pyomo.ConcreteModel(), j: int, coefficient: float = 1):
+    return coefficient*model.outside[j] if j in model.outsideCost else 0
+
+
 def buildModel(data: dict) -> pyomo.ConcreteModel():
     # Create model
     model = pyomo.ConcreteModel()
@@ -62,13 +61,30 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     model.k = data['k']
     # Define variables
     model.y=pyomo.Var(model.points, within=pyomo.Binary)
-    model.x=pyomo.Var(model.points, model.points, within=pyomo.Binary)
+    # The pairs (i,j), such that point i may represent point j. If the data contains a candidate graph (data['arcs']),
+    # only its pairs are used. Otherwise all pairs are used
+    if 'arcs' in data:
+        model.pairs = [(int(i), int(j)) for i, j in data['arcs']]
+    else:
+        model.pairs = [(i, j) for i in model.points for j in model.points]
+    model.representatives = {j: [] for j in model.points}
+    for i, j in model.pairs:
+        model.representatives[j].append(i)
+    model.x=pyomo.Var(model.pairs, within=pyomo.Binary)
+    # If the data contains a lower bound on the distance from each point to the points left out of the candidate graph
+    # (data['missingArcBound'], see cg.missingArcBounds(...)), point j may pay it instead of being represented, i.e.
+    # outside[j]=1. The model is then a relaxation of the model on all pairs
+    bound = data.get('missingArcBound', [np.inf]*model.nrPoints)
+    model.outsideCost = {j: float(bound[j]) for j in model.points if np.isfinite(bound[j])}
+    model.outsidePoints = list(model.outsideCost)
+    model.outside=pyomo.Var(model.outsidePoints, within=pyomo.NonNegativeReals)
     model.rhoMax = pyomo.Var(within=pyomo.NonNegativeReals)
     #Find den maksimale længde
 
     model.maxdist=pyomo.ConstraintList()
     for j in model.points:
-        model.maxdist.add(expr=sum(model.dist[i][j]*model.x[i,j] for i in model.points) <= model.rhoMax)
+        model.maxdist.add(expr=sum(model.dist[i][j]*model.x[i,j] for i in model.representatives[j])
+                          + outsideTerm(model, j, model.outsideCost.get(j)) <= model.rhoMax)
 
 
     # Add objective function
@@ -80,20 +96,20 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     #for at lave for all j skal vi lave et "forloop" da vi ønsker at tilføje en begrænsning for alle vores j'er
     model.sumToOne=pyomo.ConstraintList()
     for j in model.points:
-        model.sumToOne.add(expr=sum(model.x[i,j] for i in model.points)==1) #vi har tilføjet at summen for alle x_ij variablerne skal være lig med 1. Vi gør dette lige så mange gange som der er punkter. Dvs. j starter med at være 0 og så 1 og så 2, osv.
+        model.sumToOne.add(expr=sum(model.x[i,j] for i in model.representatives[j]) + outsideTerm(model, j)==1) #vi har tilføjet at summen for alle x_ij variablerne skal være lig med 1. Vi gør dette lige så mange gange som der er punkter. Dvs. j starter med at være 0 og så 1 og så 2, osv.
 
     # Add only represent if y[i]=1 (x[i][j]=1 => y[i]=1)
     model.indicators=pyomo.ConstraintList()
-    for i in model.points: #vi sætter i for et model.points
-            for j in model.points: #vi sætter nu j lig med alle punkterne for i=1... Dette fortsætter så først i=1 og så alle j punkterne. Dernæst i=2 og så alle j-punkterne igen. Osv osv indtil "loopet" er færdigt.
-                model.indicators.add(expr=model.x[i,j]<=model.y[i])
+    for i, j in model.pairs: #vi tilføjer en begrænsning for hvert par (i,j), hvor i kan repræsentere j
+        model.indicators.add(expr=model.x[i,j]<=model.y[i])
     # Add cardinality constraint on number of groups
     model.cardinality=pyomo.Constraint(expr=sum(model.y[i] for i in model.points)==model.k) #tilføjer en enkelt begrænsning
 
     #tilføjer den anden sidste nye begrænsning.
     model.ekstracon1=pyomo.ConstraintList()
     for j in model.points:
-        model.ekstracon1.add(expr=sum(model.dist[i][j]*model.x[i,j] for i in model.points)<=model.rhoMax)
+        model.ekstracon1.add(expr=sum(model.dist[i][j]*model.x[i,j] for i in model.representatives[j])
+                             + outsideTerm(model, j, model.outsideCost.get(j))<=model.rhoMax)
 
 
     #add X_ii=y_i for all i=1 to n. Vi skal bruge et forloop. Dette er den sidste nye begrænsning
@@ -103,11 +119,16 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
+# Solves the model. Returns True if the solver found a solution, which is then loaded into the model
+def solveModel(model: pyomo.ConcreteModel()) -> bool:
     # Set the solver
     solver = pyomo.SolverFactory('cplex')
     # Solve the model
-    solver.solve(model, tee=True)
+    results = solver.solve(model, tee=True, load_solutions=False)
+    if len(results.solution) == 0:
+        return False
+    model.solutions.load_from(results)
+    return True
 
 
 def displaySolution(model: pyomo.ConcreteModel()):
@@ -119,22 +140,42 @@ def displaySolution(model: pyomo.ConcreteModel()):
         if pyomo.value(model.y[i]) == 1:
             print('Point', i, 'represents points:')
             for j in model.points:
-                if pyomo.value(model.x[i, j]) == 1:
+                if (i, j) in model.x and pyomo.value(model.x[i, j]) == 1:
                     print(j, ",", end='')
                     labels[j] = i
             print('\n')
     # Plot with different colors
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
     plt.scatter(model.xCoordinates, model.yCoordinates, c=labels)
     for i, label in enumerate(ptNumber):
         plt.annotate(ptNumber[i], (model.xCoordinates[i], model.yCoordinates[i]))
     plt.show()
 
 
-def main(clusterDataFile: str):
+def main(clusterDataFile: str, neighbours: int = None):
     data = readData(clusterDataFile)
+    if neighbours is not None:
+        # Only let each point be represented by itself or one of its nearest neighbours. A point may instead pay a
+        # lower bound on its distance to the points left out, so the model is feasible however few neighbours are used
+        cg.addCandidateGraph(data, k=neighbours, selfLoops=True)
+        data['missingArcBound'] = cg.missingArcBounds(data, data['dist'])
     model = buildModel(data)
-    solveModel(model)
-    displaySolution(model)
+    solved = solveModel(model)
+    # If a point pays the bound, the arcs into it from its nearest points left out of the candidate graph are re-added,
+    # and the model is solved again. Once no point pays the bound, the solution is optimal on all pairs
+    while solved and neighbours is not None:
+        outside = [j for j in model.outsidePoints if pyomo.value(model.outside[j]) > 0.5]
+        if len(outside) == 0:
+            break
+        print('Re-adding arcs into', len(outside), 'points and solving again')
+        cg.reAddArcs(data, cg.nearestMissingArcs(data, data['dist'], outside, neighbours))
+        data['missingArcBound'] = cg.missingArcBounds(data, data['dist'])
+        model = buildModel(data)
+        solved = solveModel(model)
+    if solved:
+        displaySolution(model)
+    else:
+        print('The solver found no solution')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,66 @@
+# Vectorised computation of distance matrices for the course "Modellering inden for Prescriptive Analytics"
+# The distances between all pairs of points are computed by NumPy broadcasting one block of rows at a time. Hence the
+# temporary memory used is bounded by BLOCK_ELEMENTS numbers no matter how many points there are, and the result is
+# returned as a single NumPy array instead of a list of lists.
+# The points can have any dimension (e.g. 2 for x- and y-coordinates or 4 for the USArrests data) and any Lp-norm
+# supported by numpy.linalg.norm for vectors can be used.
+
+import numpy as np  # Used for calculating distances
+
+# Maximum number of entries in the temporary array of coordinate differences computed for one block of rows
+BLOCK_ELEMENTS = 2 ** 22
+
+
+# Returns an n x d array of points, where column k holds the list data[keys[k]]
+# E.g. pointsFromData(data, ['xCoord', 'yCoord']) or pointsFromData(data, ['Murder', 'Assault', 'UrbanPop', 'Rape'])
+def pointsFromData(data: dict, keys: list) -> np.ndarray:
+    return np.column_stack([np.asarray(data[key], dtype=float) for key in keys])
+
+
+# Returns the norm of each row of the array "differences" (of shape rows x n x d) along the last axis.
+# The conventions are the same as for numpy.linalg.norm(vector, p)
+def lpNorm(differences: np.ndarray, p) -> np.ndarray:
+    if p == 2:
+        return np.sqrt(np.einsum('ijk,ijk->ij', differences, differences))
+    absolute = np.abs(differences)
+    if p == 1:
+        return absolute.sum(axis=-1)
+    if p == np.inf:
+        return absolute.max(axis=-1)
+    if p == -np.inf:
+        return absolute.min(axis=-1)
+    if p == 0:
+        return (absolute != 0).sum(axis=-1).astype(float)
+    return (absolute ** p).sum(axis=-1) ** (1.0 / p)
+
+
+# Rounds the distances in place. decimals=None means no rounding, decimals=0 means rounding to the nearest integer
+# (like round(...), so ties go to the even number) and an integer array is returned. Any other value rounds to the given
+# number of decimals (like round(..., decimals))
+def roundDistances(dist: np.ndarray, decimals: int = None) -> np.ndarray:
+    if decimals is None:
+        return dist
+    if decimals == 0:
+        return np.rint(dist, out=dist).astype(np.int64)
+    return np.round(dist, decimals, out=dist)
+
+
+# Returns the n x n matrix of Lp-norm distances between all pairs of rows in "points" (an n x d array).
+# The rows are processed in blocks, such that at most BLOCK_ELEMENTS coordinate differences are held in memory at once
+def lpNormDistanceMatrix(points, p=2, decimals: int = None) -> np.ndarray:
+    points = np.asarray(points, dtype=float)
+    if points.ndim == 1:
+        points = points[:, np.newaxis]
+    numPoints, dimension = points.shape
+    dist = np.empty((numPoints, numPoints))
+    blockSize = max(1, BLOCK_ELEMENTS // max(1, numPoints * dimension))
+    for start in range(0, numPoints, blockSize):
+        stop = min(start + blockSize, numPoints)
+        differences = points[start:stop, np.newaxis, :] - points[np.newaxis, :, :]
+        dist[start:stop] = lpNorm(differences, p)
+    return roundDistances(dist, decimals)
+
+
+# Returns the matrix of Lp-norm distances between the points given by the lists data[keys[0]], data[keys[1]],...
+def distanceMatrixFromData(data: dict, keys: list, p=2, decimals: int = None) -> np.ndarray:
+    return lpNormDistanceMatrix(pointsFromData(data, keys), p, decimals)
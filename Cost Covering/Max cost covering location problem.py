@@ -23,7 +23,6 @@
 
 import pyomo.environ as pyomo  # Used for modelling the IP
 import readAndWriteJson as rwJson  # Used to read data from Json file
-from termcolor import colored
 
 
 
@@ -83,6 +82,7 @@ def displaySolution(model: pyomo.ConcreteModel()):
         if pyomo.value(model.y[i]) == 1:
             print(model.facilities[i], end=',')
     print('\nCustomers are covered as follows:')
+    from termcolor import colored  # Only needed when the solution is printed
     for j in model.customerRange:
         if pyomo.value(model.z[j]) == 1:
             print(colored(model.customers[j], 'green'),end='->\t')
@@ -0,0 +1,153 @@
+# Sparse candidate graphs for the routing and clustering models of the course "Modellering inden for Prescriptive
+# Analytics"
+# The dense models have a variable x[i][j] for every pair of points, which does not fit in memory for a thousand points
+# or more. A candidate graph only keeps the arcs from each point to its k nearest neighbours and/or to the points within
+# a given radius. These are found by a KD-tree over the coordinates in O(n log n) time, so the full distance matrix is
+# never needed.
+# addCandidateGraph(data, ...) stores the arcs as data['arcs'], which the model builders use instead of all pairs.
+# Arcs found to be needed afterwards, e.g. by pricing them with the dual values of the LP relaxation on the candidate
+# graph (see negativeReducedCostArcs(...)), by checking a solution or by a relaxation of the missing arcs (see
+# missingArcBounds(...)), are put back into the graph by reAddArcs(...).
+
+import numpy as np  # Used for storing the points and arcs
+
+# The pairs of keys holding the coordinates in the data files of the different models
+COORDINATE_KEYS = [['xCord', 'yCord'], ['xCoord', 'yCoord'], ['x', 'y']]
+
+
+# Returns the pair of keys holding the coordinates in data
+def coordinateKeys(data: dict) -> list:
+    for keys in COORDINATE_KEYS:
+        if all(key in data for key in keys):
+            return keys
+    raise KeyError('The data contains no coordinates. Expected one of the pairs of keys ' + str(COORDINATE_KEYS))
+
+
+# Returns an n x 2 array of the coordinates of the first numOfPoints points (all points if numOfPoints is None)
+def pointsFromData(data: dict, keys: list = None, numOfPoints: int = None) -> np.ndarray:
+    keys = coordinateKeys(data) if keys is None else keys
+    points = np.column_stack([np.asarray(data[key], dtype=float) for key in keys])
+    return points if numOfPoints is None else points[:numOfPoints]
+
+
+# Returns the arcs (i, j) from each point i to its k nearest other points as two arrays (tails and heads)
+# p is the Lp-norm used for measuring the distances
+def nearestNeighbourArcs(points: np.ndarray, k: int, p=2) -> tuple:
+    from scipy.spatial import cKDTree  # Only needed when a candidate graph is built
+    numOfPoints = len(points)
+    k = min(k, numOfPoints - 1)
+    if k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    neighbours = cKDTree(points).query(points, k + 1, p=p)[1].reshape(numOfPoints, k + 1)
+    # A point is normally its own nearest neighbour. If other points have the same coordinates, it may be left out, and
+    # then the last of the k+1 neighbours is dropped instead
+    isOther = neighbours != np.arange(numOfPoints)[:, np.newaxis]
+    isOther[isOther.all(axis=1), -1] = False
+    return np.nonzero(isOther)[0], neighbours[isOther]
+
+
+# Returns the arcs (i, j) in both directions between all pairs of different points within distance radius of each
+# other as two arrays (tails and heads)
+def radiusArcs(points: np.ndarray, radius: float, p=2) -> tuple:
+    from scipy.spatial import cKDTree  # Only needed when a candidate graph is built
+    pairs = cKDTree(points).query_pairs(radius, p=p, output_type='ndarray').reshape(-1, 2)
+    return np.concatenate([pairs[:, 0], pairs[:, 1]]), np.concatenate([pairs[:, 1], pairs[:, 0]])
+
+
+# Returns the sorted list of arcs (i, j) of the candidate graph on the given points, consisting of
+# - the arcs from each point to its k nearest neighbours (if k is given)
+# - the arcs between all points within distance radius of each other (if radius is given)
+# - the arcs in both directions between each hub (e.g. the depot) and every other point
+# - the self-loops (i, i), if selfLoops is True (e.g. for the clustering models, where a point may represent itself)
+# If symmetric is True, the opposite arc (j, i) is added for every arc (i, j)
+def candidateArcs(points: np.ndarray, k: int = None, radius: float = None, hubs=(), symmetric: bool = True,
+                  selfLoops: bool = False, p=2) -> list:
+    numOfPoints = len(points)
+    tails, heads = [], []
+    if k is not None:
+        arcs = nearestNeighbourArcs(points, k, p)
+        tails.append(arcs[0])
+        heads.append(arcs[1])
+    if radius is not None:
+        arcs = radiusArcs(points, radius, p)
+        tails.append(arcs[0])
+        heads.append(arcs[1])
+    for hub in hubs:
+        others = np.delete(np.arange(numOfPoints), hub)
+        tails += [np.full(len(others), hub), others]
+        heads += [others, np.full(len(others), hub)]
+    if selfLoops:
+        tails.append(np.arange(numOfPoints))
+        heads.append(np.arange(numOfPoints))
+    tails = np.concatenate(tails).astype(np.int64) if tails else np.array([], dtype=np.int64)
+    heads = np.concatenate(heads).astype(np.int64) if heads else np.array([], dtype=np.int64)
+    codes = tails * numOfPoints + heads
+    if symmetric:
+        codes = np.concatenate([codes, heads * numOfPoints + tails])
+    codes = np.unique(codes)
+    return list(zip((codes // numOfPoints).tolist(), (codes % numOfPoints).tolist()))
+
+
+# Builds the candidate graph on the first numOfPoints points of data (all points if numOfPoints is None), stores it as
+# data['arcs'] and returns it. See candidateArcs(...) for the remaining arguments. E.g. for the CVRP
+#     addCandidateGraph(data, k=10, numOfPoints=data['n'] + 1, hubs=[0])
+def addCandidateGraph(data: dict, k: int = 10, radius: float = None, numOfPoints: int = None, hubs=(),
+                      symmetric: bool = True, selfLoops: bool = False, keys: list = None, p=2) -> list:
+    points = pointsFromData(data, keys, numOfPoints)
+    data['arcs'] = candidateArcs(points, k, radius, hubs, symmetric, selfLoops, p)
+    return data['arcs']
+
+
+# Adds the arcs to the candidate graph data['arcs'], e.g. arcs with a negative reduced cost or arcs used by a known
+# solution. Returns the number of arcs which were not already in the graph. The model must be rebuilt afterwards
+def reAddArcs(data: dict, arcs) -> int:
+    graph = set(map(tuple, data.get('arcs', [])))
+    newArcs = set((int(i), int(j)) for i, j in arcs) - graph
+    data['arcs'] = sorted(graph | newArcs)
+    return len(newArcs)
+
+
+# Returns an array with the length dist[i][j] of the shortest arc (i, j) into each of the first numOfPoints points j,
+# which is not in the candidate graph data['arcs'] (infinity if every arc into j is in the graph). Every solution
+# using an arc outside the graph to reach j pays at least this, so a model where j may pay it instead of using an arc
+# is a relaxation of the model on the full graph. If its optimal solution does not use this option, it is optimal
+def missingArcBounds(data: dict, dist, numOfPoints: int = None) -> np.ndarray:
+    numOfPoints = len(dist) if numOfPoints is None else numOfPoints
+    lengths = np.array([np.asarray(dist[i], dtype=float)[:numOfPoints] for i in range(numOfPoints)])
+    arcs = np.array(data.get('arcs', []), dtype=np.int64).reshape(-1, 2)
+    arcs = arcs[arcs.max(axis=1) < numOfPoints]
+    lengths[arcs[:, 0], arcs[:, 1]] = np.inf
+    return lengths.min(axis=0)
+
+
+# Returns the count shortest arcs (i, j) into each of the points j, which are not in the candidate graph data['arcs'],
+# e.g. for the points which paid the bound of missingArcBounds(...) in the relaxation
+def nearestMissingArcs(data: dict, dist, points, count: int = 1) -> list:
+    graph = set(map(tuple, data.get('arcs', [])))
+    arcs = []
+    for j in points:
+        lengths = np.array([dist[i][j] for i in range(len(dist))], dtype=float)
+        arcs += [(i, j) for i in np.argsort(lengths, kind='stable').tolist() if (i, j) not in graph][:count]
+    return arcs
+
+
+# Returns the arcs (i, j) between the first numOfPoints points, which are not in the candidate graph data['arcs'], and
+# whose reduced cost dist[i][j] - outDual[i] - inDual[j] with respect to the degree constraints is below -tolerance.
+# outDual and inDual are the dual values of the out- and in-degree constraints of the nodes in an optimal solution of
+# the LP relaxation on the candidate graph. The test is only exact for a model where the degree constraints are the only
+# constraints on x (an assignment model). Then no arc returned proves that the LP relaxation on the candidate graph is
+# optimal on the full graph. The subtour, MTZ, flow and capacity constraints of the routing models have duals as well,
+# which are left out, so for them the arcs returned are a heuristic choice of arcs to re-add, and no arc returned proves
+# nothing. The distances are read one row at a time, so dist can be a memory-mapped matrix
+def negativeReducedCostArcs(data: dict, dist, outDual, inDual, numOfPoints: int = None,
+                            tolerance: float = 1e-6) -> list:
+    outDual = np.asarray(outDual, dtype=float)
+    inDual = np.asarray(inDual, dtype=float)
+    numOfPoints = len(outDual) if numOfPoints is None else numOfPoints
+    graph = set(map(tuple, data.get('arcs', [])))
+    arcs = []
+    for i in range(numOfPoints):
+        reducedCost = np.asarray(dist[i], dtype=float)[:numOfPoints] - outDual[i] - inDual[:numOfPoints]
+        reducedCost[i] = 0
+        arcs += [(i, j) for j in np.flatnonzero(reducedCost < -tolerance).tolist() if (i, j) not in graph]
+    return arcs
@@ -0,0 +1,176 @@
+# Detours through several chargers for the electric vehicle routing problem (EVRP) for the course "Modellering inden
+# for Prescriptive Analytics"
+# The model of main.py allows at most one charger between two customers, so a leg longer than one battery charge cannot
+# be travelled at all. This module finds the best detours i -> r1 -> ... -> rk -> j through up to MAX_CHARGERS chargers
+# between every pair of nodes among the depot and the customers, such that the model and the heuristics can use each of
+# them as a single super-arc. evrpHeuristic.py uses them where the battery does not allow a single charger.
+# If the vehicle arrives at i with battery b[i] and at j with battery b[j], it must recharge E - b[i] + b[j] on the
+# detour, where E is the energy used by all its legs. Hence its duration is t + g*(E - b[i] + b[j]), where t is the
+# travel time, and the detours are compared on the distance, on t + g*E, and on the energy of the first and the last
+# leg (the battery needed at i to reach r1 and the battery left at j is at most B - e[rk][j]). Every leg must use at
+# most B energy.
+# The detours are found by a resource constrained shortest path in two steps
+# 1. The Pareto-optimal paths (on the distance and t + g*e) between every pair of chargers are found by a label
+#    correcting algorithm on the graph of the chargers, where a path is extended by one charger at a time
+# 2. For each pair (i,j) the paths are joined with the legs i -> r1 and rk -> j, the detours not fitting in the workday
+#    T are left out, and the Pareto-optimal detours are kept (by dominatedDetours(...) of preprocessing.py). At most
+#    MAX_DETOURS detours are kept for each pair, the shortest first
+# The table is the expensive part, so loadOrMakeDetourTable(...) stores it in a .npz sidecar file next to the data file,
+# which is reused as long as it is newer than the data file and made with the same parameters.
+# The table is a dict of arrays with a row per detour
+#     'tails', 'heads'  : the pair (i,j) of the detour
+#     'chargers'        : the chargers visited in order, padded with -1 to MAX_CHARGERS columns
+#     'distance', 'time', 'energy', 'energyFirst', 'energyLast' : the distance, travel time, total energy, and energy of
+#                         the first and last leg of the detour
+# The rows are sorted by the pair and then by the distance.
+
+import os                           # Used for checking if the sidecar file is up to date
+import numpy as np                  # Used for storing the table
+import time as tm                   # Used for timing the table
+import readAndWriteJson as rwJson   # Used for reading the data file in Json format
+import preprocessing as pp          # Used for the times to and from the depot and comparing the detours
+
+# The largest number of chargers on a detour
+MAX_CHARGERS = 3
+# The largest number of detours kept for each pair of nodes
+MAX_DETOURS = 3
+# The keys of the arrays of the table
+TABLE_KEYS = ['tails', 'heads', 'chargers', 'distance', 'time', 'energy', 'energyFirst', 'energyLast']
+
+
+# Returns the Pareto-optimal paths between all pairs of chargers through at most maxChargers chargers, where each leg
+# uses at most B energy, as a dict from the pair (first, last) to a list of labels (distance, time, energy, path)
+def chargerGraphPaths(data: dict, maxChargers: int = MAX_CHARGERS) -> dict:
+    c, t, e = (np.asarray(data[key], dtype=float) for key in ['c', 't', 'e'])
+    chargers = list(range(data['n'] + 1, data['n'] + data['r'] + 1))
+    g = data['g']
+    paths = {}
+    for first in chargers:
+        # labels[r] are the Pareto-optimal labels of the paths from first to r found so far
+        labels = {r: [] for r in chargers}
+        labels[first] = [(0.0, 0.0, 0.0, (first,))]
+        frontier = labels[first]
+        for _ in range(maxChargers - 1):
+            extended = []
+            for distance, time, energy, path in frontier:
+                last = path[-1]
+                for r in chargers:
+                    if r in path or e[last, r] > data['B']:
+                        continue
+                    label = (distance + c[last, r], time + t[last, r], energy + e[last, r], path + (r,))
+                    # The label is compared to the others on the distance and the time including recharging
+                    key = (label[0], label[1] + g * label[2])
+                    if any(other[0] <= key[0] and other[1] + g * other[2] <= key[1] for other in labels[r]):
+                        continue
+                    labels[r] = [other for other in labels[r]
+                                 if not (key[0] <= other[0] and key[1] <= other[1] + g * other[2])] + [label]
+                    extended.append(label)
+            # Only the labels still Pareto-optimal are extended further
+            frontier = [label for label in extended if label in labels[label[3][-1]]]
+            if not frontier:
+                break
+        for r in chargers:
+            if labels[r]:
+                paths[first, r] = labels[r]
+    return paths
+
+
+# Returns the table of the best detours between all pairs of nodes among the depot and the customers (see the top of
+# the file)
+def detourTable(data: dict, maxChargers: int = MAX_CHARGERS, maxDetours: int = MAX_DETOURS) -> dict:
+    c, t, e = (np.asarray(data[key], dtype=float) for key in ['c', 't', 'e'])
+    # The paths through the chargers as arrays with an entry per path
+    labels = [(first, last) + label for (first, last), pathLabels in chargerGraphPaths(data, maxChargers).items()
+              for label in pathLabels]
+    first, last = np.array([label[0] for label in labels]), np.array([label[1] for label in labels])
+    pathDistance, pathTime, pathEnergy = (np.array([label[k] for label in labels]) for k in [2, 3, 4])
+    pathChargers = np.full((len(labels), maxChargers), -1, dtype=np.int64)
+    for k, label in enumerate(labels):
+        pathChargers[k, :len(label[5])] = label[5]
+    # Every pair of distinct nodes among the depot and the customers
+    tails, heads = np.nonzero(~np.eye(data['n'] + 1, dtype=bool))
+    earliestLeave, shortestReturn = pp.timesToAndFromDepot(data)
+    energyFirst, energyLast = e[np.ix_(tails, first)], e[np.ix_(last, heads)].T
+    distance = c[np.ix_(tails, first)] + pathDistance + c[np.ix_(last, heads)].T
+    time = t[np.ix_(tails, first)] + pathTime + t[np.ix_(last, heads)].T
+    energy = energyFirst + pathEnergy + energyLast
+    # The vehicle leaves i with at most B energy and may arrive at j with none, so it recharges at least E - B
+    isCandidate = ((energyFirst <= data['B']) & (energyLast <= data['B'])
+                   & (earliestLeave[tails][:, np.newaxis] + time + data['g'] * np.maximum(energy - data['B'], 0)
+                      + shortestReturn[heads][:, np.newaxis] <= data['T']))
+    criteria = np.stack([distance, time + data['g'] * energy, energyFirst, energyLast], axis=2)
+    isKept = isCandidate & ~pp.dominatedDetours(criteria, isCandidate)
+    # Keep the maxDetours shortest of the detours of each pair
+    order = np.argsort(np.where(isKept, distance, np.inf), axis=1, kind='stable')[:, :maxDetours]
+    arcs = np.repeat(np.arange(len(tails)), order.shape[1])
+    paths = order.ravel()
+    isUsed = isKept[arcs, paths]
+    arcs, paths = arcs[isUsed], paths[isUsed]
+    return {'tails': tails[arcs], 'heads': heads[arcs], 'chargers': pathChargers[paths],
+            'distance': distance[arcs, paths], 'time': time[arcs, paths], 'energy': energy[arcs, paths],
+            'energyFirst': energyFirst[arcs, paths], 'energyLast': energyLast[arcs, paths]}
+
+
+# Returns the name of the sidecar file storing the table of detours of the data file fileName
+def tableFileName(fileName: str) -> str:
+    return fileName + '_detours.npz'
+
+
+# Returns the table of detours of the data file fileName. It is read from the sidecar file if this is newer than the
+# data file and made with the same parameters. Otherwise it is computed by detourTable(...) and saved
+def loadOrMakeDetourTable(data: dict, fileName: str, maxChargers: int = MAX_CHARGERS,
+                          maxDetours: int = MAX_DETOURS) -> dict:
+    sidecarName = tableFileName(fileName)
+    parameters = np.array([maxChargers, maxDetours])
+    if os.path.exists(sidecarName) and os.path.getmtime(sidecarName) >= os.path.getmtime(fileName):
+        try:
+            with np.load(sidecarName, allow_pickle=False) as stored:
+                if np.array_equal(stored['parameters'], parameters):
+                    return {key: stored[key] for key in TABLE_KEYS}
+        except (OSError, ValueError, KeyError):
+            pass  # A broken sidecar is simply rebuilt below
+    table = detourTable(data, maxChargers, maxDetours)
+    # Write to a temporary file first, such that a half written file is never read
+    temporaryName = sidecarName + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temporaryName, 'wb') as outfile:
+            np.savez(outfile, parameters=parameters, **table)
+        os.replace(temporaryName, sidecarName)
+    except OSError:
+        # The sidecar is only an optimisation. If it cannot be written, the table is returned anyway
+        if os.path.exists(temporaryName):
+            os.remove(temporaryName)
+    return table
+
+
+# Returns a dict from each pair (i,j) to the rows of its detours in the table, the shortest first
+def detoursByArc(table: dict) -> dict:
+    rows = {}
+    for row, arc in enumerate(zip(table['tails'].tolist(), table['heads'].tolist())):
+        rows.setdefault(arc, []).append(row)
+    return rows
+
+
+# Returns the chargers visited by the detour in the given row of the table
+def detourChargers(table: dict, row: int) -> list:
+    return [r for r in table['chargers'][row].tolist() if r >= 0]
+
+
+def main(filename: str):
+    data = rwJson.readJsonFileToDictionary(filename)
+    startTime = tm.time()
+    table = loadOrMakeDetourTable(data, filename)
+    print('Table of detours loaded or computed in %.4f seconds' % (tm.time() - startTime))
+    numOfChargers = (table['chargers'] >= 0).sum(axis=1)
+    for k in range(1, MAX_CHARGERS + 1):
+        print('Detours through %d charger(s): %d' % (k, (numOfChargers == k).sum()))
+    rows = detoursByArc(table)
+    print('Pairs with a detour: %d of %d' % (len(rows), data['n'] * (data['n'] + 1)))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        main('E-n22-k4.evrp')
@@ -0,0 +1,258 @@
+# Construction heuristic for the electric vehicle routing problem (EVRP) for the course "Modellering inden for
+# Prescriptive Analytics"
+# Without a starting solution, the solver may search for hours on the larger instances before it finds a feasible
+# solution. This heuristic finds one in a fraction of a second in two steps
+# 1. The customers are joined into routes by the savings heuristic of savingsHeuristic.py, where two routes are only
+#    joined if the joined route respects the capacity Q and can be repaired to respect the battery B and the workday T
+# 2. The battery violations of a route are repaired by inserting chargers between its nodes. For a fixed order of the
+#    customers, the cheapest set of detours through a charger (at most one on each arc, as in the model), such that
+#    every segment between two chargers uses at most B energy, is found by dynamic programming over the segments.
+#    If the table of chargerPaths.py is given, an arc may instead be travelled by a detour through several chargers
+#    from the table, when the battery does not allow a single charger
+# The savings are run with each of the parameters in savingsHeuristic.PARAMETERS, and the shortest routes are kept.
+# setMipStart(...) sets x, y and the flow, battery, recharging and time variables of the model of main.py to the
+# routes, such that the solver can start from them. Routes using a detour through several chargers cannot be
+# represented in the model, so they are not used as a start. The routes can also be used on their own, e.g. when the
+# solver finds no solution within its time limit.
+# The feasibility of the routes is checked by routeEvaluator.py.
+#
+# Usage: python evrpHeuristic.py [data file]
+
+import numpy as np                  # Used for the dynamic program
+import time as tm                   # Used for timing the heuristic
+import readAndWriteJson as rwJson   # Used for reading the data file in Json format
+import savingsHeuristic as sh       # Used for joining the customers into routes
+import routeEvaluator as ev         # Used for checking the routes
+import routeDecoder as rd           # Used for printing the routes
+import chargerPaths as cp           # Used for the detours through several chargers
+
+
+# Returns a boolean array of shape (n+1, n+1, r), which is True for the detours i -> r -> j the model has a variable
+# y[i][r][j] for, i.e. the triples in data['chargerArcs'] if present, otherwise every charger on every arc
+def allowedDetours(data: dict) -> np.ndarray:
+    numOfVNodes = data['n'] + 1
+    if 'chargerArcs' not in data:
+        return np.ones((numOfVNodes, numOfVNodes, data['r']), dtype=bool)
+    isAllowed = np.zeros((numOfVNodes, numOfVNodes, data['r']), dtype=bool)
+    triples = np.array(list(data['chargerArcs']), dtype=np.int64).reshape(-1, 3)
+    isAllowed[triples[:, 0], triples[:, 2], triples[:, 1] - numOfVNodes] = True
+    return isAllowed
+
+
+# Returns the ways of travelling through chargers between each pair (i,j) of nodes among the depot and the customers, as
+# a dict from (i,j) to a tuple of
+#     the chargers visited by each detour (a list of tuples)
+#     the energy from i to the first charger, the distance from i to the last charger, and the energy and the distance
+#     from the last charger to j (arrays with an entry per detour)
+# The detours are the single chargers allowed by allowedDetours(...). If the table of chargerPaths.py is given, its
+# detours through several chargers are added. As the distances satisfy the triangle inequality, the detour through the
+# first charger alone is never longer, so the detours through several chargers are only used when the battery does not
+# allow a single charger
+def chargerDetours(data: dict, table: dict = None) -> dict:
+    evaluator = ev.RouteEvaluator(data)
+    c, e = evaluator.c, evaluator.e
+    isAllowed = allowedDetours(data)
+    chargers = np.arange(data['n'] + 1, data['n'] + data['r'] + 1)
+    rowsOfArc = cp.detoursByArc(table) if table is not None else {}
+    detours = {}
+    for i in range(data['n'] + 1):
+        for j in range(data['n'] + 1):
+            if i == j:
+                continue
+            used = chargers[isAllowed[i, j]]
+            stops = [(int(r),) for r in used]
+            energyFirst, distanceThrough, energyLast, distanceLast = e[i, used], c[i, used], e[used, j], c[used, j]
+            if (i, j) in rowsOfArc:
+                rows = np.array([row for row in rowsOfArc[i, j] if len(cp.detourChargers(table, row)) > 1],
+                                dtype=np.int64)
+                stops += [tuple(cp.detourChargers(table, row)) for row in rows.tolist()]
+                last = np.array([stop[-1] for stop in stops[len(used):]], dtype=np.int64)
+                energyFirst = np.concatenate([energyFirst, table['energyFirst'][rows]])
+                distanceThrough = np.concatenate([distanceThrough, table['distance'][rows] - c[last, j]])
+                energyLast = np.concatenate([energyLast, table['energyLast'][rows]])
+                distanceLast = np.concatenate([distanceLast, c[last, j]])
+            detours[i, j] = (stops, energyFirst, distanceThrough, energyLast, distanceLast)
+    return detours
+
+
+# Returns the route (as a list of nodes from the depot to the depot) visiting the customers in the given order with the
+# cheapest detours through chargers (see chargerDetours(...)), at most one on each arc, such that each segment between
+# two chargers uses at most B energy. Returns None if no such detours exist. best[a][k] is the shortest distance from
+# the depot to the last charger of detour k on the arc into the a'th node of the route, and each segment from a charger
+# (or the depot) to the next is tried in O(len * r) time
+def insertChargers(customers: list, evaluator: ev.RouteEvaluator, detours: dict) -> list:
+    path = np.array([0] + list(customers) + [0], dtype=np.int64)
+    numOfArcs = len(path) - 1
+    e, B = evaluator.e, evaluator.B
+    # The energy and distance of the direct legs from the depot to each node of the route
+    energyTo = np.concatenate([[0], np.cumsum(e[path[:-1], path[1:]])])
+    distanceTo = np.concatenate([[0], np.cumsum(evaluator.c[path[:-1], path[1:]])])
+    arcDetours = [detours[i, j] for i, j in zip(path[:-1].tolist(), path[1:].tolist())]
+    # best[a] has an entry per detour on the arc into node a
+    best = [None] + [np.full(len(arcDetours[a - 1][0]), np.inf) for a in range(1, numOfArcs + 1)]
+    previous = {}
+    bestRoute, bestDistance = None, np.inf
+    # The segments start at the depot (a = 0, k = -1) or at the last charger of detour k on the arc into node a
+    starts = [(0, -1)] + [(a, k) for a in range(1, numOfArcs + 1) for k in range(len(best[a]))]
+    for a, k in starts:
+        if k >= 0 and not np.isfinite(best[a][k]):
+            continue
+        startEnergy = 0.0 if k < 0 else arcDetours[a - 1][3][k]
+        startDistance = 0.0 if k < 0 else best[a][k] + arcDetours[a - 1][4][k]
+        # End the segment at the depot
+        if startEnergy + energyTo[-1] - energyTo[a] <= B + ev.TOLERANCE:
+            distance = startDistance + distanceTo[-1] - distanceTo[a]
+            if distance < bestDistance:
+                bestDistance, bestRoute = distance, (a, k)
+        # End the segment at the first charger of a detour on the arc from node b to node b+1
+        for b in range(a, numOfArcs):
+            energy = startEnergy + energyTo[b] - energyTo[a]
+            if energy > B + ev.TOLERANCE:
+                break
+            energyFirst, distanceThrough = arcDetours[b][1], arcDetours[b][2]
+            distance = np.where(energy + energyFirst <= B + ev.TOLERANCE,
+                                startDistance + distanceTo[b] - distanceTo[a] + distanceThrough, np.inf)
+            isBetter = distance < best[b + 1]
+            best[b + 1][isBetter] = distance[isBetter]
+            for kk in np.flatnonzero(isBetter).tolist():
+                previous[b + 1, kk] = (a, k)
+    if bestRoute is None:
+        return None
+    # Follow the segments back from the depot, inserting the chargers of each detour before node a
+    route = path.tolist()
+    a, k = bestRoute
+    while k >= 0:
+        route[a:a] = list(arcDetours[a - 1][0][k])
+        a, k = previous[a, k]
+    return route
+
+
+# Returns the route visiting the customers in the given order with chargers inserted, if it respects all the limits,
+# and otherwise None. The results are stored in cache, as the savings heuristic tries the same routes many times
+def repairRoute(customers: list, evaluator: ev.RouteEvaluator, detours: dict, cache: dict) -> list:
+    key = tuple(customers)
+    if key not in cache:
+        route = insertChargers(customers, evaluator, detours)
+        cache[key] = route if route is not None and evaluator.evaluate(route)['isFeasible'] else None
+    return cache[key]
+
+
+# Returns the routes found by the heuristic (see the top of the file) as lists of nodes from the depot to the depot,
+# including the chargers visited. Routes which cannot be repaired are returned without chargers. If the table of
+# detours of chargerPaths.py is given, detours through several chargers are used where a single charger will not do
+def solve(data: dict, table: dict = None) -> list:
+    evaluator = ev.RouteEvaluator(data)
+    detours = chargerDetours(data, table)
+    cache = {}
+    numOfVNodes = data['n'] + 1
+    dist = evaluator.c[:numOfVNodes, :numOfVNodes]
+    demands = evaluator.q[:numOfVNodes].tolist()
+    best, bestKey = None, None
+    for shape, asymmetry, demandWeight in sh.PARAMETERS:
+        routes = sh.savingsRoutes(dist, demands, data['Q'], data['m'], shape, asymmetry, demandWeight,
+                                  lambda customers: repairRoute(customers, evaluator, detours, cache) is not None)
+        repaired = [repairRoute(customers, evaluator, detours, cache) for customers in routes]
+        routes = [route if route is not None else [0] + customers + [0]
+                  for route, customers in zip(repaired, routes)]
+        # Prefer feasible routes, then using at most m vehicles, then the shortest routes
+        key = (repaired.count(None), max(len(routes), data['m']),
+               sum(evaluator.evaluate(route)['distance'] for route in routes))
+        if bestKey is None or key < bestKey:
+            best, bestKey = routes, key
+    return best
+
+
+# Returns the arcs (i,j) between the depot and the customers visited one after the other on the routes, directly or
+# through chargers, and the triples (i,r,j) of the detours through a single charger r, e.g. for putting them back into a
+# candidate graph
+def routeArcs(routes: list, data: dict) -> tuple:
+    arcs, detours = [], []
+    for route in routes:
+        visits = [k for k, node in enumerate(route) if node <= data['n']]
+        for before, after in zip(visits[:-1], visits[1:]):
+            arcs.append((route[before], route[after]))
+            if after == before + 2:
+                detours.append((route[before], route[before + 1], route[after]))
+    return arcs, detours
+
+
+# Sets the values of the variables of the model of main.py to the routes, such that they can be used as a MIP start.
+# Returns False (and changes nothing) if the routes are infeasible, use more than m vehicles, or use an arc or a detour
+# the model has no variable for. This includes the detours through several chargers, as the model allows at most one
+# charger between two customers
+def setMipStart(model, routes: list, data: dict) -> bool:
+    evaluator = ev.RouteEvaluator(data)
+    evaluated = [evaluator.evaluate(route) for route in routes]
+    if len(routes) > data['m'] or not all(route['isFeasible'] for route in evaluated):
+        return False
+    directArcs, detours = [], []
+    served, battery, arrival, recharged = {0: 0.0}, {}, {0: 0.0}, {}
+    for route in evaluated:
+        nodes = route['nodes'].tolist()
+        # The positions of the depot and the customers on the route. A charger may only be visited between two of them
+        visits = [k for k, node in enumerate(nodes) if not evaluator.isCharger(node)]
+        total = 0.0
+        for before, after in zip(visits[:-1], visits[1:]):
+            i, j = nodes[before], nodes[after]
+            if after == before + 1:
+                directArcs.append((i, j))
+            elif after == before + 2:
+                detours.append((i, nodes[before + 1], j))
+                recharged[i, j] = float(route['recharged'][before + 1])
+            else:
+                return False
+            if j != 0:
+                total += evaluator.q[j]
+                served[j] = total
+                battery[j] = float(route['battery'][after])
+                arrival[j] = float(route['arrival'][after])
+    if any(arc not in model.x for arc in directArcs) or any(triple not in model.y for triple in detours):
+        return False
+    for variable in [model.x, model.y, model.f, model.epsilon]:
+        for index in variable:
+            if not variable[index].fixed:
+                variable[index].set_value(0)
+    for i, j in directArcs:
+        model.x[i, j].set_value(1)
+    for i, r, j in detours:
+        model.y[i, r, j].set_value(1)
+    # f[i][j] is the demand served up to and including i
+    for i, j in directArcs + [(i, j) for i, r, j in detours]:
+        model.f[i, j].set_value(served[i])
+    for (i, j), energy in recharged.items():
+        model.epsilon[i, j].set_value(energy)
+    for i in model.customers:
+        model.b[i].set_value(battery[i])
+        model.tau[i].set_value(arrival[i])
+    model.tau[0].set_value(0)
+    return True
+
+
+# Returns the routes as dicts (see routeDecoder.py), with the chargers marked and the energy recharged on each route
+def decodedRoutes(routes: list, data: dict) -> list:
+    evaluator = ev.RouteEvaluator(data)
+    return [rd.makeRoute(route, data, [evaluator.isCharger(node) for node in route],
+                         evaluator.evaluate(route)['recharged'].sum()) for route in routes]
+
+
+def main(filename: str):
+    data = rwJson.readJsonFileToDictionary(filename)
+    startTime = tm.time()
+    routes = solve(data, cp.loadOrMakeDetourTable(data, filename))
+    print('Heuristic took %.4f seconds' % (tm.time() - startTime))
+    evaluator = ev.RouteEvaluator(data)
+    print('Total length of the', len(routes), 'routes is',
+          sum(evaluator.evaluate(route)['distance'] for route in routes))
+    rd.printRoutes(decodedRoutes(routes, data))
+    for number, route in enumerate(routes, start=1):
+        violated = ev.violations(evaluator.evaluate(route))
+        if violated is not None:
+            print('The route for vehicle', number, violated)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        main('E-n22-k4.evrp')
@@ -27,24 +27,26 @@
 # b[i] is a lower bound for the battery level of a vehicle upon arriving at a node i, while epsilon[i][j] is the energy recharged while between two node i,j.
 # T is the maximum allowed route duration, t[i][j] is the travel time between two nodes i,j, and s[i] is the service time for a node i.
 # Finally, tau[i] is the arrival time at node i and g is the time it takes to recharge one unit of energy.
+# If heuristicStart is True, the routes found by the construction heuristic of evrpHeuristic.py are given to the solver
+# as a MIP start, and are shown instead if the solver finds no solution within the time limit.
 
 # The readData(...) function uses the readAndWriteJson file to read data from a Json file
 import pyomo.environ as pyomo       # Used to model the IP
 import readAndWriteJson as rwJson   # Used for reading the data file in Json format
-import matplotlib.pyplot as plt     # Used for plotting the result
-import math
-
-# Function, taking a dict as argument, and returns a list of lists storing a distance matrix
+import numpy as np                  # Used for storing the distance matrix
+import distanceMatrix as dm         # Used for generating a distance matrix, if it is not present
+import matrixStorage as ms          # Used for storing a generated distance matrix on disk
+import candidateGraph as cg         # Used for building a sparse candidate graph of the arcs
+import routeDecoder as rd          # Used for reading the routes from the solution
+import preprocessing as pp         # Used for leaving out infeasible arcs and dominated detours through chargers
+import routeEvaluator as ev        # Used for checking the routes of the solution
+import evrpHeuristic as eh          # Used for finding routes to start the solver from
+import chargerPaths as cp           # Used for the detours through several chargers used by the heuristic
+
+# Function, taking a dict as argument, and returns a NumPy array storing a distance matrix rounded to integers
 # "data" must have keys "xCoord" and "yCoord". No error handling at the moment!
-def makeDistanceMatrix(data: dict) -> list:
-    numNodes = len(data['xCoord'])
-    dist = []
-    for i in range(numNodes):
-        dist.append([])
-        for j in range(numNodes):
-            tmpDist = (data['xCoord'][i] - data['xCoord'][j]) ** 2 + (data['yCoord'][i] - data['yCoord'][j]) ** 2
-            dist[i].append(round(math.sqrt(tmpDist)))
-    return dist
+def makeDistanceMatrix(data: dict) -> np.ndarray:
+    return dm.distanceMatrixFromData(data, ['xCoord', 'yCoord'], decimals=0)
 
 
 # Reads the data from a data file in Json format. Must include
@@ -68,12 +70,33 @@ def makeDistanceMatrix(data: dict) -> list:
 def readData(filename: str) -> dict:
     data = rwJson.readJsonFileToDictionary(filename)
     if 'c' not in data:
-        data['c'] = makeDistanceMatrix(data)
-        newFileName = filename + '_new'
-        rwJson.saveDictToJsonFile(data, newFileName)
+        # The distance matrix is computed once and stored in a compact, memory-mapped sidecar file next to the data file
+        data['c'] = ms.loadOrMakeMatrix(data, filename, 'c', makeDistanceMatrix)
     return data
 
 
+# Returns the sorted list of arcs (i,j) between the depot and the customers the model is built on. If the data contains
+# a list of arcs (e.g. a sparse candidate graph), only these arcs are used. Otherwise all pairs of nodes are used.
+# Self-loops are never included, and neither are arcs between two customers whose total demand exceeds the capacity
+def makeArcSet(data: dict) -> list:
+    numOfVNodes = data['n'] + 1
+    if 'arcs' not in data:
+        arcs = [(i, j) for i in range(numOfVNodes) for j in range(numOfVNodes)]
+    else:
+        arcs = sorted(set((int(i), int(j)) for i, j in data['arcs']))
+    return [(i, j) for i, j in arcs if i != j and (i == 0 or j == 0 or data['q'][i] + data['q'][j] <= data['Q'])]
+
+
+# Returns the list of triples (i,r,j), such that a vehicle may travel from node i to node j through charger r, for the
+# arcs (i,j). If the data contains a list of triples, only these are used. Otherwise every charger is used on every arc
+def makeChargerArcSet(data: dict, arcs: list) -> list:
+    if 'chargerArcs' in data:
+        isArc = set(arcs)
+        return sorted(set((int(i), int(r), int(j)) for i, r, j in data['chargerArcs'] if (int(i), int(j)) in isArc))
+    chargers = range(data['n'] + 1, data['n'] + data['r'] + 1)
+    return [(i, r, j) for i, j in arcs for r in chargers]
+
+
 def buildModel(data: dict) -> pyomo.ConcreteModel():
     # Create model object
     model = pyomo.ConcreteModel()
@@ -83,41 +106,56 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     model.nodes = range(0, model.numOfVNodes) #Range of dept and customers
     model.customers = range(1, model.numOfVNodes) #Range of customers
     model.chargers= range(model.numOfVNodes,model.numOfVNodes+model.numOfRNodes) #Range of chargers
+    # The arcs (i,j) and the triples (i,r,j) of arcs through a charger the model is built on. No variables are created
+    # for self-loops or arcs left out
+    model.arcs = makeArcSet(data)
+    model.chargerArcs = makeChargerArcSet(data, model.arcs)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    model.chargersOnArc = {(i, j): [] for i, j in model.arcs}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    for i, r, j in model.chargerArcs:
+        model.chargersOnArc[i, j].append(r)
     # Define the variables
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary) # 1, if vehicle travels directly from node i to j
-    model.y = pyomo.Var(model.nodes, model.chargers, model.nodes, within=pyomo.Binary) #1, if vehicle travels from node i to j through charger r
-    model.f = pyomo.Var(model.nodes, model.nodes, within=pyomo.NonNegativeReals) # Total quantity to delivered from the depot to customer i
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary) # 1, if vehicle travels directly from node i to j
+    model.y = pyomo.Var(model.chargerArcs, within=pyomo.Binary) #1, if vehicle travels from node i to j through charger r
+    model.f = pyomo.Var(model.arcs, within=pyomo.NonNegativeReals) # Total quantity to delivered from the depot to customer i
     model.b = pyomo.Var(model.nodes, within=pyomo.NonNegativeReals, bounds=(0, data['B'])) # Battery level of vehicle when reaching node i
-    model.epsilon = pyomo.Var(model.nodes, model.nodes, within=pyomo.NonNegativeReals, bounds=(0, data['B'])) # # Energy recharged while travelling from node i to j
+    model.epsilon = pyomo.Var(model.arcs, within=pyomo.NonNegativeReals, bounds=(0, data['B'])) # # Energy recharged while travelling from node i to j
     model.tau = pyomo.Var(model.nodes, within=pyomo.NonNegativeReals, bounds=(0, data['T'])) # Arrival time at node i
+    # The arcs which can only be travelled through a charger (see preprocessing.py) cannot be travelled directly
+    for i, j in data.get('detourOnlyArcs', []):
+        if (i, j) in model.x:
+            model.x[i, j].fix(0)
 
     # Add the objective function
     model.obj = pyomo.Objective(
-        expr=sum(data['c'][i][j]*model.x[i, j] for i in model.nodes for j in model.nodes)+ sum((data['c'][i][r]+data['c'][r][j])*model.y[i,r, j] for i in model.nodes for r in model.chargers for j in model.nodes )
+        expr=sum(data['c'][i][j]*model.x[i, j] for i, j in model.arcs)+ sum((data['c'][i][r]+data['c'][r][j])*model.y[i,r, j] for i, r, j in model.chargerArcs)
     )
 
     # Add both the in- and out-degree constraints for the customers
     model.sumToOne = pyomo.ConstraintList()
     for i in model.customers:
         # Out of node i
-        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.nodes) + sum(model.y[i,r, j] for r in model.chargers for j in model.nodes) == 1)
+        model.sumToOne.add(expr=sum(model.x[i, j] + sum(model.y[i,r, j] for r in model.chargersOnArc[i, j]) for j in model.successors[i]) == 1)
         # Into node i
-        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.nodes ) + sum(model.y[j,r, i] for r in model.chargers for j in model.nodes )== 1)
+        model.sumToOne.add(expr=sum(model.x[j, i] + sum(model.y[j,r, i] for r in model.chargersOnArc[j, i]) for j in model.predecessors[i])== 1)
 
     # Add the in- and out-degree constraints for the depot
-    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] for j in model.nodes) + sum(model.y[0,r,j] for r in model.chargers for j in model.nodes) <= data['m'])
-    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] for i in model.nodes) + sum(model.y[i,r,0] for i in model.nodes for r in model.chargers ) <= data['m'])
+    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] + sum(model.y[0,r,j] for r in model.chargersOnArc[0, j]) for j in model.successors[0]) <= data['m'])
+    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] + sum(model.y[i,r,0] for r in model.chargersOnArc[i, 0]) for i in model.predecessors[0]) <= data['m'])
 
     # Add capacity constraints
     model.cap = pyomo.ConstraintList()
-    for i in model.nodes:
-        for j in model.nodes:
-            model.cap.add(expr=(data["Q"]-data["q"][j])*model.x[i,j] + sum((data["Q"]-data["q"][j])*model.y[i,r,j] for r in model.chargers) - model.f[i,j] >= 0)
+    for i, j in model.arcs:
+        model.cap.add(expr=(data["Q"]-data["q"][j])*model.x[i,j] + sum((data["Q"]-data["q"][j])*model.y[i,r,j] for r in model.chargersOnArc[i, j]) - model.f[i,j] >= 0)
 
     # Add flow constraints for customers
     model.flow = pyomo.ConstraintList()
     for i in model.customers:
-        model.flow.add(expr=sum(model.f[i,j] for j in model.nodes) - sum(model.f[j,i] for j in model.nodes) - data["q"][i] == 0)
+        model.flow.add(expr=sum(model.f[i,j] for j in model.successors[i]) - sum(model.f[j,i] for j in model.predecessors[i]) - data["q"][i] == 0)
 
 
     ### EXERCISE: ADD ALL 6 CONSTRAINTS NEEDED TO ENSURE THAT NO VEHICLE BATTERY IS DEPLETED DURING A ROUTE:
@@ -128,32 +166,32 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     # Allow only recharging to happen when a charger is visited
         # Constraint formulation --> epsilon[i][j] - B*sum( r in n+1..n+r ) y[i][r][j] <= 0,         for all i,j=0,...,n
     model.chargeAtChargers=pyomo.ConstraintList()
-    for i in model.nodes:
-        for j in model.nodes:
-            model.chargeAtChargers.add(expr=(model.epsilon[i][j]-data["B"]*sum(model.y[i,r,j] for r in model.chargers)))
+    for i, j in model.arcs:
+        model.chargeAtChargers.add(expr=(model.epsilon[i, j]-data["B"]*sum(model.y[i,r,j] for r in model.chargersOnArc[i, j])) <= 0)
 
 
     # Add constraint ensuring that we do not recharge more than what's possible upon visiting a recharging station
         # Constraint formulation --> epsilon[i][j] + b[i] - B*(1-sum( r in n+1..n+r ) y[i][r][j]) - sum( r in n+1..n+r ) e[i][r]*y[i][r][j] <= B,            for all i,j=0,...,n
     model.maxCharge=pyomo.ConstraintList()
-    for i in model.nodes:
-        for j in model.nodes:
-            model.maxCharge.add(expr=(model.epsilon[i][j]+model.b[i]-data["B"]*(1-sum(model.y[i,r,j] for r in model.chargers))-sum(data["e"][i][r]*model.y[i,r,j] for r in model.chargers)) <=data["B"] )
+    for i, j in model.arcs:
+        model.maxCharge.add(expr=(model.epsilon[i, j]+model.b[i]-data["B"]*(1-sum(model.y[i,r,j] for r in model.chargersOnArc[i, j]))-sum(data["e"][i][r]*model.y[i,r,j] for r in model.chargersOnArc[i, j])) <=data["B"] )
 
     # Add constraints for regulating battery levels during a route:
         # Constraint format --> b[j] - b[i] - epsilon[i][j] + (B + e[i][j])*x[i][j] + (B+e[i][r]+e[r][j])*y[i][r][j] <= B,          for all i =0,...,n for all j =1,...,n for all r=n+1,...,n+r
+    # If no charger can be used on the arc (i,j), only the x[i][j] term is left
     model.regulateBatteryLevel = pyomo.ConstraintList()
-    for i in model.nodes:
-        for j in model.customers:
-            for r in model.chargers:
-                model.regulateBatteryLevel.add(expr=(model.b[j]-model.b[i]-model.epsilon[i][j]+(data["B"]+data["e"][i][j])*model.x[i,j]+(data["B"]+data["e"][i][r]+data["e"][r][j]))<=data["B"])
+    for i, j in model.arcs:
+        if j in model.customers:
+            if not model.chargersOnArc[i, j]:
+                model.regulateBatteryLevel.add(expr=(model.b[j]-model.b[i]-model.epsilon[i, j]+(data["B"]+data["e"][i][j])*model.x[i,j])<=data["B"])
+            for r in model.chargersOnArc[i, j]:
+                model.regulateBatteryLevel.add(expr=(model.b[j]-model.b[i]-model.epsilon[i, j]+(data["B"]+data["e"][i][j])*model.x[i,j]+(data["B"]+data["e"][i][r]+data["e"][r][j])*model.y[i,r,j])<=data["B"])
     # Add constraint for ensuring that we have enough energy to reach a charger
         # Constraint formulation --> b[i] - e[i][r] >= 0,            for all i =1,...,n for all j =0,...,n for all r=n+1,...,n+r
     model.energyForReachingCharger=pyomo.ConstraintList()
-    for i in model.customers:
-        for j in model.nodes:
-            for r in model.chargers:
-                model.energyForReachingCharger.add(expr=(model.b[i]-data["e"][i][r]*model.y[i,r,j])>=0)
+    for i, r, j in model.chargerArcs:
+        if i in model.customers:
+            model.energyForReachingCharger.add(expr=(model.b[i]-data["e"][i][r]*model.y[i,r,j])>=0)
     # Add constraint for ensuring that we have enough energy to return to depot
         # Constraint formulation --> b[i] - e[i][0]*x[i][0] - (e[i][r] + e[r][0])*y[i][r][0] + epsilon[i][0]>= 0,           for all i =1,...,n for all r=n+1,...,n+r
     model.energyForDepotReturn = pyomo.ConstraintList()
@@ -161,119 +199,102 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     ## TIME CONSTRAINTS:
     # Add constraint for regulating time
     model.regulateTime = pyomo.ConstraintList()
-    for i in model.customers:
-        for j in model.customers:
-            model.regulateTime.add(model.tau[i]-model.tau[j]+(data["T"]+data["s"][i]+data["t"][i][j])*model.x[i,j] + sum((data["T"]+data["s"][i]+data["t"][i][r] +data["t"][r][j])*model.y[i,r,j] for r in model.chargers) + data["g"]*model.epsilon[i,j] <= data["T"])
+    for i, j in model.arcs:
+        if i in model.customers and j in model.customers:
+            model.regulateTime.add(model.tau[i]-model.tau[j]+(data["T"]+data["s"][i]+data["t"][i][j])*model.x[i,j] + sum((data["T"]+data["s"][i]+data["t"][i][r] +data["t"][r][j])*model.y[i,r,j] for r in model.chargersOnArc[i, j]) + data["g"]*model.epsilon[i,j] <= data["T"])
 
     # Add constraint for ensuring that we can reach the depot before the end of the workday
     model.returnBeforeT = pyomo.ConstraintList()
-    for i in model.customers:
-        model.returnBeforeT.add(expr= model.tau[i] + (data["s"][i]+data["t"][i][0])*model.x[i,0] + sum((data["s"][i]+data["t"][i][r]+data["t"][r][0])*model.y[i,r,0] for r in model.chargers) <= data["T"])
+    for i in model.predecessors[0]:
+        model.returnBeforeT.add(expr= model.tau[i] + (data["s"][i]+data["t"][i][0])*model.x[i,0] + sum((data["s"][i]+data["t"][i][r]+data["t"][r][0])*model.y[i,r,0] for r in model.chargersOnArc[i, 0]) <= data["T"])
 
     # return the model object
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
+# Solves the model, starting from the current values of the variables if warmstart is True. Returns True if the solver
+# found a solution, which is then loaded into the model
+def solveModel(model: pyomo.ConcreteModel(), warmstart: bool = False, timeLimit: float = None) -> bool:
     solver = pyomo.SolverFactory('gurobi')
-    solver.solve(model, tee=True)
+    if timeLimit is not None:
+        solver.options['TimeLimit'] = timeLimit
+    results = solver.solve(model, tee=True, warmstart=warmstart, load_solutions=False)
+    if len(results.solution) == 0:
+        return False
+    model.solutions.load_from(results)
+    return True
 
 
 def displaySolution(model: pyomo.ConcreteModel(), data: dict):
     print('Total length of the', data['m'], 'tours are', pyomo.value(model.obj))
-    # Find a tour for each vehicle
-    lastRouteStarter = 0
-    # Make flag for checking if coordinates are available
+    # Find a tour for each vehicle from the x[i,j] and y[i,r,j] values. Chargers are shown in brackets
+    displayRoutes(rd.decodeRoutes(model, data), data)
+
+
+# Prints the routes (as dicts, see routeDecoder.py) and their violations, and plots them if coordinates are present
+def displayRoutes(routes: list, data: dict):
+    rd.printRoutes(routes)
+    # Check each route for violations of the capacity, battery and duration limits
+    evaluator = ev.RouteEvaluator(data)
+    for number, route in enumerate(routes, start=1):
+        violated = ev.violations(evaluator.evaluate(route['nodes']))
+        if violated is not None:
+            print('The route for vehicle', number, violated)
+    # Start plotting the solution to a coordinate system if coordinates are present
     coordinatesPresent = ('xCoord' in data) and ('yCoord' in data)
-    # Create a route for each vehicle
-    for vehicle in range(1, data['m'] + 1):
-        # Each route starts at the depot
-        if coordinatesPresent:
-            displayX = [data['xCoord'][0]]
-            displayY = [data['yCoord'][0]]
-            labels = [0]
-        # Find the customer, that starts this route
-        currentNode = 0
-        currentCharger = 0
-        for j in model.customers:
-            ChargerUsed = False
-            for r in model.chargers:
-                if j>lastRouteStarter and pyomo.value(model.y[0,r,j])>=0.9999:
-                    ChargerUsed=True
-                    currentNode=j
-                    currentCharger=r
-                    displayX.append(data['xCoord'][currentCharger])
-                    displayY.append(data['yCoord'][currentCharger])
-                    labels.append(currentCharger)
-                    displayX.append(data['xCoord'][currentNode])
-                    displayY.append(data['yCoord'][currentNode])
-                    labels.append(currentNode)
-                    break
-            if ChargerUsed==True: break
-            if j > lastRouteStarter and pyomo.value(model.x[0, j]) >= 0.9999:
-                currentNode = j
-                if coordinatesPresent:
-                    displayX.append(data['xCoord'][currentNode])
-                    displayY.append(data['yCoord'][currentNode])
-                    labels.append(currentNode)
-                break
-
-        print('The route for vehicle', vehicle, 'is:')
-        if ChargerUsed==True:
-            print('0->', currentCharger,'->', currentNode, end='')
-        else:
-            print('0->', currentNode, end='')
-        lastRouteStarter = currentNode
-
-        # Build the route from currentNode back to the depot
-        while currentNode != 0:
-            for j in model.nodes:
-                ChargerUsed = False
-                for r in model.chargers:
-                    if currentNode !=j and pyomo.value(model.y[currentNode, r, j]) >= 0.9999:
-                        ChargerUsed = True
-                        currentNode = j
-                        currentCharger = r
-                        print('->', r,'->', j,end='')
-                        displayX.append(data['xCoord'][currentCharger])
-                        displayY.append(data['yCoord'][currentCharger])
-                        labels.append(currentCharger)
-                        displayX.append(data['xCoord'][currentNode])
-                        displayY.append(data['yCoord'][currentNode])
-                        labels.append(currentNode)
-                if ChargerUsed==True: break
-                if currentNode != j and pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                    print('->', j, end='')
-                    currentNode = j
-                    if coordinatesPresent:
-                        displayX.append(data['xCoord'][currentNode])
-                        displayY.append(data['yCoord'][currentNode])
-                        labels.append(currentNode)
-                    break
-
-        print('\n')
-        if coordinatesPresent:
-            # Start plotting the solution to a coordinate system if coordinates are present
-            if coordinatesPresent:
-                plt.plot(displayX, displayY, '-')
+    if coordinatesPresent:
+        import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
+        rd.plotRoutes(routes, data, style='-', annotate=False, show=False)
 
     # Plot all nodes if coordinates are present (We use different shapes for depot, customers, and chargers)
     if coordinatesPresent:
         plt.plot(data["xCoord"][0],data["yCoord"][0],"s")
         plt.plot(data["xCoord"][1:data["n"]],data["yCoord"][1:data["n"]],"o")
         plt.plot(data["xCoord"][data["n"]+2:data["n"]+data["r"]+1], data["yCoord"][data["n"]+2:data["n"]+data["r"]+1], "^")
-        for i in model.nodes:
-            plt.annotate(i, (data["xCoord"][i], data["yCoord"][i]))
-        for i in model.chargers:
+        for i in range(data["n"] + data["r"] + 1):
             plt.annotate(i, (data["xCoord"][i], data["yCoord"][i]))
-    plt.show()
+        plt.show()
 
 
-def main(filename: str):
+def main(filename: str, neighbours: int = None, feasibleArcs: bool = True, paretoChargers: bool = True,
+         heuristicStart: bool = True, timeLimit: float = None):
     data = readData(filename)
+    if neighbours is not None:
+        # Only build the model on the arcs between each customer and its nearest neighbours (chargers are not included),
+        # and the arcs to and from the depot
+        cg.addCandidateGraph(data, k=neighbours, numOfPoints=data['n'] + 1, hubs=[0])
+    if feasibleArcs:
+        # Leave out the arcs and detours which use more energy than the battery holds or cannot fit in the workday
+        numOfArcs, numOfDetours = pp.removeInfeasibleArcs(data)
+        print('Feasible arcs:', numOfArcs, 'Feasible detours through chargers:', numOfDetours)
+    if paretoChargers:
+        # Only create y[i][r][j] for the chargers r not dominated by another charger on the arc (i,j)
+        numOfDetours = pp.addParetoChargerArcs(data)
+        print('Detours through chargers kept:', numOfDetours)
+    routes = None
+    if heuristicStart or neighbours is not None:
+        # The routes of the construction heuristic. The table of detours through several chargers is stored next to the
+        # data file, and only computed the first time
+        routes = eh.solve(data, cp.loadOrMakeDetourTable(data, filename))
+    if neighbours is not None:
+        # Put the arcs and detours of the heuristic routes back into the candidate graph, such that the model contains
+        # them. If the routes are feasible and only use single chargers, the model then always has a feasible solution
+        arcs, detours = eh.routeArcs(routes, data)
+        cg.reAddArcs(data, arcs)
+        if 'chargerArcs' in data:
+            data['chargerArcs'] = sorted(set(map(tuple, data['chargerArcs'])) | set(detours))
     model = buildModel(data)
-    solveModel(model)
-    displaySolution(model, data)
+    # Start the solver from the heuristic routes, if the model can represent them
+    warmstart = heuristicStart and eh.setMipStart(model, routes, data)
+    if heuristicStart and not warmstart:
+        print('The heuristic routes cannot be used as a MIP start')
+    if solveModel(model, warmstart=warmstart, timeLimit=timeLimit):
+        displaySolution(model, data)
+    elif routes is not None:
+        print('The solver found no solution. The routes of the heuristic are')
+        displayRoutes(eh.decodedRoutes(routes, data), data)
+    else:
+        print('The solver found no solution')
 
 
 
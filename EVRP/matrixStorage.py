@@ -0,0 +1,186 @@
+# Compact binary storage of distance-like matrices (c, dist, t, e, ...) in .npy sidecar files
+# The files are opened memory-mapped, so a model builder only touches the rows it actually reads, and a 10k-node matrix
+# never has to be held in memory as Python lists.
+# A matrix is stored as follows
+# - If the matrix is symmetric, only the upper triangle (including the diagonal) is stored, row by row, as a one
+#   dimensional array of length n(n+1)/2. Otherwise the full n x n matrix is stored.
+# - If all values are integers, the narrowest integer type holding all of them is used (e.g. uint8 or int16).
+#   Otherwise the values are stored as 64 bit floats.
+# Hence the dimension of the stored array tells whether the matrix was stored as a triangle or not.
+# The narrow types are only used on disk. Every value read is widened to a Python int or float (and every row or array
+# to int64 or float64), such that sums of distances read from the matrix cannot wrap around.
+
+import os           # Used for checking if a sidecar file is up to date
+import numpy as np  # Used for storing the matrices
+
+# Number of rows handled at a time, when checking and writing a matrix
+ROW_BLOCK = 1024
+
+
+# Returns the name of the sidecar file storing the matrix data[key] of the data file fileName
+def matrixFileName(fileName: str, key: str) -> str:
+    return fileName + '_' + key + '.npy'
+
+
+# Returns True if the sidecar file matrixFile exists and is newer than the data file it was made from
+def isUpToDate(matrixFile: str, sourceFile: str) -> bool:
+    return os.path.exists(matrixFile) and os.path.getmtime(matrixFile) >= os.path.getmtime(sourceFile)
+
+
+# Returns the position of element (i,i) in the stored upper triangle of an n x n matrix
+def triangleOffset(i, n: int):
+    return i * n - i * (i - 1) // 2
+
+
+# Returns the number of rows of a matrix, whose upper triangle is stored in an array of the given length
+def triangleSize(length: int) -> int:
+    return int((np.sqrt(8 * length + 1) - 1) // 2)
+
+
+# Returns the narrowest data type able to hold all values of the matrix without loss
+def narrowestDtype(matrix: np.ndarray) -> np.dtype:
+    if matrix.dtype.kind in 'iub':
+        isIntegral = True
+    else:
+        isIntegral = all(np.array_equal(matrix[start:start + ROW_BLOCK], np.round(matrix[start:start + ROW_BLOCK]))
+                         for start in range(0, len(matrix), ROW_BLOCK))
+    if not isIntegral or matrix.size == 0:
+        return np.dtype(np.float64)
+    smallest, largest = int(matrix.min()), int(matrix.max())
+    for dtype in [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.uint64, np.int64]:
+        if np.iinfo(dtype).min <= smallest and largest <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.float64)
+
+
+# Returns the type the values of a matrix stored with the given type are read as: int64 for integers (uint64 is kept,
+# as it may not fit) and float64 otherwise
+def widenedDtype(dtype: np.dtype) -> np.dtype:
+    if dtype.kind == 'f':
+        return np.dtype(np.float64)
+    return np.dtype(np.uint64) if dtype == np.uint64 else np.dtype(np.int64)
+
+
+# Returns True if the square matrix equals its transpose
+def isSymmetric(matrix: np.ndarray) -> bool:
+    return all(np.array_equal(matrix[start:start + ROW_BLOCK], matrix[:, start:start + ROW_BLOCK].T)
+               for start in range(0, len(matrix), ROW_BLOCK))
+
+
+# Saves a square matrix (list of lists or array) to the sidecar file fileName in the compact format described above
+def saveMatrix(matrix, fileName: str):
+    matrix = np.asarray(matrix)
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError('Only square matrices can be stored, got shape ' + str(matrix.shape))
+    n = len(matrix)
+    dtype = narrowestDtype(matrix)
+    symmetric = isSymmetric(matrix)
+    shape = (triangleOffset(n, n),) if symmetric else (n, n)
+    # Write to a temporary file first, such that a half written file is never read
+    temporaryName = fileName + '.' + str(os.getpid()) + '.tmp'
+    stored = np.lib.format.open_memmap(temporaryName, mode='w+', dtype=dtype, shape=shape)
+    if symmetric:
+        for i in range(n):
+            stored[triangleOffset(i, n):triangleOffset(i + 1, n)] = matrix[i, i:]
+    else:
+        for start in range(0, n, ROW_BLOCK):
+            stored[start:start + ROW_BLOCK] = matrix[start:start + ROW_BLOCK]
+    stored.flush()
+    del stored
+    os.replace(temporaryName, fileName)
+
+
+# A read only view of a matrix saved with saveMatrix. Nothing but the file header is read when it is created.
+# matrix[i][j], matrix[i, j], matrix.row(i) and len(matrix) work as for a list of lists or an array, and only the
+# rows actually used are read from the memory-mapped file. The values are returned in the widened type (see the top)
+class StoredMatrix:
+    def __init__(self, fileName: str):
+        self.values = np.load(fileName, mmap_mode='r')
+        self.symmetric = self.values.ndim == 1
+        self.n = triangleSize(len(self.values)) if self.symmetric else len(self.values)
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def shape(self) -> tuple:
+        return self.n, self.n
+
+    # The type of the values returned, not the (narrower) type stored on disk
+    @property
+    def dtype(self) -> np.dtype:
+        return widenedDtype(self.values.dtype)
+
+    # Returns element (i,j) as a Python int or float
+    def element(self, i: int, j: int):
+        if not self.symmetric:
+            return self.values[i, j].item()
+        if i > j:
+            i, j = j, i
+        return self.values[triangleOffset(i, self.n) + j - i].item()
+
+    # Returns row i as an array in memory
+    def row(self, i: int) -> np.ndarray:
+        if not self.symmetric:
+            return self.values[i].astype(self.dtype)
+        n = self.n
+        row = np.empty(n, dtype=self.dtype)
+        row[i:] = self.values[triangleOffset(i, n):triangleOffset(i + 1, n)]
+        above = np.arange(i)
+        row[:i] = self.values[triangleOffset(above, n) + i - above]
+        return row
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            return self.element(*index)
+        if not self.symmetric:
+            return self.values[index].astype(self.dtype)
+        return StoredMatrixRow(self, index)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.row(i)
+
+    # Returns the full matrix as an array in memory
+    def toArray(self) -> np.ndarray:
+        if not self.symmetric:
+            return np.array(self.values, dtype=self.dtype)
+        return np.array([self.row(i) for i in range(self.n)], dtype=self.dtype).reshape(self.n, self.n)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.toArray() if dtype is None else self.toArray().astype(dtype)
+
+    def tolist(self) -> list:
+        return self.toArray().tolist()
+
+
+# Row i of a stored triangular matrix. Elements are looked up one at a time, so matrix[i][j] costs O(1) and the row is
+# never copied unless it is converted to an array
+class StoredMatrixRow:
+    def __init__(self, matrix: StoredMatrix, i: int):
+        self.matrix = matrix
+        self.i = i
+
+    def __len__(self) -> int:
+        return self.matrix.n
+
+    def __getitem__(self, j):
+        if isinstance(j, (int, np.integer)):
+            return self.matrix.element(self.i, j)
+        return self.matrix.row(self.i)[j]
+
+    def __iter__(self):
+        return iter(self.matrix.row(self.i))
+
+    def __array__(self, dtype=None, copy=None):
+        row = self.matrix.row(self.i)
+        return row if dtype is None else row.astype(dtype)
+
+
+# Returns the matrix stored for data[key] of the data file fileName as a StoredMatrix. If no up to date sidecar file
+# exists, the matrix is first computed by makeMatrix(data) and saved
+def loadOrMakeMatrix(data: dict, fileName: str, key: str, makeMatrix) -> StoredMatrix:
+    sidecarName = matrixFileName(fileName, key)
+    if not isUpToDate(sidecarName, fileName):
+        saveMatrix(makeMatrix(data), sidecarName)
+    return StoredMatrix(sidecarName)
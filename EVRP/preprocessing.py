@@ -0,0 +1,154 @@
+# Preprocessing of the data of the electric vehicle routing problem (EVRP) for the course "Modellering inden for
+# Prescriptive Analytics"
+# The model of main.py has a variable y[i][r][j] for every arc (i,j) and every charger r, and the battery constraints
+# add a row for each of them. For most arcs only a few of the chargers are worth visiting: a detour i -> r' -> j
+# dominates the detour i -> r -> j, if it is at most as long (c[i][r'] + c[r'][j]), at most as slow
+# (t[i][r'] + t[r'][j]) and uses at most as much energy both before and after the charger (e[i][r'] and e[r'][j]) as
+# the detour through r.
+# Any solution using r can then use r' instead, with the same battery levels and arrival times or better ones, so only
+# the detours which are not dominated (the Pareto-optimal ones) are needed.
+# The energy before and after the charger is compared separately, since the vehicle must reach the charger on the
+# battery it has left, and can at most recharge to B. Detours equal in all four criteria are dominated by the one
+# through the charger with the lowest index, so exactly one of them is kept.
+# addParetoChargerArcs(...) stores the triples (i,r,j) of the detours kept as data['chargerArcs'], which
+# makeChargerArcSet(...) of main.py uses instead of every charger on every arc.
+# Before that, removeInfeasibleArcs(...) leaves out the arcs and detours which no route can use, because
+# - the energy of a leg (e[i][j] of a direct arc, or e[i][r] or e[r][j] of a detour) exceeds the battery capacity B
+# - the shortest route from the depot through the arc (or detour) and back to the depot, including the service times s
+#   and the recharging needed on a detour, takes longer than the workday T
+# The shortest travel times from and to the depot are found by Floyd-Warshall on t, so the test is valid even if t
+# does not satisfy the triangle inequality. An arc is kept if it can be travelled directly or through at least one
+# charger. The arcs which can only be travelled through a charger are stored as data['detourOnlyArcs'], and buildModel
+# fixes their x[i][j] to 0.
+
+import numpy as np  # Used for comparing the detours
+
+# The largest number of booleans compared at once. The arcs are handled in chunks, such that memory stays bounded
+CHUNK_SIZE = 2 ** 22
+
+
+# Returns the arcs (i,j) the detours are found for as two arrays (tails and heads): the arcs in data['arcs'] if present
+# (e.g. a sparse candidate graph), otherwise all pairs of distinct nodes among the depot and the customers
+def arcsFromData(data: dict) -> tuple:
+    if 'arcs' in data:
+        ends = np.array([(i, j) for i, j in data['arcs'] if i != j], dtype=np.int64).reshape(-1, 2)
+        return ends[:, 0], ends[:, 1]
+    tails, heads = np.nonzero(~np.eye(data['n'] + 1, dtype=bool))
+    return tails, heads
+
+
+# Returns the matrix of the shortest travel times between all pairs of nodes, found by the Floyd-Warshall algorithm
+def shortestTimes(t) -> np.ndarray:
+    shortest = np.array(t, dtype=float)
+    np.fill_diagonal(shortest, 0)
+    for k in range(len(shortest)):
+        np.minimum(shortest, shortest[:, [k]] + shortest[k], out=shortest)
+    return shortest
+
+
+# Returns two arrays for the depot and the customers: the earliest time the vehicle can leave each node after serving
+# it, and the shortest time from arriving at each node until the vehicle is back at the depot
+def timesToAndFromDepot(data: dict) -> tuple:
+    numOfVNodes = data['n'] + 1
+    shortest = shortestTimes(data['t'])
+    service = np.asarray(data['s'], dtype=float)[:numOfVNodes]
+    return shortest[0, :numOfVNodes] + service, service + shortest[:numOfVNodes, 0]
+
+
+# Returns a boolean array of shape (arcs, chargers), which is True for the detours tails[a] -> chargers[k] -> heads[a]
+# whose legs both use at most B energy, and which fit in a route no longer than T. The vehicle arrives at the charger
+# with at most B - e[i][r] energy, so it must recharge at least e[i][r] + e[r][j] - B to reach j
+def feasibleDetours(data: dict, tails: np.ndarray, heads: np.ndarray, chargers: np.ndarray) -> np.ndarray:
+    e, t = (np.asarray(data[key], dtype=float) for key in ['e', 't'])
+    earliestLeave, shortestReturn = timesToAndFromDepot(data)
+    energyIn, energyOut = e[np.ix_(tails, chargers)], e[np.ix_(chargers, heads)].T
+    duration = (earliestLeave[tails][:, np.newaxis] + t[np.ix_(tails, chargers)] + t[np.ix_(chargers, heads)].T
+                + data['g'] * np.maximum(energyIn + energyOut - data['B'], 0) + shortestReturn[heads][:, np.newaxis])
+    return (energyIn <= data['B']) & (energyOut <= data['B']) & (duration <= data['T'])
+
+
+# Returns a boolean array, which is True for the arcs tails[a] -> heads[a] which can be travelled directly, i.e. using
+# at most B energy in a route no longer than T
+def feasibleDirectArcs(data: dict, tails: np.ndarray, heads: np.ndarray) -> np.ndarray:
+    e, t = (np.asarray(data[key], dtype=float) for key in ['e', 't'])
+    earliestLeave, shortestReturn = timesToAndFromDepot(data)
+    duration = earliestLeave[tails] + t[tails, heads] + shortestReturn[heads]
+    return (e[tails, heads] <= data['B']) & (duration <= data['T'])
+
+
+# Leaves out the arcs and detours which no route can use (see the top of the file) by storing the others as
+# data['arcs'] and data['chargerArcs'], and the arcs which can only be travelled through a charger as
+# data['detourOnlyArcs']. Arcs and triples already left out of the data stay out. Returns the number of arcs and detours
+# kept
+def removeInfeasibleArcs(data: dict) -> tuple:
+    tails, heads = arcsFromData(data)
+    chargers = np.arange(data['n'] + 1, data['n'] + data['r'] + 1)
+    isFeasible = feasibleDetours(data, tails, heads, chargers)
+    if 'chargerArcs' in data:
+        isFeasible &= candidateDetours(data, tails, heads, chargers)
+    isDirect = feasibleDirectArcs(data, tails, heads)
+    isKept = isDirect | isFeasible.any(axis=1)
+    arcs, indices = np.nonzero(isFeasible)
+    data['chargerArcs'] = list(zip(tails[arcs].tolist(), chargers[indices].tolist(), heads[arcs].tolist()))
+    data['detourOnlyArcs'] = list(zip(tails[isKept & ~isDirect].tolist(), heads[isKept & ~isDirect].tolist()))
+    data['arcs'] = list(zip(tails[isKept].tolist(), heads[isKept].tolist()))
+    return len(data['arcs']), len(data['chargerArcs'])
+
+
+# Returns the array of the criteria of the detours tails[a] -> chargers[k] -> heads[a] of shape (arcs, chargers, 4).
+# The criteria are the distance, the travel time, and the energy used before and after the charger
+def detourCriteria(data: dict, tails: np.ndarray, heads: np.ndarray, chargers: np.ndarray) -> np.ndarray:
+    c, t, e = (np.asarray(data[key], dtype=float) for key in ['c', 't', 'e'])
+    return np.stack([c[np.ix_(tails, chargers)] + c[np.ix_(chargers, heads)].T,
+                     t[np.ix_(tails, chargers)] + t[np.ix_(chargers, heads)].T,
+                     e[np.ix_(tails, chargers)],
+                     e[np.ix_(chargers, heads)].T], axis=2)
+
+
+# Returns a boolean array of shape (arcs, chargers), which is True for the triples (i,r,j) in data['chargerArcs']
+def candidateDetours(data: dict, tails: np.ndarray, heads: np.ndarray, chargers: np.ndarray) -> np.ndarray:
+    arcIndex = {(i, j): a for a, (i, j) in enumerate(zip(tails.tolist(), heads.tolist()))}
+    isCandidate = np.zeros((len(tails), len(chargers)), dtype=bool)
+    for i, r, j in data['chargerArcs']:
+        if (int(i), int(j)) in arcIndex:
+            isCandidate[arcIndex[int(i), int(j)], int(r) - int(chargers[0])] = True
+    return isCandidate
+
+
+# Returns a boolean array of shape (arcs, chargers), which is True for the detours dominated by another candidate detour
+# on the same arc. isCandidate (same shape) marks the detours which may be used at all
+def dominatedDetours(criteria: np.ndarray, isCandidate: np.ndarray) -> np.ndarray:
+    numOfArcs, numOfChargers = isCandidate.shape
+    # isEarlier[k][l] is True if charger k has a lower index than charger l, which breaks the ties
+    isEarlier = np.triu(np.ones((numOfChargers, numOfChargers), dtype=bool), 1)
+    isDominated = np.zeros((numOfArcs, numOfChargers), dtype=bool)
+    chunk = max(1, CHUNK_SIZE // max(numOfChargers * numOfChargers * criteria.shape[2], 1))
+    for start in range(0, numOfArcs, chunk):
+        block = criteria[start:start + chunk]
+        # The detour through charger k (axis 1) compared to the detour through charger l (axis 2) on each arc
+        isNoWorse = (block[:, :, np.newaxis, :] <= block[:, np.newaxis, :, :]).all(axis=3)
+        isBetter = (block[:, :, np.newaxis, :] < block[:, np.newaxis, :, :]).any(axis=3)
+        dominates = isNoWorse & (isBetter | isEarlier) & isCandidate[start:start + chunk, :, np.newaxis]
+        isDominated[start:start + chunk] = dominates.any(axis=1)
+    return isDominated
+
+
+# Returns the triples (i,r,j) of the Pareto-optimal detours through a charger on the arcs of the data (see
+# arcsFromData(...)). If the data contains a list of triples, only these are considered
+def paretoChargerArcs(data: dict) -> list:
+    tails, heads = arcsFromData(data)
+    chargers = np.arange(data['n'] + 1, data['n'] + data['r'] + 1)
+    if 'chargerArcs' in data:
+        isCandidate = candidateDetours(data, tails, heads, chargers)
+    else:
+        isCandidate = np.ones((len(tails), len(chargers)), dtype=bool)
+    isKept = isCandidate & ~dominatedDetours(detourCriteria(data, tails, heads, chargers), isCandidate)
+    arcs, indices = np.nonzero(isKept)
+    return list(zip(tails[arcs].tolist(), chargers[indices].tolist(), heads[arcs].tolist()))
+
+
+# Keeps only the Pareto-optimal detours through a charger by storing them as data['chargerArcs'], and returns the number
+# of detours kept
+def addParetoChargerArcs(data: dict) -> int:
+    data['chargerArcs'] = paretoChargerArcs(data)
+    return len(data['chargerArcs'])
@@ -0,0 +1,134 @@
+# Feasibility of routes of the electric vehicle routing problem (EVRP) for the course "Modellering inden for
+# Prescriptive Analytics"
+# A route is an array of nodes starting and ending at the depot 0, where the nodes n+1,...,n+r are chargers. The vehicle
+# leaves the depot with a full battery B and recharges at a charger only what it needs to reach the next charger or the
+# depot, at g time per unit. A route is feasible if
+# - the total demand of its customers is at most Q
+# - each segment of the route between two chargers (or the depot) uses at most B energy
+# - its duration (travel times, service times and recharging) is at most T
+# With this recharging policy the vehicle arrives empty at every charger after the first one it recharges at, so the
+# total energy recharged on a route using E energy is max(0, E - B) whenever every segment is feasible. Hence the
+# duration only depends on the totals of the route.
+# RouteEvaluator.evaluate(...) computes the load, the battery level at each node and the duration of a route in
+# O(len) time. RouteEvaluator.labels(...) computes the totals of a route together with the energy used since the last
+# charger before each node and until the first charger after it. From these, canInsert(...) and canRemove(...) check
+# in O(1) time whether a customer or a charger can be inserted into or removed from the route, which is what
+# construction and local search heuristics do most of the time.
+
+import numpy as np  # Used for storing the routes and the data
+
+# Tolerance used when comparing the resources to their limits
+TOLERANCE = 1e-9
+
+
+class RouteEvaluator:
+    # Reads the data of the instance into arrays once, such that each check only does a few lookups
+    def __init__(self, data: dict):
+        self.n = data['n']
+        self.c, self.t, self.e = (np.asarray(data[key], dtype=float) for key in ['c', 't', 'e'])
+        numOfNodes = len(self.c)
+        # Demands and service times of the chargers are 0
+        self.q, self.s = np.zeros(numOfNodes), np.zeros(numOfNodes)
+        self.q[:self.n + 1] = np.asarray(data['q'], dtype=float)[:self.n + 1]
+        self.s[:self.n + 1] = np.asarray(data['s'], dtype=float)[:self.n + 1]
+        self.Q, self.B, self.T, self.g = data['Q'], data['B'], data['T'], data['g']
+
+    def isCharger(self, node) -> bool:
+        return node > self.n
+
+    # Returns the route visiting the nodes in the given order as a dict with
+    #     'nodes'     : array of the nodes
+    #     'load', 'distance', 'energy', 'duration' : the totals of the route
+    #     'battery'   : array of the battery level when arriving at each node
+    #     'recharged' : array of the energy recharged at each node (only positive at chargers)
+    #     'arrival'   : array of the time of arriving at each node
+    #     'isLoadFeasible', 'isBatteryFeasible', 'isTimeFeasible', 'isFeasible' : whether the limits are respected
+    def evaluate(self, nodes) -> dict:
+        nodes = np.asarray(nodes, dtype=np.int64)
+        tails, heads = nodes[:-1], nodes[1:]
+        legEnergy, legTime = self.e[tails, heads], self.t[tails, heads]
+        # The energy used by each segment of the route, i.e. from the depot or a charger to the next charger or depot
+        segmentOf = np.cumsum(self.isCharger(tails))
+        segmentEnergy = np.bincount(segmentOf, weights=legEnergy, minlength=1)
+        battery, recharged, arrival = np.empty(len(nodes)), np.zeros(len(nodes)), np.empty(len(nodes))
+        level, time = self.B, 0.0
+        battery[0], arrival[0] = level, time
+        for k in range(len(heads)):
+            level -= legEnergy[k]
+            time += self.s[tails[k]] + self.g * recharged[k] + legTime[k]
+            battery[k + 1], arrival[k + 1] = level, time
+            if self.isCharger(heads[k]) and k + 1 < len(heads):
+                # Recharge only what is needed to reach the next charger or the depot
+                recharged[k + 1] = max(segmentEnergy[segmentOf[k] + 1] - level, 0)
+                level += recharged[k + 1]
+        route = {'nodes': nodes, 'load': float(self.q[nodes].sum()), 'distance': float(self.c[tails, heads].sum()),
+                 'energy': float(legEnergy.sum()), 'duration': float(arrival[-1] + self.s[nodes[-1]]),
+                 'battery': battery, 'recharged': recharged, 'arrival': arrival}
+        route['isLoadFeasible'] = route['load'] <= self.Q + TOLERANCE
+        route['isBatteryFeasible'] = bool((segmentEnergy <= self.B + TOLERANCE).all())
+        route['isTimeFeasible'] = route['duration'] <= self.T + TOLERANCE
+        route['isFeasible'] = route['isLoadFeasible'] and route['isBatteryFeasible'] and route['isTimeFeasible']
+        return route
+
+    # Returns the duration of a route with the given travel and service time and energy, if every segment is feasible
+    def duration(self, time: float, energy: float) -> float:
+        return time + self.g * max(energy - self.B, 0)
+
+    # Returns the labels of the route used by canInsert(...) and canRemove(...) as a dict with
+    #     'nodes'  : array of the nodes
+    #     'load', 'distance', 'energy', 'time' : the totals of the route, where time is the travel and service time
+    #     'since'  : array of the energy used from the last charger (or the depot) at or before each node to the node
+    #     'until'  : array of the energy used from each node to the first charger (or the depot) at or after the node
+    def labels(self, nodes) -> dict:
+        nodes = np.asarray(nodes, dtype=np.int64)
+        legEnergy = self.e[nodes[:-1], nodes[1:]]
+        isCharger = self.isCharger(nodes)
+        since, until = np.zeros(len(nodes)), np.zeros(len(nodes))
+        for k in range(1, len(nodes)):
+            since[k] = 0.0 if isCharger[k] else since[k - 1] + legEnergy[k - 1]
+        for k in range(len(nodes) - 2, -1, -1):
+            until[k] = 0.0 if isCharger[k] else until[k + 1] + legEnergy[k]
+        return {'nodes': nodes, 'load': float(self.q[nodes].sum()),
+                'distance': float(self.c[nodes[:-1], nodes[1:]].sum()), 'energy': float(legEnergy.sum()),
+                'time': float(self.t[nodes[:-1], nodes[1:]].sum() + self.s[nodes].sum()),
+                'since': since, 'until': until}
+
+    # Returns whether the route is feasible after inserting node (a customer or a charger) before the given position,
+    # and the change of the distance. Takes O(1) time
+    def canInsert(self, labels: dict, node: int, position: int) -> tuple:
+        a, b = labels['nodes'][position - 1], labels['nodes'][position]
+        e, t = self.e, self.t
+        if self.isCharger(node):
+            # The segment through a and b is split in two at the charger
+            isBatteryFeasible = (labels['since'][position - 1] + e[a, node] <= self.B + TOLERANCE
+                                 and e[node, b] + labels['until'][position] <= self.B + TOLERANCE)
+        else:
+            isBatteryFeasible = (labels['since'][position - 1] + e[a, node] + e[node, b] + labels['until'][position]
+                                 <= self.B + TOLERANCE)
+        energy = labels['energy'] + e[a, node] + e[node, b] - e[a, b]
+        time = labels['time'] + t[a, node] + t[node, b] - t[a, b] + self.s[node]
+        isFeasible = (isBatteryFeasible and labels['load'] + self.q[node] <= self.Q + TOLERANCE
+                      and self.duration(time, energy) <= self.T + TOLERANCE)
+        return isFeasible, float(self.c[a, node] + self.c[node, b] - self.c[a, b])
+
+    # Returns whether the route is feasible after removing the node (a customer or a charger) at the given position, and
+    # the change of the distance. Takes O(1) time
+    def canRemove(self, labels: dict, position: int) -> tuple:
+        a, node, b = labels['nodes'][position - 1:position + 2]
+        e, t = self.e, self.t
+        # The segments before and after the node are joined by the arc (a, b)
+        isBatteryFeasible = (labels['since'][position - 1] + e[a, b] + labels['until'][position + 1]
+                             <= self.B + TOLERANCE)
+        energy = labels['energy'] - e[a, node] - e[node, b] + e[a, b]
+        time = labels['time'] - t[a, node] - t[node, b] + t[a, b] - self.s[node]
+        isFeasible = isBatteryFeasible and self.duration(time, energy) <= self.T + TOLERANCE
+        return isFeasible, float(self.c[a, b] - self.c[a, node] - self.c[node, b])
+
+
+# Returns a line describing the limits violated by the evaluated route, or None if it is feasible
+def violations(route: dict) -> str:
+    if route['isFeasible']:
+        return None
+    violated = [name for name, key in [('capacity', 'isLoadFeasible'), ('battery', 'isBatteryFeasible'),
+                                       ('duration', 'isTimeFeasible')] if not route[key]]
+    return 'Violates the ' + ', '.join(violated) + ' limit(s)'
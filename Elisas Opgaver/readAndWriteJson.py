@@ -1,19 +1,401 @@
 import json as js
+import hashlib as hl    # Used for keying the binary cache on the content of the Json file
+import os               # Used for handling the binary cache files
+import re               # Used for splitting numeric lists when reading a Json file as a stream
+from collections import abc  # Used for making lazily read Json files behave like dictionaries
 
+# Setting this environment variable to 1 makes every call to readJsonFileToDictionary use the binary cache
+CACHE_ENVIRONMENT_VARIABLE = 'RWJSON_CACHE'
+# Names used inside a cache file for storing the content hash and the keys stored as Json text
+CACHE_HASH_KEY = '__hash__'
+CACHE_JSON_KEYS = '__jsonKeys__'
 
-def readJsonFileToDictionary(fileName: str) -> dict:
+
+# Reads a Json file, and returns a dictionary corresponding to the data in the Json file
+# If useCache is True (or the environment variable RWJSON_CACHE is 1) the data is read from a binary sidecar file
+# instead, and numeric (nested) lists are returned as NumPy arrays. See readCachedJsonFile
+def readJsonFileToDictionary(fileName: str, useCache: bool = None) -> dict:
+    if useCache is None:
+        useCache = os.environ.get(CACHE_ENVIRONMENT_VARIABLE, '0') == '1'
+    if useCache:
+        return readCachedJsonFile(fileName)
     with open(fileName) as d:
         dictionary = js.load(d)
     return dictionary
 
 
+# Returns the name of the binary sidecar file used for caching the Json file fileName
+def cacheFileName(fileName: str) -> str:
+    return fileName + '.npz'
+
+
+# Reads a Json file through a binary .npz sidecar file stored next to it. The sidecar is keyed by a hash of the
+# content of the Json file, so it is rebuilt automatically whenever the Json file changes.
+# Every value which is a rectangular (nested) list of numbers is returned as a NumPy array, numbers are returned as
+# Python ints and floats, and everything else (strings, lists of strings, ragged lists, ...) is returned exactly as
+# the Json module would have returned it
+def readCachedJsonFile(fileName: str) -> dict:
+    import numpy as np  # Only needed when the cache is used
+    with open(fileName, 'rb') as d:
+        content = d.read()
+    contentHash = hl.sha1(content).hexdigest()
+    sidecarName = cacheFileName(fileName)
+    if os.path.exists(sidecarName):
+        try:
+            with np.load(sidecarName, allow_pickle=False) as cache:
+                if str(cache[CACHE_HASH_KEY]) == contentHash:
+                    return cacheToDictionary(cache)
+        except (OSError, ValueError, KeyError):
+            pass  # A broken or outdated sidecar is simply rebuilt below
+    dictionary = js.loads(content)
+    arrays = dictionaryToCache(dictionary)
+    arrays[CACHE_HASH_KEY] = np.array(contentHash)
+    # Write to a temporary file first, so parallel runs never see a half written sidecar
+    temporaryName = sidecarName + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(temporaryName, 'wb') as outfile:
+            np.savez(outfile, **arrays)
+        os.replace(temporaryName, sidecarName)
+    except OSError:
+        # The cache is only an optimisation. If it cannot be written, the data is returned anyway
+        if os.path.exists(temporaryName):
+            os.remove(temporaryName)
+    return cacheToDictionary(arrays)
+
+
+# Converts a dictionary read from a Json file to a dictionary of NumPy arrays, which can be saved with numpy.savez
+def dictionaryToCache(dictionary: dict) -> dict:
+    import numpy as np
+    arrays = {}
+    jsonKeys = []
+    for key, value in dictionary.items():
+        array = None
+        if isinstance(value, (list, int, float)) and not isinstance(value, bool):
+            try:
+                array = np.asarray(value)
+            except (ValueError, OverflowError):
+                array = None
+            # Only numbers are stored as arrays. Strings, ragged lists, null values etc. are stored as Json text
+            if array is not None and array.dtype.kind not in 'iuf':
+                array = None
+        if array is None:
+            array = np.array(js.dumps(value))
+            jsonKeys.append(key)
+        arrays[key] = array
+    arrays[CACHE_JSON_KEYS] = np.array(js.dumps(jsonKeys))
+    return arrays
+
+
+# Converts the content of a cache file (or the dictionary of arrays it was saved from) back to a dictionary
+def cacheToDictionary(cache) -> dict:
+    jsonKeys = set(js.loads(str(cache[CACHE_JSON_KEYS])))
+    dictionary = {}
+    for key in cache.keys():
+        if key in (CACHE_HASH_KEY, CACHE_JSON_KEYS):
+            continue
+        value = cache[key]
+        if key in jsonKeys:
+            dictionary[key] = js.loads(str(value))
+        elif value.ndim == 0:
+            dictionary[key] = value.item()
+        else:
+            dictionary[key] = value
+    return dictionary
+
+
+# Reads a Json file containing a single object one chunk at a time, and returns it as a dictionary.
+# Every value which is a rectangular (nested) list of numbers, and whose key is in arrayKeys (all keys if arrayKeys is
+# None), is parsed straight into a NumPy array without ever building the nested Python lists. All other values are
+# parsed by the json module one value at a time, so they are returned exactly as readJsonFileToDictionary would.
+# If the shape of an array is known in advance, it can be given in shapes (e.g. {'dist': (99, 99)}), and the array is
+# then filled into a preallocated buffer. Otherwise the buffer grows as the numbers are read
+def readJsonFileStreaming(fileName: str, arrayKeys: list = None, shapes: dict = None, chunkSize: int = 1 << 16) -> dict:
+    shapes = {} if shapes is None else shapes
+    dictionary = {}
+    with open(fileName, 'rb') as d:
+        stream = JsonByteStream(d, chunkSize)
+        stream.expect(b'{')
+        if stream.peek() == b'}':
+            return dictionary
+        while True:
+            key = stream.readValue()
+            stream.expect(b':')
+            dictionary[key] = readStreamValue(stream, arrayKeys is None or key in arrayKeys, shapes.get(key))
+            if stream.peek() == b'}':
+                return dictionary
+            stream.expect(b',')
+
+
+# A binary file read in chunks, keeping the bytes not yet parsed in a buffer. Used by readJsonFileStreaming
+class JsonByteStream:
+    whitespace = b' \t\r\n'
+
+    def __init__(self, file, chunkSize: int):
+        self.file = file
+        self.chunkSize = chunkSize
+        self.buffer = b''
+        self.position = 0  # Position in the file of the first byte in the buffer
+
+    # Reads the next chunk into the buffer. Returns False at the end of the file
+    def fill(self, size: int = None) -> bool:
+        chunk = self.file.read(size or self.chunkSize)
+        self.buffer += chunk
+        return len(chunk) > 0
+
+    # Removes the first n bytes of the buffer
+    def consume(self, n: int):
+        self.buffer = self.buffer[n:]
+        self.position += n
+
+    # Continues reading from the given position in the file
+    def seek(self, position: int):
+        self.file.seek(position)
+        self.buffer = b''
+        self.position = position
+
+    # Returns the next byte which is not whitespace (without consuming it), or b'' at the end of the file
+    def peek(self) -> bytes:
+        while True:
+            stripped = self.buffer.lstrip(self.whitespace)
+            self.consume(len(self.buffer) - len(stripped))
+            if self.buffer or not self.fill():
+                return self.buffer[:1]
+
+    def expect(self, token: bytes):
+        if self.peek() != token:
+            raise js.JSONDecodeError('Expecting ' + repr(token.decode()), '', self.position)
+        self.consume(1)
+
+    # Parses the next Json value with the json module and returns it
+    def readValue(self):
+        self.peek()
+        decoder = js.JSONDecoder()
+        readSize = self.chunkSize
+        while True:
+            try:
+                text = self.buffer.decode('utf-8')
+                value, end = decoder.raw_decode(text)
+                # A number may continue in the next chunk, so only accept it if something else follows it
+                if end < len(text) and text[end] not in '0123456789.eE+-' or not self.fill(readSize):
+                    self.consume(len(text[:end].encode('utf-8')))
+                    return value
+            except (js.JSONDecodeError, UnicodeDecodeError):
+                # The value (or a character) may be cut by the end of the buffer, so read more and try again
+                if not self.fill(readSize):
+                    raise
+            readSize *= 2
+
+    # Skips the next Json value without decoding it, and returns the position in the file just after it.
+    # Only quotes, backslashes and brackets are looked at, so skipping even a large list of numbers is cheap
+    def skipValue(self) -> int:
+        if self.peek() not in (b'"', b'[', b'{'):
+            # A number, true, false or null ends at the next separator
+            while True:
+                match = re.search(rb'[,}\]\s]', self.buffer)
+                if match is not None or not self.fill():
+                    self.consume(match.start() if match is not None else len(self.buffer))
+                    return self.position
+        special = re.compile(rb'["\\\[\]{}]')
+        specialInString = re.compile(rb'["\\]')
+        depth = 0
+        inString = False
+        index = 0
+        while True:
+            match = (specialInString if inString else special).search(self.buffer, index)
+            if match is None or match.group() == b'\\' and match.end() == len(self.buffer):
+                # Nothing more of interest in the buffer (or an escape cut by its end), so drop it and read more
+                self.consume(len(self.buffer) if match is None else match.start())
+                index = 0
+                if not self.fill():
+                    raise js.JSONDecodeError('Unterminated value', '', self.position)
+                continue
+            character = match.group()
+            index = match.end()
+            if character == b'\\':
+                index += 1
+            elif character == b'"':
+                inString = not inString
+                if not inString and depth == 0:
+                    break
+            elif character in (b'[', b'{'):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    break
+        self.consume(index)
+        return self.position
+
+
+# Reads the next value of the stream. If asArray is True and the value is a rectangular list of numbers, it is returned
+# as a NumPy array (see readNumericArray). Otherwise it is decoded by the json module
+def readStreamValue(stream: JsonByteStream, asArray: bool, shape: tuple = None):
+    if asArray and stream.peek() == b'[':
+        valueStart = stream.position
+        value = readNumericArray(stream, shape)
+        if value is not None:
+            return value
+        # Not a rectangular list of numbers, so parse it the usual way instead
+        stream.seek(valueStart)
+    return stream.readValue()
+
+
+# Parses the numeric (nested) list starting at the beginning of the stream into a NumPy array, which is returned.
+# If shape is given, the numbers are written into a preallocated array of that shape.
+# Returns None (and leaves the stream at an undefined position) if the list is not a rectangular list of numbers
+def readNumericArray(stream: JsonByteStream, shape: tuple = None):
+    import numpy as np  # Only needed when reading arrays
+    capacity = int(np.prod(shape)) if shape is not None else stream.chunkSize // 4
+    values = np.empty(capacity, dtype=np.float64)
+    numValues = 0
+    isInteger = True
+    depth = 0
+    childCount = [0]        # Number of elements read so far in the open list at each depth
+    lengths = [None]        # Length of the lists at each depth, set when the first list at a depth is closed
+    leafDepth = None        # Depth at which the numbers are found
+    numberPattern = re.compile(r'^[0-9eE+\-.,\s]*$')
+    while True:
+        # Only parse up to the last separator, so no number is cut in two by the end of the buffer
+        end = max(stream.buffer.rfind(b','), stream.buffer.rfind(b'['), stream.buffer.rfind(b']')) + 1
+        if end == 0:
+            if not stream.fill():
+                return None
+            continue
+        # Anything after the list may be non-ASCII. Replacing it keeps one character per byte
+        text = stream.buffer[:end].decode('ascii', errors='replace')
+        index = 0
+        for piece in re.split(r'([\[\]])', text):
+            if piece == '[':
+                childCount[depth] += 1
+                if depth == leafDepth:
+                    return None
+                depth += 1
+                if depth == len(childCount):
+                    childCount.append(0)
+                    lengths.append(None)
+                childCount[depth] = 0
+            elif piece == ']':
+                if depth == 0:
+                    return None
+                if lengths[depth] is None:
+                    lengths[depth] = childCount[depth]
+                elif lengths[depth] != childCount[depth]:
+                    return None
+                depth -= 1
+                if depth == 0:
+                    stream.consume(index + 1)
+                    dims = tuple(lengths[1:(leafDepth or 1) + 1])
+                    if int(np.prod(dims)) != numValues:
+                        return None
+                    values.resize(numValues, refcheck=False)
+                    values = values.reshape(dims)
+                    return values.astype(np.int64) if isInteger and numValues > 0 else values
+            else:
+                numbers = piece.strip(' \t\r\n,')
+                if numbers:
+                    if depth == 0 or not numberPattern.match(numbers):
+                        return None
+                    if leafDepth is None:
+                        leafDepth = depth
+                    if depth != leafDepth:
+                        return None
+                    try:
+                        parsed = np.array(numbers.split(','), dtype=np.float64)
+                    except ValueError:
+                        return None
+                    isInteger = isInteger and not any(character in numbers for character in '.eE')
+                    if numValues + len(parsed) > len(values):
+                        if shape is not None:
+                            return None
+                        grown = np.empty(max(2 * len(values), numValues + len(parsed)), dtype=np.float64)
+                        grown[:numValues] = values[:numValues]
+                        values = grown
+                    values[numValues:numValues + len(parsed)] = parsed
+                    numValues += len(parsed)
+                    childCount[depth] += len(parsed)
+            index += len(piece)
+        stream.consume(end)
+
+
+# A dictionary-like view of a Json file containing a single object. Opening it only locates the values in the file.
+# A value is decoded the first time its key is accessed, so the time and memory used depend on the keys a model actually
+# uses rather than on the whole file. If asArrays is True, rectangular lists of numbers are decoded to NumPy arrays
+# (see readJsonFileStreaming). Values can be assigned and deleted as in a dictionary. This never changes the file
+class LazyJsonFile(abc.MutableMapping):
+    def __init__(self, fileName: str, asArrays: bool = False, chunkSize: int = 1 << 16):
+        self.fileName = fileName
+        self.asArrays = asArrays
+        self.chunkSize = chunkSize
+        self.positions = {}  # Position in the file of the value of each key (None for keys added afterwards)
+        self.values = {}     # The values decoded or assigned so far
+        with open(fileName, 'rb') as d:
+            stream = JsonByteStream(d, chunkSize)
+            stream.expect(b'{')
+            if stream.peek() == b'}':
+                return
+            while True:
+                key = stream.readValue()
+                stream.expect(b':')
+                stream.peek()
+                self.positions[key] = stream.position
+                stream.skipValue()
+                if stream.peek() == b'}':
+                    return
+                stream.expect(b',')
+
+    def __getitem__(self, key):
+        if key not in self.values:
+            position = self.positions[key]
+            with open(self.fileName, 'rb') as d:
+                stream = JsonByteStream(d, self.chunkSize)
+                stream.seek(position)
+                self.values[key] = readStreamValue(stream, self.asArrays)
+        return self.values[key]
+
+    def __setitem__(self, key, value):
+        if key not in self.positions:
+            self.positions[key] = None
+        self.values[key] = value
+
+    def __delitem__(self, key):
+        del self.positions[key]
+        self.values.pop(key, None)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    # Returns the keys decoded (or assigned) so far
+    def decodedKeys(self) -> list:
+        return list(self.values.keys())
+
+
+# Opens a Json file for lazy reading. See LazyJsonFile
+def readJsonFileLazily(fileName: str, asArrays: bool = False) -> LazyJsonFile:
+    return LazyJsonFile(fileName, asArrays)
+
+
+# Returns a list of all the keys in a dictionary
 def extractKeyNames(dictionary: dict) -> list:
     return list(dictionary.keys())
 
 
+# Converts NumPy arrays and numbers (as returned when reading through the cache) to lists and numbers, and lazily read
+# Json files to dictionaries, so a dictionary containing them can still be saved to a Json file
+def toJsonCompatible(value):
+    if isinstance(value, abc.Mapping):
+        return dict(value)
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError('Object of type ' + type(value).__name__ + ' is not JSON serializable')
+
+
+# Saves a dictionary to a Json file
 def saveDictToJsonFile(dictionary: dict, fileName: str):
     with open(fileName, "w") as outfile:
-        js.dump(dictionary, outfile)
+        js.dump(dictionary, outfile, default=toJsonCompatible)
 
 
 def main():
@@ -22,4 +404,4 @@ def main():
 
 # If imported in another file, main is not run
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -25,6 +25,7 @@
 
 import pyomo.environ as pyomo  # Used for modelling the IP
 import readAndWriteJson as rwJson  # Used to read data from Json file
+import matrixModel as mm  # Used for building the model from sparse matrices
 
 
 def readData(filename: str) -> dict:
@@ -67,6 +68,33 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     return model
 
 
+# Builds the same model as buildModel(...), but each family of constraints is added as one sparse matrix instead of one
+# Pyomo expression at a time. Much faster to build for large instances, and displaySolution(...) works on both models
+def buildMatrixModel(data: dict) -> mm.MatrixModel:
+    # Define the model
+    model = mm.MatrixModel()
+    # Copy data to the model
+    model.site_labels = data['site_labels']
+    model.customer_labels = data['customer_labels']
+    model.c = data['v_costs']
+    model.f = data['f_costs']
+    model.d = data['demand']
+    model.s = data['capacity']
+    model.sites = range(0, len(model.c))
+    model.customers = range(0, len(model.c[0]))
+    # Define x and y variables together with their objective function coefficients
+    model.x = model.addVariables('x', (len(model.sites), len(model.customers)), upper=1, integer=True, cost=model.c)
+    model.y = model.addVariables('y', len(model.sites), upper=1, integer=True, cost=model.f)
+    # Add the "sum to one"-constraints
+    mm.addAssignmentConstraints(model, 'sumToOne', model.x, axis=0)
+    # Add the capacity constraints sum ( j ) d[j]*x[i][j] - s[i]*y[i] <= 0
+    model.addConstraints('capacities', [(mm.sumMatrix(model.x.shape, 1, weights=model.d), model.x),
+                                        (mm.diagonalMatrix(len(model.sites), [-s for s in model.s]), model.y)], '<=', 0)
+    # Add the "if x[i,j]==1 then y[i]=1" constraints
+    mm.addGUBConstraints(model, 'GUB', model.x, model.y)
+    return model
+
+
 def solveModel(model: pyomo.ConcreteModel()):
     # Define a solver
     solver = pyomo.SolverFactory('glpk')
@@ -74,6 +102,10 @@ def solveModel(model: pyomo.ConcreteModel()):
     solver.solve(model, tee=True)
 
 
+def solveMatrixModel(model: mm.MatrixModel):
+    model.solve('highs', tee=True)
+
+
 def displaySolution(model: pyomo.ConcreteModel()):
     # Print optimal objective function value
     print('Optimal objective function value is', pyomo.value(model.obj))
@@ -87,10 +119,14 @@ def displaySolution(model: pyomo.ConcreteModel()):
             print('\n')
 
 
-def main(instance_file_name):
+def main(instance_file_name, useMatrixModel: bool = False):
     data = readData(instance_file_name)
-    model = buildModel(data)
-    solveModel(model)
+    if useMatrixModel:
+        model = buildMatrixModel(data)
+        solveMatrixModel(model)
+    else:
+        model = buildModel(data)
+        solveModel(model)
     displaySolution(model)
 
 
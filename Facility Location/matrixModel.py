@@ -0,0 +1,386 @@
+# Matrix-based construction of mixed integer programs for the course "Modellering inden for Prescriptive Analytics"
+# Building a Pyomo model adds one Python expression per constraint, which makes the model construction the bottleneck
+# for large instances. A MatrixModel instead stores each family of constraints as one SciPy sparse matrix built with
+# NumPy, and hands the whole constraint matrix to the solver at once:
+# - 'highs'  solves the model with the highspy package (the HiGHS solver)
+# - 'gurobi' solves the model with the gurobipy package
+# Any other solver can read the model from a file written by writeMps(...).
+#
+# The variables are added in blocks, e.g. x = model.addVariables('x', (n, m), integer=True, upper=1, cost=c).
+# The arc variables of the routing problems are added with addArcVariables(...), which only creates a variable for each
+# arc (i, j) in a given list of arcs, such that no variables are made for self-loops or arcs left out of the model.
+# A family of constraints is given as a list of terms (coefficientMatrix, block), meaning
+#     sum over the terms of coefficientMatrix @ block (the block flattened row by row)   <=, >= or ==   rhs
+# where coefficientMatrix has one row per constraint and one column per variable in the block. The functions below
+# the class build the coefficient matrices used by the common constraint families (assignment, GUB, degree, flow
+# conservation and MTZ constraints).
+# After solving, x[i, j] returns the value of the variable x[i, j] and model.obj the objective function value, such
+# that the displaySolution(...) functions written for the Pyomo models work on a MatrixModel as well.
+# SciPy takes about 1.3 seconds to import, so scipy.sparse is imported inside the functions using it. Hence the scripts
+# importing this module only pay for it when a MatrixModel is actually built. The first MatrixModel built in a run pays
+# the import, so on small instances (e.g. the bundled facility location instances) building the Pyomo model is faster.
+# The matrix model pays off on large instances, where building the Pyomo model takes seconds or minutes.
+
+import numpy as np              # Used for storing bounds, costs and solution values
+from typing import TYPE_CHECKING  # Used for naming the sparse matrix types in the annotations
+
+if TYPE_CHECKING:
+    import scipy.sparse         # Only imported by type checkers, see above
+
+# Senses of the constraints, and the sense used by gurobipy and in MPS files for each
+SENSES = {'<=': ('<', 'L'), '>=': ('>', 'G'), '==': ('=', 'E')}
+
+
+# A block of variables of any shape, e.g. x[i, j] for all sites i and customers j. The variables of the block are the
+# columns start, start+1, ..., start+size-1 of the model, ordered row by row
+class VariableBlock:
+    def __init__(self, name: str, shape: tuple, start: int):
+        self.name = name
+        self.shape = shape
+        self.start = start
+        self.size = int(np.prod(shape))
+        self.value = None  # Array of the solution values. Set when the model has been solved
+        self.arcs = None   # The arcs of a block made by addArcVariables(...), in the order of the variables
+        self.position = None
+
+    # Makes the block a block of arc variables, one variable for each arc (i, j) in arcs, between numOfNodes nodes
+    def setArcs(self, arcs: list, numOfNodes: int):
+        ends = np.array(arcs, dtype=np.int64).reshape(-1, 2)
+        self.arcs = list(map(tuple, ends.tolist()))
+        self.position = dict(zip(self.arcs, range(len(self.arcs))))
+        self.numOfNodes = numOfNodes
+        self.tails, self.heads = ends[:, 0], ends[:, 1]
+
+    # Returns the column of the model of each variable in the block as an array of the shape of the block
+    def columns(self) -> np.ndarray:
+        return np.arange(self.start, self.start + self.size).reshape(self.shape)
+
+    # Returns the solution value of variable index, e.g. x[i, j]
+    def __getitem__(self, index):
+        if self.value is None:
+            raise RuntimeError('The model has not been solved, so ' + self.name + ' has no value')
+        if self.arcs is not None:
+            return self.value[self.position[index]]
+        return self.value[index]
+
+    # Returns True if the block has a variable for index, e.g. if (i, j) in x, as for an indexed Pyomo variable
+    def __contains__(self, index) -> bool:
+        if self.arcs is not None:
+            return index in self.position
+        index = index if isinstance(index, tuple) else (index,)
+        return len(index) == len(self.shape) and all(0 <= k < size for k, size in zip(index, self.shape))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+
+class MatrixModel:
+    def __init__(self, maximize: bool = False):
+        self.maximize = maximize
+        self.blocks = []
+        self.numColumns = 0
+        self.lower, self.upper, self.cost, self.integer = [], [], [], []
+        self.constraintMatrices, self.senses, self.rhs, self.rowNames = [], [], [], []
+        self.numRows = 0
+        self.obj = None  # Objective function value. Named as in the Pyomo models. Set when the model has been solved
+
+    # Adds a block of variables of the given shape (an int or a tuple) and returns it. lower, upper and cost can be
+    # numbers or arrays of the shape of the block
+    def addVariables(self, name: str, shape, lower=0, upper=np.inf, integer: bool = False, cost=0) -> VariableBlock:
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        block = VariableBlock(name, shape, self.numColumns)
+        self.blocks.append(block)
+        self.numColumns += block.size
+        self.lower.append(np.broadcast_to(np.asarray(lower, dtype=float), shape).ravel())
+        self.upper.append(np.broadcast_to(np.asarray(upper, dtype=float), shape).ravel())
+        self.cost.append(np.broadcast_to(np.asarray(cost, dtype=float), shape).ravel())
+        self.integer.append(np.full(block.size, integer))
+        return block
+
+    # Adds a block of arc variables x[i, j], one for each arc (i, j) in arcs, and returns it. lower, upper and cost can
+    # be numbers, arrays with one number per arc, or numOfNodes x numOfNodes matrices (e.g. a distance matrix), from
+    # which the entry of each arc is used
+    def addArcVariables(self, name: str, numOfNodes: int, arcs: list, lower=0, upper=np.inf, integer: bool = False,
+                        cost=0) -> VariableBlock:
+        ends = np.array(arcs, dtype=np.int64).reshape(-1, 2)
+        values = []
+        for value in (lower, upper, cost):
+            value = np.asarray(value, dtype=float)
+            values.append(value[ends[:, 0], ends[:, 1]] if value.ndim == 2 else value)
+        block = self.addVariables(name, len(ends), *values[:2], integer=integer, cost=values[2])
+        block.setArcs(ends, numOfNodes)
+        return block
+
+    # Adds the constraints sum over terms of (coefficientMatrix @ block) sense rhs, where sense is '<=', '>=' or '=='
+    # and rhs is a number or an array with one number for each constraint. Returns the rows of the new constraints
+    def addConstraints(self, name: str, terms: list, sense: str, rhs) -> range:
+        import scipy.sparse as sp  # Imported here, see the top of the file
+        if sense not in SENSES:
+            raise ValueError('Unknown sense ' + str(sense) + ' of the constraints ' + name)
+        numRows = terms[0][0].shape[0]
+        # Move the columns of each term to the columns of its block in the model
+        rows, columns, values = [], [], []
+        for coefficients, block in terms:
+            coefficients = sp.coo_matrix(coefficients)
+            if coefficients.shape != (numRows, block.size):
+                raise ValueError('The coefficients of ' + block.name + ' in the constraints ' + name + ' has shape ' +
+                                 str(coefficients.shape) + ' but should have shape ' + str((numRows, block.size)))
+            rows.append(coefficients.row)
+            columns.append(coefficients.col + block.start)
+            values.append(coefficients.data)
+        matrix = sp.coo_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                               shape=(numRows, self.numColumns))
+        self.constraintMatrices.append(matrix)
+        self.senses.append(np.full(numRows, sense))
+        self.rhs.append(np.broadcast_to(np.asarray(rhs, dtype=float), (numRows,)).ravel())
+        self.rowNames.append(name)
+        self.numRows += numRows
+        return range(self.numRows - numRows, self.numRows)
+
+    # Returns the constraint matrix of the model as a sparse matrix in compressed sparse column format
+    def matrix(self) -> 'scipy.sparse.csc_matrix':
+        import scipy.sparse as sp  # Imported here, see the top of the file
+        if not self.constraintMatrices:
+            return sp.csc_matrix((0, self.numColumns))
+        # Blocks of rows added before the last block of variables have fewer columns
+        matrices = [sp.coo_matrix((m.data, (m.row, m.col)), shape=(m.shape[0], self.numColumns))
+                    for m in self.constraintMatrices]
+        return sp.vstack(matrices, format='csc')
+
+    # Returns the arrays lower, upper, cost, integer, senses and rhs for all columns and rows of the model
+    def arrays(self) -> tuple:
+        return (np.concatenate(self.lower), np.concatenate(self.upper), np.concatenate(self.cost),
+                np.concatenate(self.integer), np.concatenate(self.senses) if self.senses else np.array([], dtype='<U2'),
+                np.concatenate(self.rhs) if self.rhs else np.array([]))
+
+    # Returns the name of each column and row of the model as used in an MPS file, e.g. x_3_7 and sumToOne_7
+    def names(self) -> tuple:
+        columnNames = []
+        for block in self.blocks:
+            indices = np.indices(block.shape).reshape(len(block.shape), -1).T if block.arcs is None else block.arcs
+            columnNames += [block.name + '_' + '_'.join(map(str, index)) for index in np.asarray(indices).tolist()]
+        rowNames = []
+        for name, matrix in zip(self.rowNames, self.constraintMatrices):
+            rowNames += [name + '_' + str(k) for k in range(matrix.shape[0])]
+        return columnNames, rowNames
+
+    # Writes the model to fileName in free MPS format, which can be read by most solvers (e.g. cbc, glpsol or gurobi_cl)
+    def writeMps(self, fileName: str):
+        lower, upper, cost, integer, senses, rhs = self.arrays()
+        columnNames, rowNames = self.names()
+        matrix = self.matrix()
+        cost, integer = cost.tolist(), integer.tolist()
+        lines = ['NAME matrixModel']
+        if self.maximize:
+            lines += ['OBJSENSE', '    MAX']
+        lines += ['ROWS', ' N obj']
+        lines += [' ' + SENSES[sense][1] + ' ' + name for sense, name in zip(senses, rowNames)]
+        lines.append('COLUMNS')
+        isInteger = False
+        for j in range(self.numColumns):
+            # Integer columns are put between markers
+            if integer[j] != isInteger:
+                isInteger = integer[j]
+                lines.append(" MARKER 'MARKER' " + ("'INTORG'" if isInteger else "'INTEND'"))
+            lines.append(' ' + columnNames[j] + ' obj ' + repr(cost[j]))
+            start, end = matrix.indptr[j], matrix.indptr[j + 1]
+            lines += [' ' + columnNames[j] + ' ' + rowNames[i] + ' ' + repr(value)
+                      for i, value in zip(matrix.indices[start:end].tolist(), matrix.data[start:end].tolist())]
+        if isInteger:
+            lines.append(" MARKER 'MARKER' 'INTEND'")
+        lines.append('RHS')
+        lines += [' rhs ' + name + ' ' + repr(value) for name, value in zip(rowNames, rhs.tolist()) if value != 0]
+        lines.append('BOUNDS')
+        for name, low, up in zip(columnNames, lower.tolist(), upper.tolist()):
+            if low == -np.inf and up == np.inf:
+                lines.append(' FR bnd ' + name)
+                continue
+            # Integer columns without an upper bound are binary in some solvers, so the default bounds are written too
+            if low == -np.inf:
+                lines.append(' MI bnd ' + name)
+            else:
+                lines.append(' LO bnd ' + name + ' ' + repr(low))
+            if up == np.inf:
+                lines.append(' PL bnd ' + name)
+            else:
+                lines.append(' UP bnd ' + name + ' ' + repr(up))
+        lines.append('ENDATA')
+        with open(fileName, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    # Solves the model with the given solver ('highs' or 'gurobi'). Afterwards the values of the variables are found in
+    # the variable blocks, and the objective function value in self.obj, which is also returned
+    def solve(self, solverName: str = 'highs', tee: bool = False, timeLimit: float = None) -> float:
+        if solverName == 'highs':
+            solution = self.solveWithHighs(tee, timeLimit)
+        elif solverName == 'gurobi':
+            solution = self.solveWithGurobi(tee, timeLimit)
+        else:
+            raise ValueError('Unknown solver ' + str(solverName) + '. Use writeMps(...) to solve it with other solvers')
+        integer = np.concatenate(self.integer)
+        solution[integer] = np.round(solution[integer])
+        for block in self.blocks:
+            block.value = solution[block.start:block.start + block.size].reshape(block.shape)
+        self.obj = float(np.dot(np.concatenate(self.cost), solution))
+        return self.obj
+
+    # Solves the model by HiGHS and returns the values of all columns
+    def solveWithHighs(self, tee: bool, timeLimit: float) -> np.ndarray:
+        import highspy  # Only needed when HiGHS is used
+        lower, upper, cost, integer, senses, rhs = self.arrays()
+        matrix = self.matrix()
+        lp = highspy.HighsLp()
+        lp.num_col_ = self.numColumns
+        lp.num_row_ = self.numRows
+        lp.col_cost_ = cost
+        lp.col_lower_ = lower
+        lp.col_upper_ = upper
+        lp.row_lower_ = np.where(senses == '<=', -np.inf, rhs)
+        lp.row_upper_ = np.where(senses == '>=', np.inf, rhs)
+        lp.sense_ = highspy.ObjSense.kMaximize if self.maximize else highspy.ObjSense.kMinimize
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = matrix.indptr
+        lp.a_matrix_.index_ = matrix.indices
+        lp.a_matrix_.value_ = matrix.data
+        lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous for i in integer]
+        highs = highspy.Highs()
+        highs.setOptionValue('output_flag', tee)
+        if timeLimit is not None:
+            highs.setOptionValue('time_limit', float(timeLimit))
+        highs.passModel(lp)
+        highs.run()
+        solution = highs.getSolution()
+        if not solution.value_valid:
+            raise RuntimeError('HiGHS found no solution: ' + highs.modelStatusToString(highs.getModelStatus()))
+        return np.array(solution.col_value)
+
+    # Solves the model by Gurobi and returns the values of all columns
+    def solveWithGurobi(self, tee: bool, timeLimit: float) -> np.ndarray:
+        import gurobipy  # Only needed when Gurobi is used
+        lower, upper, cost, integer, senses, rhs = self.arrays()
+        model = gurobipy.Model()
+        model.Params.OutputFlag = int(tee)
+        if timeLimit is not None:
+            model.Params.TimeLimit = timeLimit
+        x = model.addMVar(self.numColumns, lb=lower, ub=upper, obj=cost,
+                          vtype=np.where(integer, gurobipy.GRB.INTEGER, gurobipy.GRB.CONTINUOUS))
+        model.ModelSense = gurobipy.GRB.MAXIMIZE if self.maximize else gurobipy.GRB.MINIMIZE
+        model.addMConstr(self.matrix().tocsr(), x, np.array([SENSES[sense][0] for sense in senses]), rhs)
+        model.optimize()
+        if model.SolCount == 0:
+            raise RuntimeError('Gurobi found no solution. Status code ' + str(model.Status))
+        return np.array(x.X)
+
+
+# Returns the matrix summing a block of the given shape (rows x columns) along the axis, i.e. the matrix with one row
+# for each column j of the block summing the column if axis is 0, and one row for each row i summing the row if axis is
+# 1. If weights (an array of the shape of the block, or one which can be broadcast to it) is given, the weighted sums
+# are formed instead
+def sumMatrix(shape: tuple, axis: int, weights=None) -> 'scipy.sparse.coo_matrix':
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    size = shape[0] * shape[1]
+    rowOfElement = np.indices(shape)[1 - axis].ravel()
+    values = np.broadcast_to(np.asarray(1 if weights is None else weights, dtype=float), shape).ravel()
+    return sp.coo_matrix((values, (rowOfElement, np.arange(size))), shape=(shape[1 - axis], size))
+
+
+# Returns the diagonal matrix multiplying each variable of a block by its own coefficient. Used for constraints with one
+# row per variable, e.g. x[i, j] <= y[i]. coefficients can be a number or an array with one number per variable
+def diagonalMatrix(size: int, coefficients=1) -> 'scipy.sparse.dia_matrix':
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    return sp.diags(np.broadcast_to(np.asarray(coefficients, dtype=float), (size,)).ravel())
+
+
+# Returns the matrix with one row per element (i, j) of a block of the given shape, which picks variable i of a one
+# dimensional block if axis is 0 (variable j if axis is 1) multiplied by the coefficient of (i, j)
+# E.g. the y[i] part of x[i, j] <= y[i] is expandMatrix((n, m), 0, -1)
+def expandMatrix(shape: tuple, axis: int, coefficients=1) -> 'scipy.sparse.coo_matrix':
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    size = int(np.prod(shape))
+    values = np.broadcast_to(np.asarray(coefficients, dtype=float), shape).ravel()
+    return sp.coo_matrix((values, (np.arange(size), np.indices(shape)[axis].ravel())), shape=(size, shape[axis]))
+
+
+# Returns the node-arc incidence matrix of a block of arc variables, i.e. the matrix with one row per node i and one column
+# per arc, with a 1 in row i of each arc leaving i (end=0) or entering i (end=1)
+def incidenceMatrix(x: VariableBlock, end: int) -> 'scipy.sparse.coo_matrix':
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    return sp.coo_matrix((np.ones(x.size), (x.tails if end == 0 else x.heads, np.arange(x.size))),
+                         shape=(x.numOfNodes, x.size))
+
+
+# Returns the position of arc (i, j) in the block of arc variables x for each pair of the arrays i and j, or -1 if
+# the block has no variable for the arc
+def arcPositions(x: VariableBlock, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    lookup = sp.csr_matrix((np.arange(1, x.size + 1), (x.tails, x.heads)), shape=(x.numOfNodes, x.numOfNodes))
+    return np.asarray(lookup[i, j]).ravel().astype(np.int64) - 1
+
+
+# Returns the matrix selecting the given rows of a coefficient matrix
+def selectRows(matrix, rows) -> 'scipy.sparse.csr_matrix':
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    return sp.csr_matrix(matrix)[np.asarray(rows)]
+
+
+# Adds the assignment constraints sum ( i ) x[i][j] == rhs for all j (axis=0) or sum ( j ) x[i][j] == rhs for all i
+# (axis=1) of the two dimensional block x, e.g. the "sum to one"-constraints of the facility location problems
+def addAssignmentConstraints(model: MatrixModel, name: str, x: VariableBlock, axis: int = 0, rhs=1) -> range:
+    return model.addConstraints(name, [(sumMatrix(x.shape, axis), x)], '==', rhs)
+
+
+# Adds the generalized upper bounds x[i][j] <= y[i] for all i and j, where x is an n x m block and y has n variables
+def addGUBConstraints(model: MatrixModel, name: str, x: VariableBlock, y: VariableBlock) -> range:
+    return model.addConstraints(name, [(diagonalMatrix(x.size), x), (expandMatrix(x.shape, 0, -1), y)], '<=', 0)
+
+
+# Adds the degree constraints of the routing problems for the block x of arc variables (made by addArcVariables):
+#     sum ( j ) x[i][j] == outDegree[i] and sum ( j ) x[j][i] == inDegree[i]  for each node i in nodes
+# outDegree and inDegree can be numbers or arrays with one number per node
+def addDegreeConstraints(model: MatrixModel, name: str, x: VariableBlock, outDegree=1, inDegree=1,
+                         nodes=None) -> tuple:
+    nodes = np.arange(x.numOfNodes) if nodes is None else np.asarray(nodes)
+    outDegree = np.broadcast_to(np.asarray(outDegree, dtype=float), (x.numOfNodes,))[nodes]
+    inDegree = np.broadcast_to(np.asarray(inDegree, dtype=float), (x.numOfNodes,))[nodes]
+    outRows = model.addConstraints(name + 'Out', [(selectRows(incidenceMatrix(x, 0), nodes), x)], '==', outDegree)
+    inRows = model.addConstraints(name + 'In', [(selectRows(incidenceMatrix(x, 1), nodes), x)], '==', inDegree)
+    return outRows, inRows
+
+
+# Adds the flow conservation constraints sum ( j ) f[i][j] - sum ( j ) f[j][i] == supply[i] for each node i in nodes,
+# where f is a block of arc variables. supply can be a number or an array with one number per node
+def addFlowConservationConstraints(model: MatrixModel, name: str, f: VariableBlock, supply, nodes=None) -> range:
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    nodes = np.arange(f.numOfNodes) if nodes is None else np.asarray(nodes)
+    supply = np.broadcast_to(np.asarray(supply, dtype=float), (f.numOfNodes,))[nodes]
+    netFlow = sp.csr_matrix(incidenceMatrix(f, 0)) - sp.csr_matrix(incidenceMatrix(f, 1))
+    return model.addConstraints(name, [(netFlow[nodes], f)], '==', supply)
+
+
+# Adds the lifted MTZ constraints u[i] - u[j] + Q*x[i][j] + (Q - q[i] - q[j])*x[j][i] <= Q - q[j] for the pairs of
+# different nodes i and j in nodes, where x is a block of arc variables and u has one variable per node
+# The constraints are only added for pairs with an arc in at least one direction, as the constraints of the other pairs
+# are implied by the bounds on u, and the terms of arcs without a variable are left out
+# For the TSP, Q = n and q[i] = 1 gives u[i] - u[j] + n*x[i][j] + (n-2)*x[j][i] <= n-1
+def addLiftedMTZConstraints(model: MatrixModel, name: str, x: VariableBlock, u: VariableBlock, Q, q,
+                            nodes=None) -> range:
+    import scipy.sparse as sp  # Imported here, see the top of the file
+    n = x.numOfNodes
+    isUsed = np.zeros(n, dtype=bool)
+    isUsed[np.arange(n) if nodes is None else np.asarray(nodes)] = True
+    q = np.broadcast_to(np.asarray(q, dtype=float), (n,))
+    # The pairs (i, j) such that (i, j) or (j, i) is an arc and both nodes are in nodes
+    pairs = np.unique(np.concatenate([x.tails * n + x.heads, x.heads * n + x.tails]))
+    i, j = pairs // n, pairs % n
+    keep = isUsed[i] & isUsed[j]
+    i, j = i[keep], j[keep]
+    rows = np.arange(len(i))
+    forward, backward = arcPositions(x, i, j), arcPositions(x, j, i)
+    hasForward, hasBackward = forward >= 0, backward >= 0
+    xCoefficients = sp.coo_matrix(
+        (np.concatenate([np.full(hasForward.sum(), Q, dtype=float), (Q - q[i] - q[j])[hasBackward]]),
+         (np.concatenate([rows[hasForward], rows[hasBackward]]),
+          np.concatenate([forward[hasForward], backward[hasBackward]]))), shape=(len(i), x.size))
+    uCoefficients = sp.coo_matrix((np.concatenate([np.ones(len(i)), -np.ones(len(i))]),
+                                   (np.concatenate([rows, rows]), np.concatenate([i, j]))), shape=(len(i), u.size))
+    return model.addConstraints(name, [(xCoefficients, x), (uCoefficients, u)], '<=', Q - q[j])
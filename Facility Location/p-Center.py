@@ -21,6 +21,7 @@
 
 import pyomo.environ as pyomo  # Used for modelling the IP
 import readAndWriteJson as rwJson  # Used to read data from Json file
+import matrixModel as mm  # Used for building the model from sparse matrices
 
 
 #-------------Planieret Vægtet Weber Problem-------------------------------#
@@ -75,6 +76,36 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     return model
 
 
+# Builds the same model as buildModel(...), but each family of constraints is added as one sparse matrix instead of one
+# Pyomo expression at a time. Much faster to build for large instances, and displaySolution(...) works on both models
+def buildMatrixModel(data: dict) -> mm.MatrixModel:
+    # Define the model
+    model = mm.MatrixModel()
+    # Copy data to the model
+    model.site_labels = data['site_labels']
+    model.customer_labels = data['customer_labels']
+    model.costs = data['costs']
+    model.p = data['p']
+    model.sites = range(0, len(data['costs']))
+    model.customers = range(0, len(data['costs'][0]))
+    # Define x and y variables for the model
+    model.x = model.addVariables('x', (len(model.sites), len(model.customers)), upper=1, integer=True)
+    model.y = model.addVariables('y', len(model.sites), upper=1, integer=True)
+    # rhoMax is the only variable in the objective function
+    model.rhoMax = model.addVariables('rhoMax', 1, cost=1)
+    # Add the "sum to one"-constraints
+    mm.addAssignmentConstraints(model, 'sumToOne', model.x, axis=0)
+    # Add the "if x[i,j]==1 then y[i]=1" constraints
+    mm.addGUBConstraints(model, 'GUB', model.x, model.y)
+    # Add cardinality constraint
+    model.addConstraints('cardinality', [(mm.sumMatrix((len(model.sites), 1), 0), model.y)], '==', model.p)
+    # Add the lower bounds sum ( i ) costs[i][j]*x[i][j] - rhoMax <= 0 on the rhoMax variable
+    model.addConstraints('rhoMaxDefinition',
+                         [(mm.sumMatrix(model.x.shape, 0, weights=model.costs), model.x),
+                          (mm.expandMatrix((len(model.customers), 1), 1, -1), model.rhoMax)], '<=', 0)
+    return model
+
+
 def solveModel(model: pyomo.ConcreteModel()):
     # Define a solver
     solver = pyomo.SolverFactory('cbc')
@@ -82,6 +113,10 @@ def solveModel(model: pyomo.ConcreteModel()):
     solver.solve(model, tee=True)
 
 
+def solveMatrixModel(model: mm.MatrixModel):
+    model.solve('highs', tee=True)
+
+
 def displaySolution(model: pyomo.ConcreteModel()):
     # Print optimal objective function value
     print('Optimal objective function value is', pyomo.value(model.obj))
@@ -95,10 +130,14 @@ def displaySolution(model: pyomo.ConcreteModel()):
             print('\n')
 
 
-def main(instance_file_name: str):
+def main(instance_file_name: str, useMatrixModel: bool = False):
     data = readData(instance_file_name)
-    model = buildModel(data)
-    solveModel(model)
+    if useMatrixModel:
+        model = buildMatrixModel(data)
+        solveMatrixModel(model)
+    else:
+        model = buildModel(data)
+        solveModel(model)
     displaySolution(model)
 
 
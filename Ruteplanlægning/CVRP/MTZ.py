@@ -16,24 +16,26 @@
 # serviced on the route from the depot to the customer node i.
 # Q is the maximum capacity on a vehicle and q[i] is the demand at node i (we assume, that q[0]=0)
 # number of vehicles available for dispatching.
+# Before solving, addRootCuts(...) strengthens the LP relaxation by the rounded capacity inequalities it violates (found
+# by capacityCuts.py)
 # The readData(...) function uses the readAndWriteJson file to read data from a Json file
 
 import pyomo.environ as pyomo       # Used to model the IP
 import readAndWriteJson as rwJson   # Used for reading the data file in Json format
-import matplotlib.pyplot as plt     # Used for plotting the result
-import math
+import routeDecoder as rd          # Used for reading the routes from the solution
+import savingsHeuristic as sh       # Used for finding routes to start the solver from
+import capacityCuts as cc           # Used for finding violated capacity inequalities
+import time as tm                   # Used for timing the root cuts
+import numpy as np                  # Used for storing the distance matrix
+import distanceMatrix as dm         # Used for generating a distance matrix, if it is not present
+import matrixStorage as ms          # Used for storing a generated distance matrix on disk
+import matrixModel as mm            # Used for building the model from sparse matrices
+import candidateGraph as cg         # Used for building a sparse candidate graph of the arcs
 
-# Function, taking a dict as argument, and returns a list of lists storing a distance matrix
+# Function, taking a dict as argument, and returns a NumPy array storing a distance matrix rounded to integers
 # "data" must have keys "xCoord" and "yCoord". No error handling at the moment!
-def makeDistanceMatrix(data: dict) -> list:
-    numNodes = len(data['xCoord'])
-    dist = []
-    for i in range(numNodes):
-        dist.append([])
-        for j in range(numNodes):
-            tmpDist = (data['xCoord'][i] - data['xCoord'][j]) ** 2 + (data['yCoord'][i] - data['yCoord'][j]) ** 2
-            dist[i].append(round(math.sqrt(tmpDist)))
-    return dist
+def makeDistanceMatrix(data: dict) -> np.ndarray:
+    return dm.distanceMatrixFromData(data, ['xCoord', 'yCoord'], decimals=0)
 
 
 # Reads the data from a data file in Json format. Must include
@@ -50,12 +52,23 @@ def makeDistanceMatrix(data: dict) -> list:
 def readData(filename: str) -> dict:
     data = rwJson.readJsonFileToDictionary(filename)
     if 'dist' not in data:
-        data['dist'] = makeDistanceMatrix(data)
-        newFileName = filename + '_new'
-        rwJson.saveDictToJsonFile(data, newFileName)
+        # The distance matrix is computed once and stored in a compact, memory-mapped sidecar file next to the data file
+        data['dist'] = ms.loadOrMakeMatrix(data, filename, 'dist', makeDistanceMatrix)
     return data
 
 
+# Returns the sorted list of arcs (i,j) the model is built on. If the data contains a list of arcs (e.g. a sparse
+# candidate graph), only these arcs are used. Otherwise all pairs of nodes are used. Self-loops are never included, and
+# neither are arcs between two customers whose total demand exceeds the capacity, as no vehicle can visit both
+def makeArcSet(data: dict) -> list:
+    numOfNodes = data['n'] + 1
+    if 'arcs' not in data:
+        arcs = [(i, j) for i in range(numOfNodes) for j in range(numOfNodes)]
+    else:
+        arcs = sorted(set((int(i), int(j)) for i, j in data['arcs']))
+    return [(i, j) for i, j in arcs if i != j and (i == 0 or j == 0 or data['q'][i] + data['q'][j] <= data['Q'])]
+
+
 def buildModel(data: dict) -> pyomo.ConcreteModel():
     # Create model object
     model = pyomo.ConcreteModel()
@@ -64,96 +77,168 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     model.nodes = range(0, model.numOfNodes)
     model.customers = range(1, model.numOfNodes)
     # Define the variables
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
+    # The arcs the model is built on. No variables are created for self-loops or arcs left out of model.arcs
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
     model.u = pyomo.Var(model.customers, within=pyomo.NonNegativeReals, bounds=(1, data['Q']))
     # Set a lower bound on each u[i] variable corresponding to customer i's demand
     for i in model.customers:
         model.u[i].setlb(data['q'][i])
-    # Remove the diagonal. Change to "for i in model.customers" if it should be allowed to not use all vehicles
-    for i in model.nodes:
-        model.x[i, i].fix(0)
     # Add the objective function
     model.obj = pyomo.Objective(
-        expr=sum(data['dist'][i][j]*model.x[i, j] for i in model.nodes for j in model.nodes if i != j)
+        expr=sum(data['dist'][i][j]*model.x[i, j] for i, j in model.arcs)
     )
     # Add both the in- and out-degree constraints for the customers
     model.sumToOne = pyomo.ConstraintList()
     for i in model.customers:
         # Out of node i
-        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.successors[i]) == 1)
         # Into node i
-        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.predecessors[i]) == 1)
     # Add the in- and out-degree constraints for the depot
-    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] for j in model.nodes) == data['m'])
-    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] for i in model.nodes) == data['m'])
-    # Add the lifte MTZ sub tour elimination constraints for all pairs (i,j) of customers
+    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] for j in model.successors[0]) == data['m'])
+    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] for i in model.predecessors[0]) == data['m'])
+    # Add the lifte MTZ sub tour elimination constraints for all pairs (i,j) of customers with an arc in at least one
+    # direction. The bounds on u imply the constraints of all other pairs. Terms of missing arcs are left out
     model.MTZ = pyomo.ConstraintList()
-    for i in model.customers:
-        for j in model.customers:
-            model.MTZ.add(
-                expr=model.u[i] - model.u[j] + data['Q']*model.x[i, j]
-                     + (data['Q']-data['q'][i]-data['q'][j])*model.x[j, i] <= data['Q'] - data['q'][j]
-            )
+    for i, j in sorted(set(model.arcs) | set((j, i) for i, j in model.arcs)):
+        if i in model.customers and j in model.customers:
+            lhs = model.u[i] - model.u[j]
+            if (i, j) in model.x:
+                lhs += data['Q']*model.x[i, j]
+            if (j, i) in model.x:
+                lhs += (data['Q']-data['q'][i]-data['q'][j])*model.x[j, i]
+            model.MTZ.add(expr=lhs <= data['Q'] - data['q'][j])
+    # return the model object
+    return model
+
+
+# Builds the same model as buildModel(...), but each family of constraints is added as one sparse matrix instead of one
+# Pyomo expression at a time. Much faster to build for large instances, and displaySolution(...) works on both models
+def buildMatrixModel(data: dict) -> mm.MatrixModel:
+    # Create model object
+    model = mm.MatrixModel()
+    # Add some data to the model object
+    model.numOfNodes = data['n'] + 1
+    model.nodes = range(0, model.numOfNodes)
+    model.customers = range(1, model.numOfNodes)
+    # The arc variables x[i][j], one for each arc the model is built on
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = model.addArcVariables('x', model.numOfNodes, model.arcs, upper=1, integer=True, cost=data['dist'])
+    # u[0] is fixed to 0 and not used, such that u[i] is the variable of customer i as in buildModel(...)
+    # The lower bound on each u[i] is customer i's demand
+    q = np.asarray(data['q'], dtype=float)
+    model.u = model.addVariables('u', model.numOfNodes, lower=np.where(np.arange(model.numOfNodes) > 0, q, 0),
+                                 upper=np.where(np.arange(model.numOfNodes) > 0, data['Q'], 0))
+    # Both the in- and out-degree constraints. These are m for the depot and 1 for the customers
+    degree = np.where(np.arange(model.numOfNodes) > 0, 1, data['m'])
+    mm.addDegreeConstraints(model, 'sumToOne', model.x, degree, degree)
+    # Add the lifted MTZ sub tour elimination constraints for the pairs (i,j) of customers with an arc between them
+    mm.addLiftedMTZConstraints(model, 'MTZ', model.x, model.u, data['Q'], q, nodes=model.customers)
     # return the model object
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
+# Adds a rounded capacity inequality sum ( i in S ) sum ( j in S ) x[i][j] <= |S| - ceil(q(S)/Q) for each set of
+# customers S in cutList to the model, and returns the new constraints
+def addCut(cutList: list, model: pyomo.ConcreteModel(), data: dict) -> list:
+    newCuts = []
+    for cut in cutList:
+        newCuts.append(model.capacityCuts.add(
+            expr=sum(model.x[i, j] for i in cut for j in cut if (i, j) in model.x)
+            <= len(cut) - cc.requiredVehicles(cut, data['q'], data['Q'])))
+    return newCuts
+
+
+# Strengthens the model by solving its LP relaxation and adding the rounded capacity inequalities it violates (found by
+# capacityCuts.py) until none are found, or maxRounds rounds have been made. The cuts are kept in the model, so the
+# root bound of the integer model solved afterwards is the LP bound with all the cuts
+def addRootCuts(model: pyomo.ConcreteModel(), data: dict, maxRounds: int = 100):
+    start_time = tm.time()
+    model.capacityCuts = pyomo.ConstraintList()
+    # Relax the integrality of x while the LP relaxation is solved
+    for i, j in model.arcs:
+        model.x[i, j].domain = pyomo.UnitInterval
+    solver = pyomo.SolverFactory('gurobi_persistent')
+    solver.set_instance(model)
+    cutsAdded = 0
+    forPrint = ['Rounds', 'Cuts added', 'LP bound', 'Separate (s)', 'Solve (s)']
+    print("{: >10} {: >15} {: >20} {: >12} {: >10}".format(*forPrint))
+    for rounds in range(1, maxRounds + 1):
+        solveStart = tm.time()
+        solver.solve(tee=False, save_results=False)
+        solveTime = tm.time() - solveStart
+        separateStart = tm.time()
+        violatedSets = cc.separateCapacityCuts(model.x, data)
+        for cut in addCut(violatedSets, model, data):
+            solver.add_constraint(cut)
+        cutsAdded += len(violatedSets)
+        forPrint = [rounds, cutsAdded, pyomo.value(model.obj), tm.time() - separateStart, solveTime]
+        print("{: >10} {: >15} {: >20.4f} {: >12.4f} {: >10.4f}".format(*forPrint))
+        if not violatedSets:
+            break
+    for i, j in model.arcs:
+        model.x[i, j].domain = pyomo.Binary
+    print("Root cuts took %.6s seconds" % (tm.time() - start_time))
+
+
+# If warmstart is True, the current values of the variables (e.g. set by sh.setMipStart(...)) are passed as a MIP start
+def solveModel(model: pyomo.ConcreteModel(), warmstart: bool = False):
     solver = pyomo.SolverFactory('gurobi')
-    solver.solve(model, tee=True)
+    solver.solve(model, tee=True, warmstart=warmstart)
+
+
+def solveMatrixModel(model: mm.MatrixModel):
+    model.solve('gurobi', tee=True)
 
 
 def displaySolution(model: pyomo.ConcreteModel(), data: dict):
     print('Total length of the', data['m'], 'tours are', pyomo.value(model.obj))
-    # Find a tour for each vehicle
-    lastRouteStarter = 0
-    # Make flag for checking if coordinates are available
-    coordinatesPresent = ('xCoord' in data) and ('yCoord' in data)
-    # Create a route for each vehicle
-    for vehicle in range(1, data['m'] + 1):
-        # Each route starts at the depot
-        if coordinatesPresent:
-            displayX = [data['xCoord'][0]]
-            displayY = [data['yCoord'][0]]
-            labels = [0]
-        # Find the customer, that starts this route
-        currentNode = 0
-        for j in model.customers:
-            if j > lastRouteStarter and pyomo.value(model.x[0, j]) >= 0.9999:
-                currentNode = j
-                if coordinatesPresent:
-                    displayX.append(data['xCoord'][currentNode])
-                    displayY.append(data['yCoord'][currentNode])
-                    labels.append(currentNode)
-                break
-        lastRouteStarter = currentNode
-        print('The route for vehicle', vehicle, 'is:')
-        print('0->', currentNode, end='')
-        # Build the route from currentNode back to the depot
-        while currentNode != 0:
-            for j in model.nodes:
-                if currentNode != j and pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                    print('->', j, end='')
-                    currentNode = j
-                    if coordinatesPresent:
-                        displayX.append(data['xCoord'][currentNode])
-                        displayY.append(data['yCoord'][currentNode])
-                        labels.append(currentNode)
-                    break
-        print('\n')
-        if coordinatesPresent:
-            # Start plotting the solution to a coordinate system if coordinates are present
-            if coordinatesPresent:
-                plt.plot(displayX, displayY, '-o')
-                for i, label in enumerate(labels):
-                    plt.annotate(label, (displayX[i], displayY[i]))
-    plt.show()
-
-
-def main(filename: str):
+    # Find a tour for each vehicle from the x[i,j] values
+    routes = rd.decodeRoutes(model, data)
+    rd.printRoutes(routes)
+    # Start plotting the solution to a coordinate system if coordinates are present
+    rd.plotRoutes(routes, data)
+
+
+def main(filename: str, useMatrixModel: bool = False, neighbours: int = None, savingsStart: bool = True,
+         rootCuts: bool = True):
     data = readData(filename)
-    model = buildModel(data)
-    solveModel(model)
+    if neighbours is not None:
+        # Only build the model on the arcs between each node and its nearest neighbours, and the arcs to and from the
+        # depot
+        cg.addCandidateGraph(data, k=neighbours, numOfPoints=data['n'] + 1, hubs=[0])
+    routes = None
+    if savingsStart or 'arcs' in data:
+        routes = sh.solve(data)
+    if 'arcs' in data:
+        # Put the arcs of the savings routes back into the graph, such that the model can be started from them. If they
+        # use exactly m vehicles, the model then always has a feasible solution
+        cg.reAddArcs(data, sh.routeArcs(routes))
+    if useMatrixModel:
+        model = buildMatrixModel(data)
+        solveMatrixModel(model)
+    else:
+        model = buildModel(data)
+        if rootCuts:
+            addRootCuts(model, data)
+        # Start the solver from the routes found by the savings heuristic, if they use exactly m vehicles. Set after the
+        # root cuts, since solving the LP relaxation overwrites the values of x
+        warmstart = savingsStart and sh.setMipStart(model, routes, data)
+        if savingsStart and not warmstart:
+            print('The savings routes use', len(routes), 'vehicles instead of', data['m'],
+                  'and are not used as a MIP start')
+        solveModel(model, warmstart)
     displaySolution(model, data)
 
 
@@ -0,0 +1,346 @@
+# Adaptive large neighbourhood search (ALNS) for the capacitated vehicle routing problem (CVRP), for the course
+# "Modellering inden for Prescriptive Analytics"
+# The MIPs of MTZ.py and One Commodity Flow (G&G).py do not finish for instances of realistic size. The ALNS of Ropke
+# and Pisinger (2006) finds good solutions to these in seconds. It reads the same data as the MIPs (n, m, Q, q and dist)
+# and repeats the following steps, starting from the routes found by the savings heuristic of savingsHeuristic.py
+# 1. Remove some customers from the current solution by one of the destroy operators
+#    - random: customers chosen at random
+#    - worst: customers whose removal saves the most distance (with some randomness)
+#    - related: customers close to and with similar demand as a random customer (Shaw removal)
+# 2. Insert them again by one of the repair operators
+#    - greedy: repeatedly insert the customer with the cheapest feasible insertion
+#    - regret: repeatedly insert the customer with the largest difference between its cheapest insertion and its
+#      cheapest insertions into the REGRET - 1 next best routes
+# 3. Accept the new solution by the criterion of simulated annealing, and update the weights of the operators used
+#    according to how good the new solution was. The operators are chosen with probabilities proportional to the weights
+# The loads and lengths of the routes are cached, such that the cost of inserting or removing a customer is found from
+# the distances to its neighbours on the route only. The cheapest insertion of each customer into each route is kept
+# during the repair, and only the insertions into the route changed are updated after each insertion.
+# Independent restarts of the search with different random seeds run in parallel in a pool of processes.
+#
+# Usage: python alns.py [data file] [iterations] [restarts]
+
+import numpy as np                  # Used for the distance matrix and the insertion costs
+import math                         # Used for the acceptance criterion
+import os                           # Used for finding the number of cores
+import time as tm                   # Used for timing the search
+import concurrent.futures as cf     # Used for running the restarts in parallel
+import readAndWriteJson as rwJson   # Used for reading the data file in Json format
+import distanceMatrix as dm         # Used for generating a distance matrix, if it is not present
+import matrixStorage as ms          # Used for storing a generated distance matrix on disk
+import savingsHeuristic as sh       # Used for finding the initial solution
+import routeDecoder as rd           # Used for printing and plotting the routes
+
+# The scores of an operator, when the new solution is a new best solution, better than the current solution, or
+# accepted though worse than the current solution
+SCORES = (33, 9, 13)
+# The weights of the operators are updated after each SEGMENT iterations, where they move the fraction REACTION towards
+# the average score in the segment
+SEGMENT = 100
+REACTION = 0.1
+# The number of routes compared by the regret insertion
+REGRET = 3
+# The randomness of the worst and related removals. Higher values give less randomness
+WORST_RANDOMNESS = 3
+RELATED_RANDOMNESS = 6
+# A solution accepted at the start of the search may be 5% worse than the initial solution with probability 0.5, and
+# the temperature is lowered geometrically to FINAL_TEMPERATURE times the start temperature
+START_WORSENING = 0.05
+FINAL_TEMPERATURE = 0.001
+
+
+# Function, taking a dict as argument, and returns a NumPy array storing a distance matrix rounded to integers
+# "data" must have keys "xCoord" and "yCoord". No error handling at the moment!
+def makeDistanceMatrix(data: dict) -> np.ndarray:
+    return dm.distanceMatrixFromData(data, ['xCoord', 'yCoord'], decimals=0)
+
+
+# Reads the data from a data file in Json format. Must include
+# n = number of customers as an int
+# m = number of vehicles as an int
+# Q = capacity of the vehicles as an int
+# q = list of demands of length n+1
+# The data file must include either
+#   xCoord = list of x-coordinates of length n+1
+#   yCoord = list of y-coordinates of length n+1
+# or
+#   dist = list of lists containing a distance matrix of size (n+1) x (n+1).
+# or both
+def readData(filename: str) -> dict:
+    data = rwJson.readJsonFileToDictionary(filename)
+    if 'dist' not in data:
+        # The distance matrix is computed once and stored in a compact, memory-mapped sidecar file next to the data file
+        data['dist'] = ms.loadOrMakeMatrix(data, filename, 'dist', makeDistanceMatrix)
+    return data
+
+
+# A solution is a list of m routes, each a list of customers (without the depot), with the load and length of each
+# route cached. Customers which could not be inserted due to the capacity are kept in unassigned, and each costs
+# penalty in the objective
+class Solution:
+    def __init__(self, routes: list, dist: np.ndarray, demands: np.ndarray, capacity: float, penalty: float):
+        self.dist, self.demands, self.capacity, self.penalty = dist, demands, capacity, penalty
+        self.routes = [list(route) for route in routes]
+        self.loads = [float(demands[route].sum()) if route else 0.0 for route in self.routes]
+        self.lengths = [self.routeLength(route) for route in self.routes]
+        self.unassigned = []
+
+    def routeLength(self, route: list) -> float:
+        nodes = [0] + route + [0]
+        return float(self.dist[nodes[:-1], nodes[1:]].sum())
+
+    def copy(self):
+        other = Solution.__new__(Solution)
+        other.dist, other.demands, other.capacity, other.penalty = self.dist, self.demands, self.capacity, self.penalty
+        other.routes = [list(route) for route in self.routes]
+        other.loads, other.lengths, other.unassigned = list(self.loads), list(self.lengths), list(self.unassigned)
+        return other
+
+    def cost(self) -> float:
+        return sum(self.lengths) + self.penalty * len(self.unassigned)
+
+    # Removes the customer at the given position of route r and updates the cached load and length
+    def remove(self, r: int, position: int):
+        route = self.routes[r]
+        before = route[position - 1] if position > 0 else 0
+        after = route[position + 1] if position + 1 < len(route) else 0
+        customer = route.pop(position)
+        self.lengths[r] -= self.dist[before, customer] + self.dist[customer, after] - self.dist[before, after]
+        self.loads[r] -= self.demands[customer]
+        self.unassigned.append(customer)
+
+    # Inserts the customer before the given position of route r and updates the cached load and length
+    def insert(self, customer: int, r: int, position: int):
+        route = self.routes[r]
+        before = route[position - 1] if position > 0 else 0
+        after = route[position] if position < len(route) else 0
+        route.insert(position, customer)
+        self.lengths[r] += self.dist[before, customer] + self.dist[customer, after] - self.dist[before, after]
+        self.loads[r] += self.demands[customer]
+        self.unassigned.remove(customer)
+
+    # Returns the cheapest cost of inserting each of the customers into route r and the positions giving it. The cost is
+    # infinite for customers which do not fit in the route
+    def insertionCosts(self, r: int, customers: np.ndarray) -> tuple:
+        nodes = np.array([0] + self.routes[r] + [0])
+        before, after = nodes[:-1], nodes[1:]
+        costs = (self.dist[np.ix_(before, customers)] + self.dist[np.ix_(customers, after)].T
+                 - self.dist[before, after][:, np.newaxis])
+        positions = np.argmin(costs, axis=0)
+        best = costs[positions, np.arange(len(customers))]
+        best[self.loads[r] + self.demands[customers] > self.capacity + 1e-9] = np.inf
+        return best, positions
+
+
+# Returns the route and position of each customer in the solution as two arrays indexed by customer
+def locations(solution: Solution) -> tuple:
+    routeOf = np.full(len(solution.demands), -1)
+    positionOf = np.full(len(solution.demands), -1)
+    for r, route in enumerate(solution.routes):
+        routeOf[route] = r
+        positionOf[route] = np.arange(len(route))
+    return routeOf, positionOf
+
+
+# Removes the customers from the solution
+def removeCustomers(solution: Solution, customers):
+    routeOf, positionOf = locations(solution)
+    # Removing from the end of each route first keeps the positions of the remaining customers valid
+    for customer in sorted(customers, key=lambda customer: -positionOf[customer]):
+        solution.remove(routeOf[customer], positionOf[customer])
+
+
+# Destroy operator removing numToRemove customers chosen at random
+def randomRemoval(solution: Solution, numToRemove: int, rng: np.random.Generator):
+    assigned = [customer for route in solution.routes for customer in route]
+    removeCustomers(solution, rng.choice(assigned, min(numToRemove, len(assigned)), replace=False).tolist())
+
+
+# Destroy operator removing numToRemove customers one at a time, each time choosing among the customers sorted by the
+# distance saved by removing them, with a bias towards the largest savings
+def worstRemoval(solution: Solution, numToRemove: int, rng: np.random.Generator):
+    dist = solution.dist
+    for _ in range(numToRemove):
+        candidates, savings = [], []
+        for route in solution.routes:
+            if route:
+                nodes = np.array([0] + route + [0])
+                candidates += route
+                savings += (dist[nodes[:-2], nodes[1:-1]] + dist[nodes[1:-1], nodes[2:]]
+                            - dist[nodes[:-2], nodes[2:]]).tolist()
+        if not candidates:
+            return
+        order = np.argsort(savings)[::-1]
+        removeCustomers(solution, [candidates[order[int(rng.random() ** WORST_RANDOMNESS * len(order))]]])
+
+
+# Destroy operator removing a random customer and the numToRemove - 1 customers most related to the removed customers,
+# where customers are related if they are close, have similar demands and are on the same route
+def relatedRemoval(solution: Solution, numToRemove: int, rng: np.random.Generator):
+    routeOf = locations(solution)[0]
+    assigned = np.flatnonzero(routeOf >= 0)
+    if len(assigned) == 0:
+        return
+    maxDistance = max(solution.dist.max(), 1e-9)
+    maxDemand = max(solution.demands.max(), 1e-9)
+    removed = [int(rng.choice(assigned))]
+    remaining = [customer for customer in assigned.tolist() if customer != removed[0]]
+    while len(removed) < numToRemove and remaining:
+        seed = removed[int(rng.integers(len(removed)))]
+        candidates = np.array(remaining)
+        relatedness = (solution.dist[seed, candidates] / maxDistance
+                       + np.abs(solution.demands[seed] - solution.demands[candidates]) / maxDemand
+                       + (routeOf[candidates] != routeOf[seed]))
+        order = np.argsort(relatedness)
+        chosen = int(candidates[order[int(rng.random() ** RELATED_RANDOMNESS * len(order))]])
+        removed.append(chosen)
+        remaining.remove(chosen)
+    removeCustomers(solution, removed)
+
+
+# Repair operator inserting the unassigned customers one at a time. With regret = 1 the customer with the cheapest
+# insertion is inserted (greedy insertion). Otherwise the customer maximising the sum of the differences between its
+# cheapest insertion and its cheapest insertions into the regret - 1 next best routes is inserted (regret insertion).
+# Customers which do not fit in any route stay unassigned
+def insertCustomers(solution: Solution, rng: np.random.Generator, regret: int = 1):
+    customers = np.array(solution.unassigned, dtype=np.int64)
+    rng.shuffle(customers)
+    numOfRoutes = len(solution.routes)
+    # costs[k][r] and positions[k][r] are the cheapest insertion of customer k into route r
+    costs = np.empty((len(customers), numOfRoutes))
+    positions = np.empty((len(customers), numOfRoutes), dtype=np.int64)
+    for r in range(numOfRoutes):
+        costs[:, r], positions[:, r] = solution.insertionCosts(r, customers)
+    isLeft = np.ones(len(customers), dtype=bool)
+    while isLeft.any():
+        left = np.flatnonzero(isLeft)
+        cheapest = costs[left].min(axis=1)
+        if not np.isfinite(cheapest).any():
+            break
+        if regret == 1 or numOfRoutes == 1:
+            k = left[np.argmin(cheapest)]
+        else:
+            ordered = np.sort(costs[left], axis=1)[:, :regret]
+            # Customers which fit in fewer routes get a large regret, so they are inserted first
+            regrets = np.where(np.isfinite(ordered), ordered, 1e9 * solution.penalty).sum(axis=1) - regret * cheapest
+            regrets[~np.isfinite(cheapest)] = -np.inf
+            # Ties are broken by the cheapest insertion
+            k = left[np.lexsort((cheapest, -regrets))[0]]
+        r = int(np.argmin(costs[k]))
+        solution.insert(int(customers[k]), r, int(positions[k, r]))
+        isLeft[k] = False
+        # Only the insertions into route r have changed
+        left = np.flatnonzero(isLeft)
+        if len(left):
+            costs[left, r], positions[left, r] = solution.insertionCosts(r, customers[left])
+
+
+# Returns the initial solution built from the routes of the savings heuristic. If these use more than m routes, the
+# customers of the routes with the smallest loads are inserted into the m others
+def initialSolution(data: dict, dist: np.ndarray, demands: np.ndarray, rng: np.random.Generator) -> Solution:
+    routes = sorted(sh.solve(data), key=lambda route: -demands[route].sum())
+    routes += [[] for _ in range(data['m'] - len(routes))]
+    solution = Solution(routes[:data['m']], dist, demands, float(data['Q']), 2 * float(dist.max()) + 1)
+    solution.unassigned = [customer for route in routes[data['m']:] for customer in route]
+    insertCustomers(solution, rng)
+    return solution
+
+
+# Runs the ALNS for the given number of iterations from the given random seed, and returns the cost and routes of the
+# best solution found
+def search(data: dict, iterations: int, seed: int) -> tuple:
+    rng = np.random.default_rng(seed)
+    dist = np.asarray(data['dist'], dtype=float)
+    demands = np.asarray(data['q'], dtype=float)
+    current = initialSolution(data, dist, demands, rng)
+    best, bestCost, currentCost = current.copy(), current.cost(), current.cost()
+    destroyOperators = [randomRemoval, worstRemoval, relatedRemoval]
+    repairOperators = [1, REGRET]
+    destroyWeights, repairWeights = np.ones(len(destroyOperators)), np.ones(len(repairOperators))
+    destroyScores, repairScores = np.zeros(len(destroyOperators)), np.zeros(len(repairOperators))
+    destroyUses, repairUses = np.zeros(len(destroyOperators)), np.zeros(len(repairOperators))
+    temperature = -START_WORSENING * currentCost / math.log(0.5)
+    cooling = FINAL_TEMPERATURE ** (1 / max(iterations, 1))
+    maxToRemove = max(min(100, int(0.4 * data['n'])), 1)
+    visited = set()
+    for iteration in range(1, iterations + 1):
+        d = int(rng.choice(len(destroyOperators), p=destroyWeights / destroyWeights.sum()))
+        r = int(rng.choice(len(repairOperators), p=repairWeights / repairWeights.sum()))
+        candidate = current.copy()
+        destroyOperators[d](candidate, int(rng.integers(min(4, maxToRemove), maxToRemove + 1)), rng)
+        insertCustomers(candidate, rng, repairOperators[r])
+        candidateCost = candidate.cost()
+        score, accepted = 0, True
+        if candidateCost < bestCost - 1e-9:
+            best, bestCost = candidate.copy(), candidateCost
+            score = SCORES[0]
+        elif candidateCost < currentCost - 1e-9:
+            score = SCORES[1]
+        elif rng.random() < math.exp(-(candidateCost - currentCost) / temperature):
+            # Only new solutions are rewarded, when they are accepted though worse. Solutions visited before are
+            # accepted all the same
+            key = tuple(tuple(route) for route in sorted(candidate.routes))
+            score = SCORES[2] if key not in visited else 0
+            visited.add(key)
+        else:
+            accepted = False
+        if accepted:
+            current, currentCost = candidate, candidateCost
+        destroyScores[d] += score
+        repairScores[r] += score
+        destroyUses[d] += 1
+        repairUses[r] += 1
+        temperature *= cooling
+        if iteration % SEGMENT == 0:
+            isUsed = destroyUses > 0
+            destroyWeights[isUsed] = ((1 - REACTION) * destroyWeights[isUsed]
+                                      + REACTION * destroyScores[isUsed] / destroyUses[isUsed])
+            isUsed = repairUses > 0
+            repairWeights[isUsed] = ((1 - REACTION) * repairWeights[isUsed]
+                                     + REACTION * repairScores[isUsed] / repairUses[isUsed])
+            # Every operator keeps a small chance of being chosen
+            destroyWeights, repairWeights = np.maximum(destroyWeights, 0.1), np.maximum(repairWeights, 0.1)
+            destroyScores[:], repairScores[:], destroyUses[:], repairUses[:] = 0, 0, 0, 0
+    return bestCost, [route for route in best.routes if route], best.unassigned
+
+
+# Runs restarts independent searches with different random seeds in parallel (on workers processes, all cores if None)
+# and returns the cost, routes and unassigned customers of the best solution found
+def solve(data: dict, iterations: int = 5000, restarts: int = None, workers: int = None) -> tuple:
+    if restarts is None:
+        restarts = os.cpu_count() or 1
+    # Only the data used by the search is sent to the processes
+    problem = {key: data[key] for key in ['n', 'm', 'Q', 'q']}
+    problem['dist'] = np.asarray(data['dist'], dtype=float)
+    if restarts == 1 or workers == 1:
+        results = [search(problem, iterations, seed) for seed in range(restarts)]
+    else:
+        with cf.ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(search, [problem] * restarts, [iterations] * restarts, range(restarts)))
+    return min(results, key=lambda result: result[0])
+
+
+def displaySolution(routes: list, unassigned: list, data: dict):
+    routes = [rd.makeRoute([0] + route + [0], data) for route in routes]
+    print('Total length of the', data['m'], 'tours are', sum(route['length'] for route in routes))
+    if unassigned:
+        print('Customers which could not be assigned to a route:', unassigned)
+    rd.printRoutes(routes)
+    # Start plotting the solution to a coordinate system if coordinates are present
+    rd.plotRoutes(routes, data)
+
+
+def main(filename: str, iterations: int = 5000, restarts: int = None):
+    data = readData(filename)
+    startTime = tm.time()
+    cost, routes, unassigned = solve(data, iterations, restarts)
+    print('The search took %.4f seconds' % (tm.time() - startTime))
+    displaySolution(routes, unassigned, data)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        main(sys.argv[1], *map(int, sys.argv[2:4]))
+    else:
+        main('cvrpDataFile_n_29')
@@ -0,0 +1,111 @@
+# Separation of rounded capacity inequalities (RCIs) for fractional solutions of the CVRP, for the course "Modellering
+# inden for Prescriptive Analytics"
+# For a set S of customers, at least k(S) = ceil(q(S)/Q) vehicles must enter and leave S, where q(S) is the total demand
+# of the customers in S. With w[i][j] = x[i][j] + x[j][i] the weight of the edge {i, j}, this gives the RCI
+#     x(delta(S)) = sum ( i in S ) sum ( j not in S ) w[i][j] >= 2 * k(S)
+# Due to the degree constraints of the customers this is the same as
+#     sum ( i in S ) sum ( j in S ) x[i][j] <= |S| - k(S)
+# which is the form added to the models (like the SECs of the TSP, which are the RCIs with k(S) = 1). The MTZ and flow
+# constraints imply the RCIs for integer solutions, but their LP relaxations violate many of them, so adding the RCIs
+# violated by the LP relaxation gives a much better bound at the root node.
+# Finding the most violated RCI is NP-hard, so the sets are found by two heuristics on the graph of the edges with
+# positive weight (the support graph)
+# - connected components: every connected component of the support graph without the depot is checked
+# - greedy shrinking: customers joined by edges of weight (at least) 1 are shrunk into one super node, as they are
+#   mostly on the same route. From each super node a set is grown by repeatedly adding the super node with the largest
+#   weight to the set, and the most violated set met on the way is kept
+# The cut weight of a set is updated in O(1) time when a super node is added, so each growth takes O(K^2) time for K
+# super nodes.
+
+import numpy as np                  # Used for storing the weights
+import subtours as st               # Used for reading the values of x
+
+
+# Returns the n+1 x n+1 matrix of the weights w[i][j] = x[i][j] + x[j][i] of the edges in the current solution. x is
+# either an indexed Pyomo variable, whose values are extracted in one call, or a block of arc variables of a MatrixModel
+def edgeWeights(x, numOfNodes: int, tolerance: float = 1e-6) -> np.ndarray:
+    weights = np.zeros((numOfNodes, numOfNodes))
+    if hasattr(x, 'extract_values'):
+        values = {arc: value for arc, value in x.extract_values().items() if value is not None and value > tolerance}
+        ends = np.array(list(values), dtype=np.int64).reshape(-1, 2)
+        np.add.at(weights, (ends[:, 0], ends[:, 1]), np.array(list(values.values()), dtype=float))
+    else:
+        tails, heads = st.selectedArcs(x, tolerance)
+        np.add.at(weights, (tails, heads), np.asarray(x.value, dtype=float)[np.asarray(x.value) > tolerance])
+    return weights + weights.T
+
+
+# Returns the number of vehicles k(S) = ceil(q(S)/Q) needed to serve the customers of the set S
+def requiredVehicles(customers: list, demands, capacity: float, tolerance: float = 1e-6) -> int:
+    return int(np.ceil(np.asarray(demands, dtype=float)[customers].sum() / capacity - tolerance))
+
+
+# Returns the violation 2*k(S) - x(delta(S)) of the RCI of the set S for the edge weights. Positive if violated
+def violation(weights: np.ndarray, customers: list, demands, capacity: float) -> float:
+    isInSet = np.zeros(len(weights), dtype=bool)
+    isInSet[customers] = True
+    cutWeight = weights[np.ix_(isInSet, ~isInSet)].sum()
+    return 2 * requiredVehicles(customers, demands, capacity) - cutWeight
+
+
+# Returns the connected components of the support graph without the depot as lists of customers
+def componentSets(weights: np.ndarray, tolerance: float = 1e-6) -> list:
+    import scipy.sparse.csgraph as cs  # Only needed when RCIs are separated
+    numOfComponents, componentOf = cs.connected_components(weights[1:, 1:] > tolerance, directed=False)
+    return [(np.flatnonzero(componentOf == c) + 1).tolist() for c in range(numOfComponents)]
+
+
+# Returns the sets found by greedy growth from each super node of the shrunk support graph (see the top of the file).
+# For each super node the most violated set met is returned, if its RCI is violated by more than tolerance
+def greedySets(weights: np.ndarray, demands, capacity: float, tolerance: float = 1e-6) -> list:
+    import scipy.sparse.csgraph as cs  # Only needed when RCIs are separated
+    demands = np.asarray(demands, dtype=float)
+    # Shrink the customers joined by edges of weight at least 1 into super nodes
+    numOfSuperNodes, superNodeOf = cs.connected_components(weights[1:, 1:] >= 1 - tolerance, directed=False)
+    members = [np.flatnonzero(superNodeOf == s) + 1 for s in range(numOfSuperNodes)]
+    # The weights between the super nodes, the total weight of the edges leaving each super node and their demands
+    shrink = np.zeros((numOfSuperNodes, len(weights)))
+    shrink[superNodeOf, np.arange(1, len(weights))] = 1
+    between = shrink @ weights @ shrink.T
+    leaving = shrink @ weights.sum(axis=1) - np.diag(between)
+    np.fill_diagonal(between, 0)
+    superDemands = shrink @ demands
+    found = []
+    for seed in range(numOfSuperNodes):
+        isInSet = np.zeros(numOfSuperNodes, dtype=bool)
+        isInSet[seed] = True
+        # attached[s] is the weight of the edges between super node s and the set
+        attached = between[seed].copy()
+        cutWeight, demand = leaving[seed], superDemands[seed]
+        bestViolation = 2 * np.ceil(demand / capacity - tolerance) - cutWeight
+        best = isInSet.copy()
+        for _ in range(numOfSuperNodes - 1):
+            candidates = np.where(isInSet, -np.inf, attached)
+            s = int(np.argmax(candidates))
+            if candidates[s] <= tolerance:
+                break
+            isInSet[s] = True
+            cutWeight += leaving[s] - 2 * attached[s]
+            demand += superDemands[s]
+            attached += between[s]
+            setViolation = 2 * np.ceil(demand / capacity - tolerance) - cutWeight
+            if setViolation > bestViolation:
+                bestViolation, best = setViolation, isInSet.copy()
+        if bestViolation > tolerance:
+            found.append(np.concatenate([members[s] for s in np.flatnonzero(best)]).tolist())
+    return found
+
+
+# Returns the sets of customers (as sorted lists) whose RCIs are violated by more than tolerance by the current values of
+# the arc variables x (an indexed Pyomo variable or a block of arc variables of a MatrixModel), most violated first.
+# At most maxCuts sets are returned if given. An empty list means that no violated RCI was found
+def separateCapacityCuts(x, data: dict, tolerance: float = 1e-6, maxCuts: int = None) -> list:
+    weights = edgeWeights(x, data['n'] + 1, tolerance)
+    violated = {}
+    for customers in componentSets(weights, tolerance) + greedySets(weights, data['q'], data['Q'], tolerance):
+        customers = sorted(customers)
+        setViolation = violation(weights, customers, data['q'], data['Q'])
+        if setViolation > tolerance:
+            violated[tuple(customers)] = setViolation
+    cutList = [list(customers) for customers in sorted(violated, key=lambda customers: -violated[customers])]
+    return cutList[:maxCuts] if maxCuts is not None else cutList
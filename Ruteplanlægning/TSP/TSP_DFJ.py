@@ -4,6 +4,8 @@
 # The implementation uses the full DFJ formulation - with all subsets of {0..n} enumerated and all sub-tour constraitns
 # added up front.
 # This is a hopeless approach for solving the TSP and is only implemented for educational purposes!
+# By default main(...) instead solves small instances (at most heldKarp.MAX_NODES nodes) exactly by the dynamic program
+# of Held and Karp, and larger instances by the dynamic SEC model of TSP_DFJ_dynamic.py
 # The  IP solved is given by
 # min   sum ( i in 0..n ) sum( j in 0..n) d[i][j]*x[i][j]
 # s.t.  sum ( i in 0..n : i!=j ) x[i][j] == 1, for all j=0,..,n
@@ -16,57 +18,72 @@
 
 import pyomo.environ as pyomo       # Used to model the IP
 import readAndWriteJson as rwJson   # Used for reading the data file in Json format
-import matplotlib.pyplot as plt     # Used for plotting the result
+import routeDecoder as rd          # Used for reading the routes from the solution
+import heldKarp as hk               # Used for solving small instances by dynamic programming
+import TSP_DFJ_dynamic as dynamic   # Used for solving large instances by dynamically generated SECs
+import tspHeuristics as th          # Used for finding a good tour to start the solver from
 
 
-# Returns all subsets of a list which has no less than 2 elements and no more than len(s)-1
-def powerset(s: list) -> list:
+# Generates all subsets of a list which has no less than 2 elements and no more than len(s)-1. The subsets are generated
+# one at a time, such that they are never all stored at once
+def powerset(s: list):
     x = len(s)
-    allSubSets = []
     for i in range(1 << x):
         nextList = [s[j] for j in range(x) if (i & (1 << j))]
         nextListLength = len(nextList)
         if 2 <= nextListLength <= x - 1:
-            allSubSets.append(nextList)
-    return allSubSets
+            yield nextList
 
 
 def readData(filename: str) -> dict:
     data = rwJson.readJsonFileToDictionary(filename)
-    data['allSubSets'] = powerset(list(range(0, data['n'])))
     return data
 
 
+# Returns the sorted list of arcs (i,j) the model is built on. If the data contains a list of arcs (e.g. a sparse
+# candidate graph), only these arcs are used. Otherwise all pairs of nodes are used. Self-loops are never included
+def makeArcSet(data: dict) -> list:
+    numOfNodes = data['n'] + 1
+    if 'arcs' not in data:
+        return [(i, j) for i in range(numOfNodes) for j in range(numOfNodes) if i != j]
+    return sorted(set((int(i), int(j)) for i, j in data['arcs'] if i != j))
+
+
 def buildModel(data: dict) -> pyomo.ConcreteModel():
     model = pyomo.ConcreteModel()
     # Add descriptive comments here
     model.nodes = range(0, data['n']+1)
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    # Add descriptive comments here
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    # The arcs the model is built on. No variables are created for self-loops or arcs left out of model.arcs
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
     # Add descriptive comments here
     model.obj = pyomo.Objective(
-        expr=sum(data['dist'][i][j]*model.x[i, j] for i in model.nodes for j in model.nodes if i != j)
+        expr=sum(data['dist'][i][j]*model.x[i, j] for i, j in model.arcs)
     )
     # Add descriptive comments here
     model.sumToOne = pyomo.ConstraintList()
     for i in model.nodes:
         # Out of node i
-        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.successors[i]) == 1)
         # Into node i
-        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.predecessors[i]) == 1)
 
     # Add all the sub-tour elimination constraints
     model.SECs = pyomo.ConstraintList()
-    for set in data['allSubSets']:
-        model.SECs.add(expr=sum(model.x[i, j] for i in set for j in set if i != j) <= len(set)-1)
+    for set in powerset(list(range(0, data['n']))):
+        model.SECs.add(expr=sum(model.x[i, j] for i in set for j in set if (i, j) in model.x) <= len(set)-1)
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
+# If warmstart is True, the current values of the variables (e.g. set by th.setMipStart(...)) are passed as a MIP start
+def solveModel(model: pyomo.ConcreteModel(), warmstart: bool = False):
     solver = pyomo.SolverFactory('gurobi')
-    solver.solve(model, tee=True)
+    solver.solve(model, tee=True, warmstart=warmstart)
 
 
 def displaySolution(model: pyomo.ConcreteModel(), data: dict):
@@ -74,66 +91,48 @@ def displaySolution(model: pyomo.ConcreteModel(), data: dict):
     # Print solution information to prompt
     print('Objective function value =', pyomo.value(model.obj))
     print('Optimal tour is')
-    curNode = 0
-    print(curNode, '->', end='')
-    KeepOn = True
-    counter = 0
-    # flag for testing if coordinates are present in the data
-    coordinatesPresent = 'xCord' in data and 'yCord' in data
-    if coordinatesPresent:
-        displayX = [data['xCord'][0]]
-        displayY = [data['yCord'][0]]
-        labels = [0]
     # Find the route from the x[i,j] values
-    while KeepOn:
-        counter = counter + 1
-        # Find next on route
-        for i in model.nodes:
-            if i != curNode and pyomo.value(model.x[curNode, i]) == 1:
-                if coordinatesPresent:
-                    displayX.append(data['xCord'][i])
-                    displayY.append(data['yCord'][i])
-                if i > 0:
-                    print(i, '->', end='')
-                    if coordinatesPresent:
-                        labels.append(i)
-                else:
-                    print(i, end='')
-                tmpCurNode = i
-        curNode = tmpCurNode
-        if curNode < 1:
-            break
+    routes = rd.decodeRoutes(model, data)
+    rd.printRoutes(routes)
     # Start plotting the solution to a coordinate system
-    if coordinatesPresent:
-        plt.plot(displayX, displayY, '-o')
-        for i, label in enumerate(labels):
-            plt.annotate(label, (displayX[i], displayY[i]))
-        plt.show()
+    rd.plotRoutes(routes, data)
 
 
 def displaySolutionSimple(model: pyomo.ConcreteModel(), data: dict):
-    currentNode = 0
-    # Find first on tour:
-    for j in model.nodes:
-        if pyomo.value(model.x[currentNode, j]) >= 0.9999:
-            print('0 ->', j, end='')
-            currentNode = j
-            break
-    # Find the remaining nodes of the tour
-    while currentNode != 0:
-        # Find the next node
-        for j in model.nodes:
-            if pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                print('->', j, end='')
-                currentNode = j
-                break
-
-
-def main(filename: str):
+    for route in rd.decodeRoutes(model):
+        print(' -> '.join(map(str, route['nodes'].tolist())))
+
+
+def displayTour(tour: list, length: float, data: dict):
+    print('Objective function value =', length)
+    print('Optimal tour is')
+    routes = [rd.makeRoute(tour + tour[:1], data)]
+    rd.printRoutes(routes)
+    # Start plotting the solution to a coordinate system
+    rd.plotRoutes(routes, data)
+
+
+# method is one of
+# - 'heldKarp': solve the instance by the dynamic program of heldKarp.py
+# - 'full': solve the full DFJ model with all the SECs added up front
+# - 'dynamic': solve the instance by the dynamic SEC model of TSP_DFJ_dynamic.py
+# - 'auto': use 'heldKarp' for instances with at most hk.MAX_NODES nodes and 'dynamic' otherwise
+def main(filename: str, method: str = 'auto', heuristicStart: bool = True):
     data = readData(filename)
-    model = buildModel(data)
-    solveModel(model)
-    displaySolution(model, data)
+    if method == 'auto':
+        method = 'heldKarp' if data['n'] + 1 <= hk.MAX_NODES else 'dynamic'
+    if method == 'heldKarp':
+        tour, length = hk.heldKarp(data['dist'], data.get('arcs'))
+        displayTour(tour, length, data)
+    elif method == 'dynamic':
+        dynamic.main(filename, heuristicStart=heuristicStart)
+    elif method == 'full':
+        model = buildModel(data)
+        # Start the solver from the tour found by the heuristics
+        solveModel(model, heuristicStart and th.setMipStart(model, th.heuristicTour(data['dist'])[0]))
+        displaySolution(model, data)
+    else:
+        raise ValueError('Unknown method ' + str(method) + ". Use 'auto', 'heldKarp', 'full' or 'dynamic'")
 
 
 if __name__ == '__main__':
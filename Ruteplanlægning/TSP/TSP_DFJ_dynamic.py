@@ -19,12 +19,22 @@
 #         sum ( i in S ) sum ( j in S ) x[i][j] <= |S| - 1
 #         Go back to Step 1.
 # Step 4: Return the solution X as an optimal solution to the TSP
+# Alternatively, solveModelLazy(...) adds the cuts of Step 3 inside a single branch-and-cut tree, each time the solver
+# finds a new incumbent
+# Before Step 1, addRootCuts(...) can strengthen the master problem by the SECs violated by its LP relaxation
+# The first master problem (or the single tree of solveModelLazy(...)) is started from a tour found by the heuristics
+# of tspHeuristics.py
 # The readData(...) function uses the readAndWriteJson file to read data from a Json file
 
 import pyomo.environ as pyomo       # Used to model the IP
 import readAndWriteJson as rwJson   # Used for reading the data file in Json format
-import matplotlib.pyplot as plt     # Used for plotting the result
+import routeDecoder as rd          # Used for reading the routes from the solution
 import time as tm                   # Used for timing the solution process
+import candidateGraph as cg         # Used for building a sparse candidate graph of the arcs
+import subtours as st               # Used for finding the sub tours of a solution
+import secSeparation as sep         # Used for finding violated SECs in fractional solutions
+import tspHeuristics as th          # Used for finding a good tour to start the solver from
+import oneTreeBound as ob           # Used for leaving out arcs which cannot be in an optimal tour
 
 
 def readData(filename: str) -> dict:
@@ -32,47 +42,28 @@ def readData(filename: str) -> dict:
     return data
 
 
+# Returns the sorted list of arcs (i,j) the model is built on. If the data contains a list of arcs (e.g. a sparse
+# candidate graph), only these arcs are used. Otherwise all pairs of nodes are used. Self-loops are never included
+def makeArcSet(data: dict) -> list:
+    numOfNodes = data['n'] + 1
+    if 'arcs' not in data:
+        return [(i, j) for i in range(numOfNodes) for j in range(numOfNodes) if i != j]
+    return sorted(set((int(i), int(j)) for i, j in data['arcs'] if i != j))
+
+
+# Returns the cycles of the current solution as lists of nodes. The solution is a tour, if the first cycle (the cycle of
+# node 0) contains all nodes. The values of x are read in one bulk operation, and the cycles are found in O(n) time
 def checkFeasibility(model: pyomo.ConcreteModel()) -> list:
-    nodeVisited = [False]*model.numOfNodes
-    cutList = []
-    nodeVisited[0] = True
-    printPartialSolutionToScreen = False
-
-    for idx, node in enumerate(nodeVisited):
-        if not node:
-            # Find sub-tour including node
-            currentNode = idx
-            # Add empty cut to list of cuts
-            cutList.append([idx])
-            # Find first on tour
-            for j in model.nodes:
-                if pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                    if printPartialSolutionToScreen:
-                        print('0 ->', j, end='')
-                    currentNode = j
-                    cutList[-1].append(j)
-                    nodeVisited[currentNode] = True
-                    break
-            # Find the rest of the nodes on the (sub) tour
-            while currentNode != idx:
-                # Find the next node
-                for j in model.nodes:
-                    if pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                        if printPartialSolutionToScreen:
-                            print('->', j, end='')
-                        currentNode = j
-                        if currentNode != idx:
-                            cutList[-1].append(j)
-                        nodeVisited[currentNode] = True
-                        break
-            if printPartialSolutionToScreen:
-                print('')
-    return cutList
-
-
-def addCut(cutList: list, model: pyomo.ConcreteModel()):
+    tails, heads = st.selectedArcs(model.x)
+    return st.cycles(st.successorArray(model.numOfNodes, tails, heads))
+
+
+# Adds a SEC for each sub tour in cutList to the model, and returns the new constraints
+def addCut(cutList: list, model: pyomo.ConcreteModel()) -> list:
+    newCuts = []
     for cut in cutList:
-        model.SECs.add(expr=sum(model.x[i, j] for i in cut for j in cut if i != j) <= len(cut) - 1)
+        newCuts.append(model.SECs.add(expr=sum(model.x[i, j] for i in cut for j in cut if (i, j) in model.x) <= len(cut) - 1))
+    return newCuts
 
 
 def buildModel(data: dict) -> pyomo.ConcreteModel():
@@ -80,34 +71,103 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     model.numOfNodes = data['n']+1
     # Add descriptive comments here
     model.nodes = range(0, model.numOfNodes)
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    # Add descriptive comments here
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    # The arcs the model is built on. No variables are created for self-loops or arcs left out of model.arcs
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
     # Add descriptive comments here
     model.obj = pyomo.Objective(
-        expr=sum(data['dist'][i][j]*model.x[i, j] for i in model.nodes for j in model.nodes if i != j)
+        expr=sum(data['dist'][i][j]*model.x[i, j] for i, j in model.arcs)
     )
     # Add descriptive comments here
     model.sumToOne = pyomo.ConstraintList()
     for i in model.nodes:
         # Out of node i
-        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.successors[i]) == 1)
         # Into node i
-        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.predecessors[i]) == 1)
     model.SECs = pyomo.ConstraintList()
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
-    solver = pyomo.SolverFactory('gurobi')
+# Strengthens the master problem by solving its LP relaxation and adding the SECs it violates (found by min cuts in
+# secSeparation.py) until no SEC is violated, or maxRounds rounds have been made. The SECs are kept in the model, so the
+# root bound of the integer master problem solved afterwards is the LP bound of all SECs
+def addRootCuts(model: pyomo.ConcreteModel(), maxRounds: int = 100):
+    start_time = tm.time()
+    # Relax the integrality of x while the LP relaxation is solved
+    for i, j in model.arcs:
+        model.x[i, j].domain = pyomo.UnitInterval
+    solver = pyomo.SolverFactory('gurobi_persistent')
+    solver.set_instance(model)
     cutsAdded = 0
-    iterations = 0
-    forPrint = ['Iterations', 'Cuts added', 'Objective value']
-    print("{: >10} {: >15} {: >20}".format(*forPrint))
+    forPrint = ['Rounds', 'Cuts added', 'LP bound', 'Separate (s)', 'Solve (s)']
+    print("{: >10} {: >15} {: >20} {: >12} {: >10}".format(*forPrint))
+    for rounds in range(1, maxRounds + 1):
+        solveStart = tm.time()
+        solver.solve(tee=False, save_results=False)
+        solveTime = tm.time() - solveStart
+        separateStart = tm.time()
+        violatedSets = sep.separateSECs(model.x, model.numOfNodes)
+        for cut in addCut(violatedSets, model):
+            solver.add_constraint(cut)
+        cutsAdded += len(violatedSets)
+        forPrint = [rounds, cutsAdded, pyomo.value(model.obj), tm.time() - separateStart, solveTime]
+        print("{: >10} {: >15} {: >20.4f} {: >12.4f} {: >10.4f}".format(*forPrint))
+        if not violatedSets:
+            break
+    for i, j in model.arcs:
+        model.x[i, j].domain = pyomo.Binary
+    print("Root cuts took %.6s seconds" % (tm.time() - start_time))
+
+
+# Returns the time (in seconds) the solver reports to have spent solving the model, or None if no time is reported
+def reportedSolverTime(results) -> float:
+    for attribute in ['wall_time', 'wallclock_time', 'time']:
+        value = getattr(results.solver, attribute, None)
+        if isinstance(value, (int, float)):
+            return value
+    return None
+
+
+# Solves the model by adding SECs until the solution contains no sub tours.
+# If persistent is True, the model is only loaded into Gurobi once. In each iteration only the new SECs are added to the
+# model held by Gurobi, which then re-optimizes starting from the previous solution. Otherwise the whole model is
+# written to a file and solved from scratch in every iteration.
+# For each iteration the time spent on the following is printed
+#   Build: finding the sub tours and building the SECs in Pyomo
+#   Write: passing the model (or only the new SECs) to the solver and reading back the solution
+#   Solve: the solver itself
+def solveModel(model: pyomo.ConcreteModel(), persistent: bool = True):
     start_time = tm.time()
+    if persistent:
+        solver = pyomo.SolverFactory('gurobi_persistent')
+        solver.set_instance(model)
+        print("Model loaded into the solver in %.4f seconds" % (tm.time() - start_time))
+    else:
+        solver = pyomo.SolverFactory('gurobi')
+    cutsAdded = 0
+    iterations = 0
+    forPrint = ['Iterations', 'Cuts added', 'Objective value', 'Build (s)', 'Write (s)', 'Solve (s)']
+    print("{: >10} {: >15} {: >20} {: >10} {: >10} {: >10}".format(*forPrint))
     while True:
-        solver.solve(model, tee=False)
+        solveStart = tm.time()
+        # The previous solution is passed as a MIP start. Gurobi tries to repair it, if it violates the new SECs
+        if persistent:
+            solver.solve(tee=False, warmstart=True, save_results=False)
+            solveTime = tm.time() - solveStart
+        else:
+            results = solver.solve(model, tee=False, warmstart=True)
+            # The rest of the time is spent writing the model to a file and reading the solution
+            solveTime = reportedSolverTime(results)
+            if solveTime is None:
+                solveTime = tm.time() - solveStart
+            writeTime = tm.time() - solveStart - solveTime
+        buildStart = tm.time()
         cutList = checkFeasibility(model)
         optValue = pyomo.value(model.obj)
 
@@ -115,77 +175,112 @@ def solveModel(model: pyomo.ConcreteModel()):
             break
         else:
             cutsAdded += len(cutList)
-            addCut(cutList, model)
+            newCuts = addCut(cutList, model)
+        buildTime = tm.time() - buildStart
+        if persistent:
+            writeStart = tm.time()
+            for cut in newCuts:
+                solver.add_constraint(cut)
+            writeTime = tm.time() - writeStart
         iterations += 1
-        forPrint = [iterations, cutsAdded, optValue]
-        print("{: >10} {: >15} {: >20.4f}".format(*forPrint))
+        forPrint = [iterations, cutsAdded, optValue, buildTime, writeTime, solveTime]
+        print("{: >10} {: >15} {: >20.4f} {: >10.4f} {: >10.4f} {: >10.4f}".format(*forPrint))
     print("Solution process took %.6s seconds" % (tm.time() - start_time))
     print('Number of cuts added before optimal solution was proven:', cutsAdded)
 
 
+# Solves the model by branch-and-cut in a single search tree. Each time Gurobi finds a new incumbent, the callback looks
+# for sub tours in it, and adds the SECs as lazy constraints, which cuts off the incumbent. Hence the bounds proven in
+# the tree are kept, instead of solving the master problem from scratch after each round of cuts as in solveModel(...)
+# A line is printed for each incumbent rejected (an iteration), with the same columns as solveModel(...) prints:
+#   Build: finding the sub tours and building the SECs in Pyomo
+#   Write: passing the SECs to Gurobi as lazy constraints
+#   Solve: the time Gurobi spent since the previous incumbent
+def solveModelLazy(model: pyomo.ConcreteModel()):
+    from gurobipy import GRB  # Only needed for the callback constants
+    start_time = tm.time()
+    solver = pyomo.SolverFactory('gurobi_persistent')
+    solver.set_instance(model)
+    # Lazy constraints must be enabled before the solve, as they disable some presolve reductions
+    solver.set_gurobi_param('LazyConstraints', 1)
+    print("Model loaded into the solver in %.4f seconds" % (tm.time() - start_time))
+    statistics = {'iterations': 0, 'cutsAdded': 0, 'lastCallback': tm.time()}
+    forPrint = ['Iterations', 'Cuts added', 'Objective value', 'Build (s)', 'Write (s)', 'Solve (s)']
+    print("{: >10} {: >15} {: >20} {: >10} {: >10} {: >10}".format(*forPrint))
+
+    def separateSubTours(cbModel, cbSolver, cbWhere):
+        if cbWhere != GRB.Callback.MIPSOL:
+            return
+        solveTime = tm.time() - statistics['lastCallback']
+        buildStart = tm.time()
+        # Load the values of the new incumbent into the Pyomo variables, such that checkFeasibility(...) can be used
+        cbSolver.cbGetSolution(vars=list(model.x.values()))
+        cutList = checkFeasibility(model)
+        if len(cutList[0]) < model.numOfNodes:
+            newCuts = addCut(cutList, model)
+            buildTime = tm.time() - buildStart
+            writeStart = tm.time()
+            for cut in newCuts:
+                cbSolver.cbLazy(cut)
+            writeTime = tm.time() - writeStart
+            statistics['iterations'] += 1
+            statistics['cutsAdded'] += len(cutList)
+            forPrint = [statistics['iterations'], statistics['cutsAdded'], cbSolver.cbGet(GRB.Callback.MIPSOL_OBJ),
+                        buildTime, writeTime, solveTime]
+            print("{: >10} {: >15} {: >20.4f} {: >10.4f} {: >10.4f} {: >10.4f}".format(*forPrint))
+        statistics['lastCallback'] = tm.time()
+
+    solver.set_callback(separateSubTours)
+    # The current values of x (e.g. set by th.setMipStart(...)) are passed as a MIP start
+    solver.solve(tee=False, warmstart=True, save_results=False)
+    print("Solution process took %.6s seconds" % (tm.time() - start_time))
+    print('Number of cuts added before optimal solution was proven:', statistics['cutsAdded'])
+
+
 def displaySolution(model: pyomo.ConcreteModel(), data: dict):
     print('Solution value is:', pyomo.value(model.obj))
     # Print solution information to prompt
     print('Objective function value =', pyomo.value(model.obj))
     print('Optimal tour is')
-    curNode = 0
-    print(curNode, '->', end='')
-    KeepOn = True
-    counter = 0
-    # flag for testing if coordinates are present in the data
-    coordinatesPresent = 'xCord' in data and 'yCord' in data
-    if coordinatesPresent:
-        displayX = [data['xCord'][0]]
-        displayY = [data['yCord'][0]]
-        labels = [0]
     # Find the route from the x[i,j] values
-    while KeepOn:
-        counter = counter + 1
-        # Find next on route
-        for i in model.nodes:
-            if i != curNode and pyomo.value(model.x[curNode, i]) == 1:
-                if coordinatesPresent:
-                    displayX.append(data['xCord'][i])
-                    displayY.append(data['yCord'][i])
-                if i > 0:
-                    print(i, '->', end='')
-                    if coordinatesPresent:
-                        labels.append(i)
-                else:
-                    print(i, end='')
-                tmpCurNode = i
-        curNode = tmpCurNode
-        if curNode < 1:
-            break
+    routes = rd.decodeRoutes(model, data)
+    rd.printRoutes(routes)
     # Start plotting the solution to a coordinate system
-    if coordinatesPresent:
-        plt.plot(displayX, displayY, '-o')
-        for i, label in enumerate(labels):
-            plt.annotate(label, (displayX[i], displayY[i]))
-        plt.show()
+    rd.plotRoutes(routes, data)
 
 
 def displaySolutionSimple(model: pyomo.ConcreteModel()):
-    currentNode = 0
-    # Find first on tour:
-    for j in model.nodes:
-        if pyomo.value(model.x[currentNode, j]) >= 0.9999:
-            print('0 ->', j, end='')
-            currentNode = j
-            break
-    while currentNode != 0:
-        # Find the next node
-        for j in model.nodes:
-            if pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                print('->', j, end='')
-                currentNode = j
-                break
+    for route in rd.decodeRoutes(model):
+        print(' -> '.join(map(str, route['nodes'].tolist())))
 
 
-def main(filename: str):
+def main(filename: str, neighbours: int = None, lazy: bool = False, rootCuts: bool = True,
+         heuristicStart: bool = True, reduceArcs: bool = False):
     data = readData(filename)
+    if neighbours is not None:
+        # Only build the model on the arcs between each node and its nearest neighbours
+        cg.addCandidateGraph(data, k=neighbours)
+    if reduceArcs:
+        # Leave out the arcs which cannot be used by a tour shorter than the tour found by the heuristics
+        bound, upperBound = ob.eliminateArcs(data)
+        print('Held-Karp bound:', bound, 'Heuristic tour:', upperBound, 'Arcs left:', len(data['arcs']))
+    tour = None
+    if heuristicStart or 'arcs' in data:
+        tour = th.heuristicTour(data['dist'])[0]
+    if 'arcs' in data:
+        # Put the arcs of the heuristic tour back into the graph, such that the model always has a feasible solution and
+        # can be started from the tour
+        cg.reAddArcs(data, th.tourArcs(tour))
     model = buildModel(data)
-    solveModel(model)
+    if rootCuts:
+        addRootCuts(model)
+    if heuristicStart:
+        # Set after the root cuts, since solving the LP relaxation overwrites the values of x
+        th.setMipStart(model, tour)
+    if lazy:
+        solveModelLazy(model)
+    else:
+        solveModel(model)
     displaySolution(model, data)
 
 
@@ -16,7 +16,12 @@
 
 import pyomo.environ as pyomo       # Used to model the IP
 import readAndWriteJson as rwJson   # Used for reading the data file in Json format
-import matplotlib.pyplot as plt     # Used for plotting the result
+import routeDecoder as rd          # Used for reading the routes from the solution
+import numpy as np                  # Used for building the constraint matrices
+import matrixModel as mm            # Used for building the model from sparse matrices
+import candidateGraph as cg         # Used for building a sparse candidate graph of the arcs
+import tspHeuristics as th          # Used for finding a good tour to start the solver from
+import oneTreeBound as ob           # Used for leaving out arcs which cannot be in an optimal tour
 
 
 def readData(filename: str) -> dict:
@@ -24,41 +29,90 @@ def readData(filename: str) -> dict:
     return data
 
 
+# Returns the sorted list of arcs (i,j) the model is built on. If the data contains a list of arcs (e.g. a sparse
+# candidate graph), only these arcs are used. Otherwise all pairs of nodes are used. Self-loops are never included
+def makeArcSet(data: dict) -> list:
+    numOfNodes = data['n'] + 1
+    if 'arcs' not in data:
+        return [(i, j) for i in range(numOfNodes) for j in range(numOfNodes) if i != j]
+    return sorted(set((int(i), int(j)) for i, j in data['arcs'] if i != j))
+
+
 def buildModel(data: dict) -> pyomo.ConcreteModel():
     model = pyomo.ConcreteModel()
     model.numOfNodes = data['n']+1
     # Add descriptive comments here
     model.nodes = range(0, model.numOfNodes)
     model.customers = range(1, model.numOfNodes)
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
+    # The arcs the model is built on. No variables are created for self-loops or arcs left out of model.arcs
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
     model.u = pyomo.Var(model.customers, within=pyomo.NonNegativeReals, bounds=(1, data['n']))
     # Add descriptive comments here
-    for i in model.nodes:
-        model.x[i, i].fix(0)
-    # Add descriptive comments here
     model.obj = pyomo.Objective(
-        expr=sum(data['dist'][i][j]*model.x[i, j] for i in model.nodes for j in model.nodes if i != j)
+        expr=sum(data['dist'][i][j]*model.x[i, j] for i, j in model.arcs)
     )
     # Add descriptive comments here
     model.sumToOne = pyomo.ConstraintList()
     for i in model.nodes:
         # Out of node i
-        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.successors[i]) == 1)
         # Into node i
-        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.predecessors[i]) == 1)
     # Add descriptive comments here
+    # The constraints are only added for pairs of customers with an arc in at least one direction, since the bounds
+    # on u imply the constraints of all other pairs. Terms of missing arcs are left out
     model.MTZ = pyomo.ConstraintList()
-    for i in model.customers:
-        for j in model.customers:
-            model.MTZ.add(
-                expr=model.u[i] - model.u[j] + data['n']*model.x[i, j] + (data['n']-2)*model.x[j, i] <= data['n'] - 1
-            )
+    for i, j in sorted(set(model.arcs) | set((j, i) for i, j in model.arcs)):
+        if i in model.customers and j in model.customers:
+            lhs = model.u[i] - model.u[j]
+            if (i, j) in model.x:
+                lhs += data['n']*model.x[i, j]
+            if (j, i) in model.x:
+                lhs += (data['n']-2)*model.x[j, i]
+            model.MTZ.add(expr=lhs <= data['n'] - 1)
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
+# Builds the same model as buildModel(...), but each family of constraints is added as one sparse matrix instead of one
+# Pyomo expression at a time. Much faster to build for large instances, and displaySolution(...) works on both models
+def buildMatrixModel(data: dict) -> mm.MatrixModel:
+    model = mm.MatrixModel()
+    model.numOfNodes = data['n'] + 1
+    model.nodes = range(0, model.numOfNodes)
+    model.customers = range(1, model.numOfNodes)
+    # The arc variables x[i][j], one for each arc the model is built on
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = model.addArcVariables('x', model.numOfNodes, model.arcs, upper=1, integer=True, cost=data['dist'])
+    # u[0] is fixed to 0 and not used, such that u[i] is the variable of customer i as in buildModel(...)
+    model.u = model.addVariables('u', model.numOfNodes, lower=np.minimum(model.nodes, 1),
+                                 upper=np.where(np.arange(model.numOfNodes) > 0, data['n'], 0))
+    # In- and out-degree constraints for all nodes
+    mm.addDegreeConstraints(model, 'sumToOne', model.x)
+    # The lifted MTZ constraints u[i] - u[j] + n*x[i][j] + (n-2)*x[j][i] <= n-1 for the pairs of customers with an
+    # arc between them
+    mm.addLiftedMTZConstraints(model, 'MTZ', model.x, model.u, data['n'], 1, nodes=model.customers)
+    return model
+
+
+# If warmstart is True, the current values of the variables (e.g. set by th.setMipStart(...)) are passed as a MIP start
+def solveModel(model: pyomo.ConcreteModel(), warmstart: bool = False):
     solver = pyomo.SolverFactory('gurobi')
-    solver.solve(model, tee=True)
+    solver.solve(model, tee=True, warmstart=warmstart)
+
+
+def solveMatrixModel(model: mm.MatrixModel):
+    model.solve('gurobi', tee=True)
 
 
 def displaySolution(model: pyomo.ConcreteModel(), data: dict):
@@ -66,47 +120,37 @@ def displaySolution(model: pyomo.ConcreteModel(), data: dict):
     # Print solution information to prompt
     print('Objective function value =', pyomo.value(model.obj))
     print('Optimal tour is')
-    curNode = 0
-    print(curNode, '->', end='')
-    KeepOn = True
-    counter = 0
-    # flag for testing if coordinates are present in the data
-    coordinatesPresent = 'xCord' in data and 'yCord' in data
-    if coordinatesPresent:
-        displayX = [data['xCord'][0]]
-        displayY = [data['yCord'][0]]
-        labels = [0]
     # Find the route from the x[i,j] values
-    while KeepOn:
-        counter = counter + 1
-        # Find next on route
-        for i in model.nodes:
-            if i != curNode and pyomo.value(model.x[curNode, i]) == 1:
-                if coordinatesPresent:
-                    displayX.append(data['xCord'][i])
-                    displayY.append(data['yCord'][i])
-                if i > 0:
-                    print(i, '->', end='')
-                    if coordinatesPresent:
-                        labels.append(i)
-                else:
-                    print(i, end='')
-                tmpCurNode = i
-        curNode = tmpCurNode
-        if curNode < 1:
-            break
+    routes = rd.decodeRoutes(model, data)
+    rd.printRoutes(routes)
     # Start plotting the solution to a coordinate system
-    if coordinatesPresent:
-        plt.plot(displayX, displayY, '-o')
-        for i, label in enumerate(labels):
-            plt.annotate(label, (displayX[i], displayY[i]))
-        plt.show()
+    rd.plotRoutes(routes, data)
 
 
-def main(filename: str):
+def main(filename: str, useMatrixModel: bool = False, neighbours: int = None, heuristicStart: bool = True,
+         reduceArcs: bool = False):
     data = readData(filename)
-    model = buildModel(data)
-    solveModel(model)
+    if neighbours is not None:
+        # Only build the model on the arcs between each node and its nearest neighbours
+        cg.addCandidateGraph(data, k=neighbours)
+    if reduceArcs:
+        # Leave out the arcs which cannot be used by a tour shorter than the tour found by the heuristics
+        bound, upperBound = ob.eliminateArcs(data)
+        print('Held-Karp bound:', bound, 'Heuristic tour:', upperBound, 'Arcs left:', len(data['arcs']))
+    tour = None
+    if heuristicStart or 'arcs' in data:
+        tour = th.heuristicTour(data['dist'])[0]
+    if 'arcs' in data:
+        # Put the arcs of the heuristic tour back into the graph, such that the model always has a feasible solution and
+        # can be started from the tour
+        cg.reAddArcs(data, th.tourArcs(tour))
+    if useMatrixModel:
+        model = buildMatrixModel(data)
+        solveMatrixModel(model)
+    else:
+        model = buildModel(data)
+        # Start the solver from the tour found by the heuristics
+        solveModel(model, heuristicStart and th.setMipStart(model, tour))
     displaySolution(model, data)
 
 
@@ -0,0 +1,68 @@
+# Exact solution of small TSPs by the dynamic programming algorithm of Held and Karp, for the course "Modellering inden
+# for Prescriptive Analytics"
+# Let the customers 1,...,n be numbered by the bits of an integer, such that a set S of customers is given by a bitmask.
+# The length of a shortest path starting at the depot 0, visiting all the customers of S and ending at customer j in S,
+# satisfies
+#     C(S, j) = min ( k in S \ {j} ) C(S \ {j}, k) + d[k][j],     C({j}, j) = d[0][j]
+# and the length of a shortest tour is min ( j ) C({1..n}, j) + d[j][0]. The values are stored in a 2^n x n table, which
+# is filled one size of S at a time, such that all the sets of the same size are handled by a few NumPy operations.
+# This takes O(2^n n^2) time and O(2^n n) memory, which is far less than the 2^n SECs of the full DFJ model, but still
+# limits the algorithm to about MAX_NODES nodes (the tables then take around 100 MB).
+
+import numpy as np  # Used for storing the tables of the dynamic program
+
+# The largest number of nodes (including the depot) for which the dynamic program is used by default
+MAX_NODES = 20
+
+
+# Returns the distance matrix as an array, where the arcs not in arcs (if given) have an infinite distance
+def costMatrix(dist, arcs: list = None) -> np.ndarray:
+    dist = np.asarray(dist, dtype=float)
+    if arcs is None:
+        return dist
+    cost = np.full(dist.shape, np.inf)
+    tails, heads = np.array(list(arcs), dtype=np.int64).reshape(-1, 2).T
+    cost[tails, heads] = dist[tails, heads]
+    return cost
+
+
+# Returns an optimal tour starting at node 0 (as the list of nodes in the order visited) and its length. If arcs is
+# given (e.g. a sparse candidate graph), only these arcs may be used. Raises a ValueError if no tour exists
+def heldKarp(dist, arcs: list = None) -> tuple:
+    cost = costMatrix(dist, arcs)
+    numOfCustomers = len(cost) - 1
+    if numOfCustomers <= 1:
+        tour = list(range(numOfCustomers + 1))
+        return tour, float(cost[0, -1] + cost[-1, 0]) if numOfCustomers == 1 else 0.0
+    # shortest[S, j] is C(S, j) for the customer j+1 and last[S, j] is the customer before j+1 on the shortest path
+    numOfSets = 1 << numOfCustomers
+    shortest = np.full((numOfSets, numOfCustomers), np.inf)
+    last = np.zeros((numOfSets, numOfCustomers), dtype=np.int8)
+    bits = 1 << np.arange(numOfCustomers)
+    shortest[bits, np.arange(numOfCustomers)] = cost[0, 1:]
+    # Group the sets by their size
+    sets = np.arange(numOfSets)
+    size = np.zeros(numOfSets, dtype=np.int64)
+    for bit in bits:
+        size += (sets & bit) > 0
+    between = cost[1:, 1:]
+    for setSize in range(2, numOfCustomers + 1):
+        sameSize = sets[size == setSize]
+        for j in range(numOfCustomers):
+            withJ = sameSize[(sameSize & bits[j]) > 0]
+            # C(S \ {j}, k) is infinite for k not in S \ {j}, so taking the minimum over all k is safe
+            lengths = shortest[withJ ^ bits[j]] + between[:, j]
+            last[withJ, j] = np.argmin(lengths, axis=1)
+            shortest[withJ, j] = lengths[np.arange(len(withJ)), last[withJ, j]]
+    allCustomers = numOfSets - 1
+    lengths = shortest[allCustomers] + cost[1:, 0]
+    j = int(np.argmin(lengths))
+    if not np.isfinite(lengths[j]):
+        raise ValueError('No tour visits all the nodes using the given arcs')
+    # Follow the last customers back from the end of the tour
+    tour = []
+    remaining = allCustomers
+    for _ in range(numOfCustomers):
+        tour.append(j + 1)
+        remaining, j = remaining ^ int(bits[j]), int(last[remaining, j])
+    return [0] + tour[::-1], float(lengths.min())
@@ -0,0 +1,179 @@
+# Lower bounds for the TSP by the 1-tree relaxation of Held and Karp, for the course "Modellering inden for Prescriptive
+# Analytics"
+# A 1-tree is a spanning tree on the nodes 1,...,n plus two edges from node 0. Every tour is a 1-tree in which all nodes
+# have degree 2, so a minimum 1-tree gives a lower bound on the length of a tour. Adding a penalty pi[i] to the length
+# of every edge incident to node i adds 2*sum(pi) to the length of every tour, so for any penalties
+#     L(pi) = (length of a minimum 1-tree with the penalised lengths) - 2 * sum ( i in 0..n ) pi[i]
+# is a lower bound as well. The best penalties are found by subgradient optimisation: nodes of degree more than 2 in the
+# 1-tree are penalised and nodes of degree 1 get a bonus, with a step size based on an upper bound (a tour length).
+# Together with a tour found by the heuristics of tspHeuristics.py, the bound gives a provable optimality gap of the
+# tour in a fraction of the time of solving the MIP.
+# The penalties also show which edges can be left out of the model: if the best 1-tree forced to contain the edge {i, j}
+# is longer than a known tour, no shorter tour uses the edge. eliminateArcs(...) stores the remaining arcs as
+# data['arcs'], which the model builders use instead of all pairs of nodes.
+# The bound is computed for the distances min(d[i][j], d[j][i]) of the undirected edges, so it is valid for asymmetric
+# distances as well (though weaker).
+#
+# Usage: python oneTreeBound.py [data file]
+
+import numpy as np                  # Used for the distance matrix and the penalties
+import time as tm                   # Used for timing the bound
+import readAndWriteJson as rwJson   # Used for reading the data file in Json format
+import tspHeuristics as th          # Used for finding the tour giving the upper bound
+
+# The number of iterations without improvement of the bound after which the step size of the subgradient optimisation is
+# halved
+PERIOD = 20
+
+
+# Returns the lengths of the undirected edges, i.e. min(dist[i][j], dist[j][i]), with an infinite length of self-loops
+def edgeLengths(dist) -> np.ndarray:
+    dist = np.asarray(dist, dtype=float)
+    lengths = np.minimum(dist, dist.T)
+    np.fill_diagonal(lengths, np.inf)
+    return lengths
+
+
+# Returns a minimum 1-tree for the symmetric edge lengths as a tuple of
+# - its length
+# - the degree of each node
+# - the parent of each node 1,...,n in the spanning tree on these nodes (-1 for node 1, which is the root, and node 0)
+# - the nodes 1,...,n in the order they were added to the tree by Prim's algorithm
+# - the two nodes joined to node 0
+# Prim's algorithm takes O(n^2) time, which is optimal for a complete graph
+def minimumOneTree(lengths: np.ndarray) -> tuple:
+    numOfNodes = len(lengths)
+    parent = np.full(numOfNodes, -1)
+    # Prim's algorithm on the nodes 1,...,n starting from node 1. Node 0 is marked as added, such that it is left out
+    isAdded = np.zeros(numOfNodes, dtype=bool)
+    isAdded[[0, 1]] = True
+    closest = lengths[1].copy()
+    closest[isAdded] = np.inf
+    closestTo = np.ones(numOfNodes, dtype=np.int64)
+    order = [1]
+    for _ in range(numOfNodes - 2):
+        node = int(np.argmin(closest))
+        parent[node] = closestTo[node]
+        order.append(node)
+        isAdded[node] = True
+        closest[node] = np.inf
+        isCloser = (lengths[node] < closest) & ~isAdded
+        closest[isCloser] = lengths[node][isCloser]
+        closestTo[isCloser] = node
+    # The two shortest edges from node 0
+    ends = np.argpartition(lengths[0], 1)[:2]
+    tails = np.flatnonzero(parent >= 0)
+    length = lengths[tails, parent[tails]].sum() + lengths[0][ends].sum()
+    degree = np.bincount(np.concatenate([tails, parent[tails], ends, [0, 0]]), minlength=numOfNodes)
+    return length, degree, parent, order, ends
+
+
+# Returns the best lower bound found by subgradient optimisation and the penalties giving it.
+# upperBound is the length of a known tour (found by the heuristics if not given). The optimisation stops after
+# maxIterations iterations, when the step size gets too small, or when the bound reaches the upper bound
+def lowerBound(dist, upperBound: float = None, maxIterations: int = 1000) -> tuple:
+    lengths = edgeLengths(dist)
+    numOfNodes = len(lengths)
+    if numOfNodes <= 3:
+        return th.heuristicTour(dist)[1], np.zeros(numOfNodes)
+    if upperBound is None:
+        upperBound = heuristicUpperBound(dist)
+    penalties = np.zeros(numOfNodes)
+    bestBound, bestPenalties = -np.inf, penalties.copy()
+    # The step size is scale * (upperBound - bound) / |subgradient|^2, where scale is halved after PERIOD iterations
+    # without improvement
+    scale, iterationsWithoutImprovement = 2.0, 0
+    for _ in range(maxIterations):
+        length, degree = minimumOneTree(lengths + penalties[:, np.newaxis] + penalties)[:2]
+        bound = length - 2 * penalties.sum()
+        if bound > bestBound + 1e-9 * abs(bound):
+            bestBound, bestPenalties = bound, penalties.copy()
+            iterationsWithoutImprovement = 0
+        else:
+            iterationsWithoutImprovement += 1
+            if iterationsWithoutImprovement >= PERIOD:
+                scale /= 2
+                iterationsWithoutImprovement = 0
+        subgradient = degree - 2
+        # If all degrees are 2, the 1-tree is a tour, and hence an optimal tour
+        if not subgradient.any() or upperBound - bestBound <= 1e-9 * abs(upperBound) or scale < 1e-6:
+            break
+        penalties = penalties + scale * (upperBound - bound) / (subgradient @ subgradient) * subgradient
+    return bestBound, bestPenalties
+
+
+# Returns the relative gap between the length of a tour and a lower bound
+def optimalityGap(tourLength: float, bound: float) -> float:
+    return (tourLength - bound) / tourLength if tourLength != 0 else 0.0
+
+
+# Returns an n x n boolean array, which is True for the edges {i, j} (in both directions) that may be used by a tour
+# no longer than upperBound. An edge is left out, if the lower bound given by the penalties on the tours using it
+# exceeds upperBound. For an edge {i, j} not in the minimum 1-tree, this bound is the length of the 1-tree plus the
+# penalised length of the edge minus the longest edge it replaces: the longest edge on the path between i and j in the
+# spanning tree, or the longer of the two edges from node 0 if i or j is node 0
+def reducedCostEdges(dist, penalties: np.ndarray, upperBound: float, tolerance: float = 1e-9) -> np.ndarray:
+    lengths = edgeLengths(dist) + penalties[:, np.newaxis] + penalties
+    numOfNodes = len(lengths)
+    length, degree, parent, order, ends = minimumOneTree(lengths)
+    bound = length - 2 * penalties.sum()
+    # longest[i][j] is the longest edge on the path between i and j in the spanning tree. It is found for each node when
+    # it is added, from the paths to its parent, which only use the nodes added before it
+    longest = np.zeros((numOfNodes, numOfNodes))
+    for k in range(1, len(order)):
+        node, earlier = order[k], order[:k]
+        longest[node, earlier] = np.maximum(longest[parent[node], earlier], lengths[node, parent[node]])
+        longest[earlier, node] = longest[node, earlier]
+    longest[0, :] = longest[:, 0] = lengths[0][ends].max()
+    isUsable = bound + lengths - longest <= upperBound + tolerance * abs(upperBound)
+    # The edges of the 1-tree itself are always usable
+    tails = np.flatnonzero(parent >= 0)
+    isUsable[tails, parent[tails]] = isUsable[parent[tails], tails] = True
+    isUsable[0, ends] = isUsable[ends, 0] = True
+    np.fill_diagonal(isUsable, False)
+    return isUsable
+
+
+# Returns the length of the shortest tour found by the heuristics
+def heuristicUpperBound(dist) -> float:
+    return min(th.heuristicTour(dist, construction)[1] for construction in th.CONSTRUCTIONS)
+
+
+# Removes the arcs which cannot be used by a tour shorter than the tour found by the heuristics from data['arcs'] (all
+# pairs of nodes if data has no arcs), and returns the lower bound and the length of the tour
+def eliminateArcs(data: dict, maxIterations: int = 1000) -> tuple:
+    upperBound = heuristicUpperBound(data['dist'])
+    bound, penalties = lowerBound(data['dist'], upperBound, maxIterations)
+    isUsable = reducedCostEdges(data['dist'], penalties, upperBound)
+    if 'arcs' in data:
+        data['arcs'] = [(i, j) for i, j in data['arcs'] if isUsable[i, j]]
+    else:
+        data['arcs'] = list(zip(*(ends.tolist() for ends in np.nonzero(isUsable))))
+    return bound, upperBound
+
+
+def main(filename: str):
+    data = rwJson.readJsonFileToDictionary(filename)
+    numOfNodes = len(data['dist'])
+    startTime = tm.time()
+    upperBound = heuristicUpperBound(data['dist'])
+    heuristicTime = tm.time() - startTime
+    startTime = tm.time()
+    bound, penalties = lowerBound(data['dist'], upperBound)
+    boundTime = tm.time() - startTime
+    startTime = tm.time()
+    numOfArcs = int(reducedCostEdges(data['dist'], penalties, upperBound).sum())
+    eliminationTime = tm.time() - startTime
+    print('Length of heuristic tour:', upperBound, '(%.4f seconds)' % heuristicTime)
+    print('Held-Karp 1-tree bound:', bound, '(%.4f seconds)' % boundTime)
+    print('Optimality gap of the tour is at most %.4f%%' % (100 * optimalityGap(upperBound, bound)))
+    print('Arcs left after elimination: %d of %d (%.4f seconds)' % (numOfArcs, numOfNodes * (numOfNodes - 1),
+                                                                    eliminationTime))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        main('bigger_tsp_data')
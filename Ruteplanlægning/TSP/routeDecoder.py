@@ -0,0 +1,129 @@
+# Decoding of the routes in solutions of the routing models for the course "Modellering inden for Prescriptive
+# Analytics"
+# Instead of looking up pyomo.value(model.x[i, j]) for every pair of nodes (and every charger), the arcs used by a
+# solution are read from the model in one bulk operation, after which each route is followed from the depot in O(n)
+# time. decodeRoutes(...) returns a list of routes, each a dict with
+#     'nodes'     : array of the nodes visited in order, starting and ending at the depot and including the chargers
+#     'isCharger' : boolean array, True for the chargers in 'nodes'
+#     'load'      : total demand of the customers on the route (None if the data has no demands 'q')
+#     'length'    : total distance of the route (None if the data has no distances 'dist' or 'c')
+#     'energy'    : total energy used on the route (None if the data has no energy consumptions 'e')
+#     'duration'  : travel, service and recharging time of the route (None if the data has no travel times 't')
+# printRoutes(...) and plotRoutes(...) print and plot the routes.
+# Both Pyomo models and the MatrixModel of matrixModel.py are supported. The arcs through chargers are read from the
+# variables y[i, r, j] (as in the EVRP) if the model has them.
+
+import numpy as np  # Used for storing the arcs and routes
+
+# The keys of the distance matrix and the pairs of keys of the coordinates in the data files of the different models
+DISTANCE_KEYS = ['dist', 'c']
+COORDINATE_KEYS = [['xCord', 'yCord'], ['xCoord', 'yCoord']]
+
+
+# Returns the indices of the variables of x with a value above threshold as a 2D array with a row per index. x is
+# either an indexed Pyomo variable, whose values are extracted in one call, or a block of arc variables of a MatrixModel
+def selectedIndices(x, threshold: float = 0.5) -> np.ndarray:
+    if hasattr(x, 'extract_values'):
+        values = x.extract_values()
+        indices = [index for index, value in values.items() if value is not None and value > threshold]
+        return np.array(indices, dtype=np.int64).reshape(len(indices), -1)
+    isSelected = np.asarray(x.value) > threshold
+    return np.column_stack([x.tails[isSelected], x.heads[isSelected]])
+
+
+# Returns the values of the variables of x with a value above threshold as a dict from index to value
+def positiveValues(x, threshold: float = 1e-6) -> dict:
+    return {index: value for index, value in x.extract_values().items() if value is not None and value > threshold}
+
+
+# Returns the route visiting the nodes in the given order as a dict (see the top of the file). recharged is the total
+# energy recharged on the route, which takes data['g'] time per unit
+def makeRoute(nodes, data: dict = None, isCharger=None, recharged: float = 0) -> dict:
+    nodes = np.asarray(nodes, dtype=np.int64)
+    isCharger = np.zeros(len(nodes), dtype=bool) if isCharger is None else np.asarray(isCharger, dtype=bool)
+    route = {'nodes': nodes, 'isCharger': isCharger, 'load': None, 'length': None, 'energy': None, 'duration': None}
+    if data is None:
+        return route
+    tails, heads = nodes[:-1], nodes[1:]
+    customers = nodes[~isCharger]
+    distanceKey = next((key for key in DISTANCE_KEYS if key in data), None)
+    if distanceKey is not None:
+        route['length'] = float(sum(data[distanceKey][i][j] for i, j in zip(tails.tolist(), heads.tolist())))
+    if 'q' in data:
+        route['load'] = float(sum(data['q'][i] for i in customers.tolist()))
+    if 'e' in data:
+        route['energy'] = float(sum(data['e'][i][j] for i, j in zip(tails.tolist(), heads.tolist())))
+    if 't' in data:
+        duration = sum(data['t'][i][j] for i, j in zip(tails.tolist(), heads.tolist()))
+        if 's' in data:
+            duration += sum(data['s'][i] for i in customers.tolist())
+        route['duration'] = float(duration + data.get('g', 0) * recharged)
+    return route
+
+
+# Returns the routes of the solution of the model (see the top of the file). Every route starts at the depot, and the
+# routes are sorted by their first node after the depot. If data is None, only 'nodes' and 'isCharger' are set
+def decodeRoutes(model, data: dict = None, depot: int = 0) -> list:
+    # The next node (and the charger visited in between, or -1) of each node. The depot may have several
+    successors = {}
+    for i, j in selectedIndices(model.x).tolist():
+        successors.setdefault(i, []).append((j, -1))
+    if hasattr(model, 'y'):
+        for i, r, j in selectedIndices(model.y).tolist():
+            successors.setdefault(i, []).append((j, r))
+    # The energy recharged on each arc, if the model has such variables (as in the EVRP)
+    recharged = positiveValues(model.epsilon) if hasattr(model, 'epsilon') else {}
+    routes = []
+    for first, charger in sorted(successors.get(depot, [])):
+        nodes, isCharger, energy = [depot], [False], recharged.get((depot, first), 0)
+        if charger >= 0:
+            nodes.append(charger)
+            isCharger.append(True)
+        node = first
+        # The length of a route is bounded, such that a cycle not through the depot cannot make the loop run forever
+        while node != depot and len(nodes) <= 2 * len(successors) + 1:
+            nodes.append(node)
+            isCharger.append(False)
+            if node not in successors:
+                break
+            following, charger = successors[node][0]
+            if charger >= 0:
+                nodes.append(charger)
+                isCharger.append(True)
+            energy += recharged.get((node, following), 0)
+            node = following
+        if node == depot:
+            nodes.append(depot)
+            isCharger.append(False)
+        routes.append(makeRoute(nodes, data, isCharger, energy))
+    return routes
+
+
+# Prints each route as a line of nodes (chargers in brackets) followed by its statistics
+def printRoutes(routes: list):
+    for number, route in enumerate(routes, start=1):
+        print('The route for vehicle', number, 'is:')
+        print(' -> '.join('[' + str(node) + ']' if isCharger else str(node)
+                          for node, isCharger in zip(route['nodes'].tolist(), route['isCharger'].tolist())))
+        statistics = ['%s: %g' % (key.capitalize(), route[key]) for key in ['length', 'load', 'energy', 'duration']
+                      if route[key] is not None]
+        if statistics:
+            print(', '.join(statistics))
+        print()
+
+
+# Plots the routes in a coordinate system, if the data contains coordinates, with the given line style. If show is
+# False, the plot is not shown, such that more can be added to it before calling plt.show()
+def plotRoutes(routes: list, data: dict, style: str = '-o', annotate: bool = True, show: bool = True):
+    keys = next((keys for keys in COORDINATE_KEYS if all(key in data for key in keys)), None)
+    if keys is None:
+        return
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
+    x, y = np.asarray(data[keys[0]], dtype=float), np.asarray(data[keys[1]], dtype=float)
+    for route in routes:
+        plt.plot(x[route['nodes']], y[route['nodes']], style)
+        if annotate:
+            for node in route['nodes'][:-1].tolist():
+                plt.annotate(node, (x[node], y[node]))
+    if show:
+        plt.show()
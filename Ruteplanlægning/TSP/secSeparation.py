@@ -0,0 +1,67 @@
+# Separation of sub tour elimination constraints (SECs) for fractional solutions of the TSP, for the course "Modellering
+# inden for Prescriptive Analytics"
+# Given the values of x in a solution of the LP relaxation, let w[i][j] = x[i][j] + x[j][i] be the weight of the edge
+# {i, j}. Due to the degree constraints, the SEC of a set of nodes S
+#     sum ( i in S ) sum ( j in S ) x[i][j] <= |S| - 1
+# is violated exactly when the total weight of the edges between S and the remaining nodes is less than 2. Hence a
+# violated SEC exists if and only if the minimum cut of the weighted graph is less than 2. The sets are found by
+# - a shortcut: if the graph of the edges with positive weight is not connected, every component violates its SEC
+# - otherwise a minimum cut between node 0 and each other node t is found by a maximum flow (as Padberg and Rinaldi).
+#   Nodes already inside a violated set are skipped as sinks, such that at most one max flow is computed per node
+# The max flows are computed by scipy, which requires integer capacities, so the weights are scaled by SCALE.
+
+import numpy as np                  # Used for storing the weights
+import subtours as st               # Used for reading the values of x
+
+# The weights are multiplied by SCALE and rounded to integers before computing the max flows
+SCALE = 10 ** 6
+
+
+# Returns the arcs (i, j) with x[i, j] > tolerance and their values as three arrays (tails, heads and values)
+def supportArcs(x, tolerance: float = 1e-6) -> tuple:
+    if hasattr(x, 'extract_values'):
+        values = {arc: value for arc, value in x.extract_values().items() if value is not None and value > tolerance}
+        ends = np.array(list(values), dtype=np.int64).reshape(-1, 2)
+        return ends[:, 0], ends[:, 1], np.array(list(values.values()), dtype=float)
+    tails, heads = st.selectedArcs(x, tolerance)
+    isSelected = np.asarray(x.value) > tolerance
+    return tails, heads, np.asarray(x.value, dtype=float)[isSelected]
+
+
+# Returns the sets of nodes (as sorted lists) whose SECs are violated by more than tolerance in the solution with the
+# arcs (tails[k], heads[k]) having the values values[k]. An empty list means that no SEC is violated
+def violatedSets(numOfNodes: int, tails, heads, values, tolerance: float = 1e-6) -> list:
+    import scipy.sparse as sp          # Only needed when SECs are separated
+    import scipy.sparse.csgraph as cs  # Used for the maximum flows and the connected components
+    weights = sp.coo_matrix((values, (tails, heads)), shape=(numOfNodes, numOfNodes)).tocsr()
+    weights = (weights + weights.T).tocsr()
+    # The shortcut: every connected component violates its SEC if there are more than one
+    numOfComponents, componentOf = cs.connected_components(weights, directed=False)
+    if numOfComponents > 1:
+        return [np.flatnonzero(componentOf == c).tolist() for c in range(numOfComponents)]
+    capacities = weights.copy()
+    capacities.data = np.rint(capacities.data * SCALE).astype(np.int32)
+    capacities.eliminate_zeros()
+    violated = []
+    isInViolatedSet = np.zeros(numOfNodes, dtype=bool)
+    for sink in range(1, numOfNodes):
+        if isInViolatedSet[sink]:
+            continue
+        flow = cs.maximum_flow(capacities, 0, sink)
+        if flow.flow_value >= (2 - tolerance) * SCALE:
+            continue
+        # The sink side of the minimum cut are the nodes not reachable from node 0 in the residual graph
+        residual = (capacities - flow.flow).tocsr()
+        residual.data = (residual.data > 0).astype(np.int32)
+        residual.eliminate_zeros()
+        isReachable = np.zeros(numOfNodes, dtype=bool)
+        isReachable[cs.breadth_first_order(residual, 0, directed=True, return_predecessors=False)] = True
+        violated.append(np.flatnonzero(~isReachable).tolist())
+        isInViolatedSet |= ~isReachable
+    return violated
+
+
+# Returns the sets of nodes whose SECs are violated by the current values of the arc variables x (an indexed Pyomo
+# variable or a block of arc variables of a MatrixModel) of a model with numOfNodes nodes
+def separateSECs(x, numOfNodes: int, tolerance: float = 1e-6) -> list:
+    return violatedSets(numOfNodes, *supportArcs(x, tolerance), tolerance=tolerance)
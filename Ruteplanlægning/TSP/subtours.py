@@ -0,0 +1,88 @@
+# Fast detection of sub tours in solutions of the routing models for the course "Modellering inden for Prescriptive
+# Analytics"
+# Looking up pyomo.value(model.x[i, j]) for every j of every node costs O(n^2) Pyomo lookups. Instead the arcs used by a
+# solution are read from the model in one bulk operation by selectedArcs(...), after which
+# - cycles(...) splits a TSP solution, given as an array of successors, into its cycles in O(n) time
+# - components(...) finds the connected components of any solution by union-find, e.g. for the VRPs, where the depot
+#   has more than one successor
+# - subtours(...) returns the sets of nodes, for which a sub tour elimination constraint (SEC) is violated
+# Both Pyomo models and the MatrixModel of matrixModel.py are supported.
+
+import numpy as np  # Used for storing the arcs and successors
+
+
+# Returns the arcs (i, j) with x[i, j] > threshold as two arrays (tails and heads). x is either an indexed Pyomo
+# variable, whose values are extracted in one call, or a block of arc variables of a MatrixModel
+def selectedArcs(x, threshold: float = 0.5) -> tuple:
+    if hasattr(x, 'extract_values'):
+        values = x.extract_values()
+        ends = np.array([arc for arc, value in values.items() if value is not None and value > threshold],
+                        dtype=np.int64).reshape(-1, 2)
+        return ends[:, 0], ends[:, 1]
+    isSelected = np.asarray(x.value) > threshold
+    return x.tails[isSelected], x.heads[isSelected]
+
+
+# Returns the array of successors of the nodes 0,1,...,numOfNodes-1, i.e. successor[i] = j for each arc (i, j), and -1
+# for nodes without an outgoing arc. Only meaningful if each node has at most one outgoing arc (e.g. the TSP)
+def successorArray(numOfNodes: int, tails, heads) -> np.ndarray:
+    successor = np.full(numOfNodes, -1, dtype=np.int64)
+    successor[np.asarray(tails, dtype=np.int64)] = heads
+    return successor
+
+
+# Splits the nodes into the cycles given by the successor array. Each cycle is a list of nodes in the order visited,
+# starting from its smallest node, and the cycles are sorted by their smallest node, so the cycle of node 0 comes first.
+# A node without a successor ends a path, which is returned as a cycle as well. Takes O(n) time
+def cycles(successor) -> list:
+    successor = np.asarray(successor).tolist()
+    isVisited = [False] * len(successor)
+    result = []
+    for start in range(len(successor)):
+        if isVisited[start]:
+            continue
+        cycle = []
+        node = start
+        while node >= 0 and not isVisited[node]:
+            isVisited[node] = True
+            cycle.append(node)
+            node = successor[node]
+        if cycle:
+            result.append(cycle)
+    return result
+
+
+# Returns the connected components of the graph on the nodes 0,1,...,numOfNodes-1 with the given arcs (ignoring their
+# direction) as lists of nodes. The components are sorted by their smallest node, so the component of node 0 comes
+# first. Uses union-find with path halving and union by size, i.e. almost linear time
+def components(numOfNodes: int, tails, heads) -> list:
+    parent = list(range(numOfNodes))
+    size = [1] * numOfNodes
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for i, j in zip(np.asarray(tails).tolist(), np.asarray(heads).tolist()):
+        rootI, rootJ = find(i), find(j)
+        if rootI != rootJ:
+            if size[rootI] < size[rootJ]:
+                rootI, rootJ = rootJ, rootI
+            parent[rootJ] = rootI
+            size[rootI] += size[rootJ]
+    componentOf = {}
+    for node in range(numOfNodes):
+        componentOf.setdefault(find(node), []).append(node)
+    return list(componentOf.values())
+
+
+# Returns the sets of nodes of the sub tours in the solution given by the selected arcs.
+# If the depot is None (e.g. the TSP), every component is returned unless the solution is a single tour through all
+# nodes. Otherwise (e.g. the VRPs) the components not containing the depot are returned
+def subtours(numOfNodes: int, tails, heads, depot: int = None) -> list:
+    allComponents = components(numOfNodes, tails, heads)
+    if depot is None:
+        return allComponents if len(allComponents) > 1 else []
+    return [component for component in allComponents if depot not in component]
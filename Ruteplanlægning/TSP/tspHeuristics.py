@@ -0,0 +1,349 @@
+# Construction and local search heuristics for the TSP, for the course "Modellering inden for Prescriptive Analytics"
+# The heuristics work directly on the distance matrix and find a good tour in milliseconds. The tour can be used on its
+# own (e.g. when no MIP solver is available), or as a MIP start for the TSP models by setMipStart(...), such that the
+# solver has a good incumbent from the beginning and can prune much earlier.
+# A tour is a list of the nodes in the order visited, starting with node 0 (the depot). The following constructions are
+# available
+# - 'nearest': nearest neighbour. Repeatedly go to the closest node not yet visited
+# - 'greedy': greedy edge. Add the edges in order of increasing length (among the edges to the nearest neighbours of
+#   each node), unless a node gets degree 3 or a cycle is closed. The resulting paths are joined by nearest neighbour
+# - 'christofides': Christofides-style. An Euler tour of a minimum spanning tree plus a matching of its odd degree
+#   nodes, shortcut to a tour. The matching is found greedily instead of as a minimum weight perfect matching
+# The tour is improved by 2-opt and Or-opt moves (moving a segment of 1 to 3 nodes), where only the moves adding an
+# edge to one of the k nearest neighbours of a node are tried, and nodes whose neighbourhood did not change since they
+# were last checked without improvement are skipped (don't-look bits). The local search assumes symmetric distances.
+# Asymmetric distances are made symmetric for the search, and the tour is returned in its shorter direction.
+#
+# Usage: python tspHeuristics.py [data file] [construction]
+
+import numpy as np                  # Used for the distance matrix and the constructions
+import collections                  # Used for the queue of nodes to check in the local search
+import time as tm                   # Used for timing the heuristics
+import readAndWriteJson as rwJson   # Used for reading the data file in Json format
+
+CONSTRUCTIONS = ['nearest', 'greedy', 'christofides']
+
+# Improvements smaller than this are ignored, such that rounding errors cannot make the local search cycle
+EPSILON = 1e-9
+
+
+# Returns the length of the tour
+def tourLength(tour: list, dist) -> float:
+    dist = np.asarray(dist, dtype=float)
+    tour = np.asarray(tour)
+    return float(dist[tour, np.roll(tour, -1)].sum())
+
+
+# Returns the matrix of the average distance in the two directions, which the heuristics work on
+def symmetricDistances(dist) -> np.ndarray:
+    dist = np.asarray(dist, dtype=float)
+    return dist if np.array_equal(dist, dist.T) else (dist + dist.T) / 2
+
+
+# Returns an n x k array, where row i holds the k nearest other nodes of node i, the nearest first
+def neighbourLists(dist: np.ndarray, k: int) -> np.ndarray:
+    numOfNodes = len(dist)
+    k = min(k, numOfNodes - 1)
+    distances = dist.copy()
+    np.fill_diagonal(distances, np.inf)
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < numOfNodes - 1 else \
+        np.argsort(distances, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+# Returns the tour starting at node 0 given by the nearest neighbour heuristic
+def nearestNeighbourTour(dist: np.ndarray) -> list:
+    numOfNodes = len(dist)
+    isVisited = np.zeros(numOfNodes, dtype=bool)
+    tour = [0]
+    isVisited[0] = True
+    for _ in range(numOfNodes - 1):
+        distances = np.where(isVisited, np.inf, dist[tour[-1]])
+        tour.append(int(np.argmin(distances)))
+        isVisited[tour[-1]] = True
+    return tour
+
+
+# Returns the tour starting at node 0 made by joining the paths given by adjacency (a list of lists with at most two
+# neighbours per node) by nearest neighbour: from the end of the current path go to the nearest end of another path
+def joinPaths(adjacency: list, dist: np.ndarray) -> list:
+    numOfNodes = len(dist)
+    isVisited = np.zeros(numOfNodes, dtype=bool)
+    isEnd = np.array([len(neighbours) < 2 for neighbours in adjacency])
+    tour = []
+    current = 0
+    if not isEnd[0]:
+        # Node 0 is inside a path (or a cycle), so the path is started at one of its ends
+        previous, node = 0, adjacency[0][0]
+        while not isEnd[node] and node != 0:
+            previous, node = node, next(j for j in adjacency[node] if j != previous)
+        current = node
+    while True:
+        # Walk along the path starting at current
+        previous, node = -1, current
+        while node != -1 and not isVisited[node]:
+            isVisited[node] = True
+            tour.append(node)
+            previous, node = node, next((j for j in adjacency[node] if j != previous and not isVisited[j]), -1)
+        if len(tour) == numOfNodes:
+            break
+        distances = np.where(isEnd & ~isVisited, dist[tour[-1]], np.inf)
+        current = int(np.argmin(distances))
+    start = tour.index(0)
+    return tour[start:] + tour[:start]
+
+
+# Returns the tour starting at node 0 given by the greedy edge heuristic, using the edges to the given neighbours
+def greedyEdgeTour(dist: np.ndarray, neighbours: np.ndarray) -> list:
+    numOfNodes = len(dist)
+    tails = np.repeat(np.arange(numOfNodes), neighbours.shape[1])
+    heads = neighbours.ravel()
+    order = np.argsort(dist[tails, heads], kind='stable')
+    adjacency = [[] for _ in range(numOfNodes)]
+    parent = list(range(numOfNodes))
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    numOfEdges = 0
+    for i, j in zip(tails[order].tolist(), heads[order].tolist()):
+        if len(adjacency[i]) < 2 and len(adjacency[j]) < 2 and find(i) != find(j):
+            adjacency[i].append(j)
+            adjacency[j].append(i)
+            parent[find(i)] = find(j)
+            numOfEdges += 1
+            if numOfEdges == numOfNodes - 1:
+                break
+    return joinPaths(adjacency, dist)
+
+
+# Returns the tour starting at node 0 given by the Christofides-style heuristic
+def christofidesTour(dist: np.ndarray) -> list:
+    from scipy.sparse.csgraph import minimum_spanning_tree  # Only needed for this construction
+    numOfNodes = len(dist)
+    # Zero distances are treated as missing edges by scipy, so they are replaced by a tiny distance
+    weights = np.where(dist > 0, dist, 1e-12)
+    np.fill_diagonal(weights, 0)
+    tree = minimum_spanning_tree(weights).tocoo()
+    edges = list(zip(tree.row.tolist(), tree.col.tolist()))
+    degree = np.bincount(np.concatenate([tree.row, tree.col]), minlength=numOfNodes)
+    # Match the odd degree nodes greedily, the closest pairs first
+    odd = np.flatnonzero(degree % 2 == 1)
+    pairs = [(dist[i, j], i, j) for k, i in enumerate(odd.tolist()) for j in odd[k + 1:].tolist()]
+    isMatched = set()
+    for _, i, j in sorted(pairs):
+        if i not in isMatched and j not in isMatched:
+            edges.append((i, j))
+            isMatched.update((i, j))
+    # Find an Euler tour by Hierholzer's algorithm, and skip the nodes already visited
+    incident = [[] for _ in range(numOfNodes)]
+    for e, (i, j) in enumerate(edges):
+        incident[i].append((j, e))
+        incident[j].append((i, e))
+    isUsed = [False] * len(edges)
+    stack, eulerTour = [0], []
+    while stack:
+        node = stack[-1]
+        while incident[node] and isUsed[incident[node][-1][1]]:
+            incident[node].pop()
+        if incident[node]:
+            neighbour, e = incident[node].pop()
+            isUsed[e] = True
+            stack.append(neighbour)
+        else:
+            eulerTour.append(stack.pop())
+    return list(dict.fromkeys(eulerTour[::-1]))
+
+
+# Reverses the part tour[i], tour[i+1], ..., tour[j] of the tour (cyclically) and updates position. If the part is
+# longer than half the tour, the rest of the tour is reversed instead, which gives the same tour for symmetric distances
+def reverse(tour: list, position: list, i: int, j: int):
+    numOfNodes = len(tour)
+    length = (j - i) % numOfNodes + 1
+    if 2 * length > numOfNodes:
+        i, j = (j + 1) % numOfNodes, (i - 1) % numOfNodes
+        length = numOfNodes - length
+    for _ in range(length // 2):
+        tour[i], tour[j] = tour[j], tour[i]
+        position[tour[i]], position[tour[j]] = i, j
+        i = (i + 1) % numOfNodes
+        j = (j - 1) % numOfNodes
+
+
+# Tries the 2-opt moves adding an edge from node a to one of its neighbours c. Applies the first improving move found,
+# and returns the nodes whose edges changed (an empty list if no move improves the tour)
+def twoOptMove(a: int, tour: list, position: list, dist: list, neighbours: list) -> list:
+    numOfNodes = len(tour)
+    for direction in (1, -1):
+        b = tour[(position[a] + direction) % numOfNodes]
+        removedAB = dist[a][b]
+        for c in neighbours[a]:
+            addedAC = dist[a][c]
+            if addedAC >= removedAB:
+                break
+            d = tour[(position[c] + direction) % numOfNodes]
+            if c == b or d == a:
+                continue
+            if addedAC + dist[b][d] - removedAB - dist[c][d] < -EPSILON:
+                if direction == 1:
+                    # ... a b ... c d ... becomes ... a c ... b d ...
+                    reverse(tour, position, position[b], position[c])
+                else:
+                    # ... d c ... b a ... becomes ... d b ... c a ...
+                    reverse(tour, position, position[c], position[b])
+                return [a, b, c, d]
+    return []
+
+
+# Tries the Or-opt moves moving the segment of 1 to 3 nodes starting at node a (forwards) next to one of the
+# neighbours of its first or last node, possibly reversed. Applies the first improving move found, and returns the nodes
+# whose edges changed (an empty list if no move improves the tour)
+def orOptMove(a: int, tour: list, position: list, dist: list, neighbours: list) -> list:
+    numOfNodes = len(tour)
+    for length in (1, 2, 3):
+        if length > numOfNodes - 3:
+            break
+        segment = [tour[(position[a] + k) % numOfNodes] for k in range(length)]
+        first, last = segment[0], segment[-1]
+        before = tour[(position[first] - 1) % numOfNodes]
+        after = tour[(position[last] + 1) % numOfNodes]
+        removalGain = dist[before][first] + dist[last][after] - dist[before][after]
+        if removalGain <= EPSILON:
+            continue
+        for end in (first, last):
+            for c in neighbours[end]:
+                if dist[end][c] >= removalGain:
+                    break
+                if c in segment:
+                    continue
+                # Insert the segment between c and the node e after (or before) c, such that end is next to c
+                for e in (tour[(position[c] + 1) % numOfNodes], tour[(position[c] - 1) % numOfNodes]):
+                    if e in segment:
+                        continue
+                    other = last if end == first else first
+                    insertionCost = dist[c][end] + dist[other][e] - dist[c][e]
+                    if insertionCost - removalGain < -EPSILON:
+                        rest = [node for node in tour if node not in segment]
+                        k = rest.index(c)
+                        # The segment is placed between c and e in the orientation with end next to c
+                        isAfter = rest[(k + 1) % len(rest)] == e
+                        moved = segment if (end == first) == isAfter else segment[::-1]
+                        rest[k + 1 if isAfter else k:k + 1 if isAfter else k] = moved
+                        tour[:] = rest
+                        for p, node in enumerate(tour):
+                            position[node] = p
+                        return segment + [before, after, c, e]
+    return []
+
+
+# Improves the tour by 2-opt and Or-opt moves until no move improves it, and returns the improved tour starting at 0
+def localSearch(tour: list, dist: np.ndarray, neighbours: np.ndarray) -> list:
+    tour = list(tour)
+    position = [0] * len(tour)
+    for p, node in enumerate(tour):
+        position[node] = p
+    # Lists are faster than NumPy arrays for looking up single elements
+    distances, neighbourList = dist.tolist(), neighbours.tolist()
+    # The queue holds the nodes whose don't-look bit is off
+    queue = collections.deque(tour)
+    isQueued = [True] * len(tour)
+    while queue:
+        a = queue.popleft()
+        isQueued[a] = False
+        changed = twoOptMove(a, tour, position, distances, neighbourList)
+        if not changed:
+            changed = orOptMove(a, tour, position, distances, neighbourList)
+        for node in changed:
+            if not isQueued[node]:
+                queue.append(node)
+                isQueued[node] = True
+    start = tour.index(0)
+    return tour[start:] + tour[:start]
+
+
+# Returns a tour starting at node 0 made by the given construction and improved by local search (if improve is True),
+# and its length. neighbours is the number of nearest neighbours of each node considered by the heuristics
+def heuristicTour(dist, construction: str = 'greedy', neighbours: int = 10, improve: bool = True) -> tuple:
+    original = np.asarray(dist, dtype=float)
+    if len(original) <= 3:
+        tour = list(range(len(original)))
+        return tour, tourLength(tour, original)
+    dist = symmetricDistances(original)
+    nearest = neighbourLists(dist, neighbours)
+    if construction == 'nearest':
+        tour = nearestNeighbourTour(dist)
+    elif construction == 'greedy':
+        tour = greedyEdgeTour(dist, nearest)
+    elif construction == 'christofides':
+        tour = christofidesTour(dist)
+    else:
+        raise ValueError('Unknown construction ' + str(construction) + '. Use one of ' + str(CONSTRUCTIONS))
+    if improve:
+        tour = localSearch(tour, dist, nearest)
+    # Return the direction of the tour which is the shorter for the original distances
+    reversedTour = tour[:1] + tour[:0:-1]
+    if tourLength(reversedTour, original) < tourLength(tour, original):
+        tour = reversedTour
+    return tour, tourLength(tour, original)
+
+
+# Returns the arcs (i,j) travelled by the tour, including the arc back to the first node
+def tourArcs(tour: list) -> list:
+    return list(zip(tour, tour[1:] + tour[:1]))
+
+
+# Sets the values of the variables of a Pyomo TSP model to the tour, such that it can be used as a MIP start (e.g. by
+# solver.solve(model, warmstart=True)). Sets x, and u (the position of each node, as in TSP_MTZ) and f (the position of
+# the tail of each arc used, as in TSP_one_commodity_flow) if the model has them.
+# Returns False (and changes nothing) if the tour uses an arc without a variable in the model
+def setMipStart(model, tour: list) -> bool:
+    arcs = tourArcs(tour)
+    if any(arc not in model.x for arc in arcs):
+        return False
+    for arc in model.x:
+        model.x[arc].set_value(0)
+    position = {node: p for p, node in enumerate(tour)}
+    for i, j in arcs:
+        model.x[i, j].set_value(1)
+    if hasattr(model, 'u'):
+        for i in model.u:
+            model.u[i].set_value(position[i])
+    if hasattr(model, 'f'):
+        for i, j in model.f:
+            model.f[i, j].set_value(position[i] if (i, j) in arcs and i != 0 else 0)
+    return True
+
+
+def main(filename: str, construction: str = None):
+    data = rwJson.readJsonFileToDictionary(filename)
+    forPrint = ['Construction', 'Constructed', 'Improved', 'Time (s)']
+    print("{: >15} {: >15} {: >15} {: >10}".format(*forPrint))
+    best = None
+    for name in CONSTRUCTIONS if construction is None else [construction]:
+        startTime = tm.time()
+        constructed = heuristicTour(data['dist'], name, improve=False)[1]
+        tour, length = heuristicTour(data['dist'], name)
+        print("{: >15} {: >15.4f} {: >15.4f} {: >10.4f}".format(name, constructed, length, tm.time() - startTime))
+        if best is None or length < best[1]:
+            best = tour, length
+    tour, length = best
+    print('Best tour found has length', length)
+    print(' -> '.join(map(str, tour + tour[:1])))
+    if 'xCord' in data and 'yCord' in data:
+        import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
+        plt.plot([data['xCord'][i] for i in tour + tour[:1]], [data['yCord'][i] for i in tour + tour[:1]], '-o')
+        for i in tour:
+            plt.annotate(i, (data['xCord'][i], data['yCord'][i]))
+        plt.show()
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        main(*sys.argv[1:3])
+    else:
+        main('bigger_tsp_data')
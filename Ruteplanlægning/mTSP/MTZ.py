@@ -19,7 +19,8 @@
 
 import pyomo.environ as pyomo       # Used to model the IP
 from Ruteplanlægning.TSP import readAndWriteJson as rwJson
-import matplotlib.pyplot as plt     # Used for plotting the result
+import routeDecoder as rd          # Used for reading the routes from the solution
+import savingsHeuristic as sh       # Used for finding routes to start the solver from
 
 
 def readData(filename: str) -> dict:
@@ -27,97 +28,86 @@ def readData(filename: str) -> dict:
     return data
 
 
+# Returns the sorted list of arcs (i,j) the model is built on. If the data contains a list of arcs (e.g. a sparse
+# candidate graph), only these arcs are used. Otherwise all pairs of nodes are used. Self-loops are never included
+def makeArcSet(data: dict) -> list:
+    numOfNodes = data['n'] + 1
+    if 'arcs' not in data:
+        return [(i, j) for i in range(numOfNodes) for j in range(numOfNodes) if i != j]
+    return sorted(set((int(i), int(j)) for i, j in data['arcs'] if i != j))
+
+
 def buildModel(data: dict) -> pyomo.ConcreteModel():
     model = pyomo.ConcreteModel()
     model.numOfNodes = data['n']+1
     # Add descriptive comments here
     model.nodes = range(0, model.numOfNodes)
     model.customers = range(1, model.numOfNodes)
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
+    # The arcs the model is built on. No variables are created for self-loops or arcs left out of model.arcs
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
     model.u = pyomo.Var(model.customers, within=pyomo.NonNegativeReals, bounds=(1, data['S']))
     # Add descriptive comments here
-    for i in model.nodes:
-        model.x[i, i].fix(0)
-    # Add descriptive comments here
     model.obj = pyomo.Objective(
-        expr=sum(data['dist'][i][j]*model.x[i, j] for i in model.nodes for j in model.nodes if i != j)
+        expr=sum(data['dist'][i][j]*model.x[i, j] for i, j in model.arcs)
     )
     # Add descriptive comments here
     model.sumToOne = pyomo.ConstraintList()
     for i in model.customers:
         # Out of node i
-        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.successors[i]) == 1)
         # Into node i
-        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.predecessors[i]) == 1)
     # Add descriptive comments here
-    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] for j in model.nodes) == data['m'])
-    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] for i in model.nodes) == data['m'])
+    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] for j in model.successors[0]) == data['m'])
+    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] for i in model.predecessors[0]) == data['m'])
     # Add descriptive comments here
+    # The constraints are only added for pairs of customers with an arc in at least one direction, since the bounds
+    # on u imply the constraints of all other pairs. Terms of missing arcs are left out
     model.MTZ = pyomo.ConstraintList()
-    for i in model.customers:
-        for j in model.customers:
-            model.MTZ.add(
-                expr=model.u[i] - model.u[j] + data['S']*model.x[i, j] + (data['S']-2)*model.x[j, i] <= data['S'] - 1
-            )
+    for i, j in sorted(set(model.arcs) | set((j, i) for i, j in model.arcs)):
+        if i in model.customers and j in model.customers:
+            lhs = model.u[i] - model.u[j]
+            if (i, j) in model.x:
+                lhs += data['S']*model.x[i, j]
+            if (j, i) in model.x:
+                lhs += (data['S']-2)*model.x[j, i]
+            model.MTZ.add(expr=lhs <= data['S'] - 1)
 
-    model.minBesøger=pyomo.Constraint(expr=model.u[i]>=5*model.x[i,0])
+    # The last customer n must be the 5th customer or later on its route, if it is the last one visited. Without the arc
+    # (n,0) the constraint is implied by the bounds on u
+    n = data['n']
+    if (n, 0) in model.x:
+        model.minBesøger=pyomo.Constraint(expr=model.u[n]>=5*model.x[n,0])
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
+# If warmstart is True, the current values of the variables (e.g. set by sh.setMipStart(...)) are passed as a MIP start
+def solveModel(model: pyomo.ConcreteModel(), warmstart: bool = False):
     solver = pyomo.SolverFactory('gurobi')
-    solver.solve(model, tee=True)
+    solver.solve(model, tee=True, warmstart=warmstart)
 
 
 def displaySolution(model: pyomo.ConcreteModel(), data: dict):
     # Print total length of tours
     print('Total length of tours:', pyomo.value(model.obj))
-    # Find a tour for each vehicle
-    lastRouteStarter = 0
-    coordinatesPresent = 'xCord' in data and 'yCord' in data
-    for vehicle in range(1, data['m']+1):
-        if coordinatesPresent:
-            displayX = [data['xCord'][0]]
-            displayY = [data['yCord'][0]]
-            labels = [0]
-        # Find the customer, that starts the next route
-        currentNode = 0
-        for j in model.customers:
-            if j > lastRouteStarter and pyomo.value(model.x[0, j]) >= 0.9999:
-                currentNode = j
-                if coordinatesPresent:
-                    displayX.append(data['xCord'][currentNode])
-                    displayY.append(data['yCord'][currentNode])
-                    labels.append(currentNode)
-                break
-        lastRouteStarter = j
-        print('The route for vehicle', vehicle, 'is:')
-        print('0->', currentNode, end='')
-        # Build the route from currenNode back to the depot
-        while currentNode != 0:
-            for j in model.nodes:
-                if currentNode != j and pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                    print('->', j, end='')
-                    currentNode = j
-                    if coordinatesPresent:
-                        displayX.append(data['xCord'][currentNode])
-                        displayY.append(data['yCord'][currentNode])
-                        labels.append(currentNode)
-                    break
-        print('\n')
-        if coordinatesPresent:
-            # Start plotting the solution to a coordinate system
-            if coordinatesPresent:
-                plt.plot(displayX, displayY, '-o')
-                for i, label in enumerate(labels):
-                    plt.annotate(label, (displayX[i], displayY[i]))
-    plt.show()
-
-
-def main(filename: str):
+    # Find a tour for each vehicle from the x[i,j] values
+    routes = rd.decodeRoutes(model, data)
+    rd.printRoutes(routes)
+    # Start plotting the solution to a coordinate system
+    rd.plotRoutes(routes, data)
+
+
+def main(filename: str, savingsStart: bool = True):
     data = readData(filename)
     model = buildModel(data)
-    solveModel(model)
+    # Start the solver from the routes found by the savings heuristic, if they use exactly m vehicles
+    solveModel(model, savingsStart and sh.setMipStart(model, sh.solve(data), data))
     displaySolution(model, data)
 
 
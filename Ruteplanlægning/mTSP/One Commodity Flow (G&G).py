@@ -21,7 +21,8 @@
 
 import pyomo.environ as pyomo       # Used to model the IP
 import readAndWriteJson as rwJson   # Used for reading the data file in Json format
-import matplotlib.pyplot as plt     # Used for plotting the result
+import routeDecoder as rd          # Used for reading the routes from the solution
+import savingsHeuristic as sh       # Used for finding routes to start the solver from
 
 
 def readData(filename: str) -> dict:
@@ -29,101 +30,79 @@ def readData(filename: str) -> dict:
     return data
 
 
+# Returns the sorted list of arcs (i,j) the model is built on. If the data contains a list of arcs (e.g. a sparse
+# candidate graph), only these arcs are used. Otherwise all pairs of nodes are used. Self-loops are never included
+def makeArcSet(data: dict) -> list:
+    numOfNodes = data['n'] + 1
+    if 'arcs' not in data:
+        return [(i, j) for i in range(numOfNodes) for j in range(numOfNodes) if i != j]
+    return sorted(set((int(i), int(j)) for i, j in data['arcs'] if i != j))
+
+
 def buildModel(data: dict) -> pyomo.ConcreteModel():
     model = pyomo.ConcreteModel()
     model.numOfNodes = data['n']+1
     # Add descriptive comments here
     model.nodes = range(0, model.numOfNodes)
     model.customers = range(1, model.numOfNodes)
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    model.f = pyomo.Var(model.nodes, model.nodes, within=pyomo.NonNegativeReals)
-    # Add descriptive comments here
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    # The arcs the model is built on. No variables are created for self-loops or arcs left out of model.arcs
+    model.arcs = makeArcSet(data)
+    model.successors = {i: [] for i in model.nodes}
+    model.predecessors = {i: [] for i in model.nodes}
+    for i, j in model.arcs:
+        model.successors[i].append(j)
+        model.predecessors[j].append(i)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
+    model.f = pyomo.Var(model.arcs, within=pyomo.NonNegativeReals)
     # Add descriptive comments here
     model.obj = pyomo.Objective(
-        expr=sum(data['dist'][i][j]*model.x[i, j] for i in model.nodes for j in model.nodes if i != j)
+        expr=sum(data['dist'][i][j]*model.x[i, j] for i, j in model.arcs)
     )
     # Add descriptive comments here
     model.sumToOne = pyomo.ConstraintList()
     for i in model.customers:
         # Out of node i
-        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[i, j] for j in model.successors[i]) == 1)
         # Into node i
-        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.nodes if i != j) == 1)
+        model.sumToOne.add(expr=sum(model.x[j, i] for j in model.predecessors[i]) == 1)
     # Add descriptive comments here
-    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] for j in model.nodes) == data['m'])
-    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] for i in model.nodes) == data['m'])
+    model.depotOut = pyomo.Constraint(expr=sum(model.x[0, j] for j in model.successors[0]) == data['m'])
+    model.depotIn = pyomo.Constraint(expr=sum(model.x[i, 0] for i in model.predecessors[0]) == data['m'])
     # Add descriptive comments here
     model.GeneralizedBounds = pyomo.ConstraintList()
-    for i in model.nodes:
-        for j in model.nodes:
-            model.GeneralizedBounds.add(expr=model.f[i, j] <= data['S']*model.x[i, j])
-            model.GeneralizedBounds.add(expr=model.f[i, j] >= min(i, 1)*model.x[i, j])
+    for i, j in model.arcs:
+        model.GeneralizedBounds.add(expr=model.f[i, j] <= data['S']*model.x[i, j])
+        model.GeneralizedBounds.add(expr=model.f[i, j] >= min(i, 1)*model.x[i, j])
     # Add descriptive comments here
     model.flowConservation = pyomo.ConstraintList()
     for i in model.customers:
         model.flowConservation.add(
-            expr=sum(model.f[i, j] for j in model.nodes) == sum(model.f[j, i] for j in model.nodes) + 1
+            expr=sum(model.f[i, j] for j in model.successors[i]) == sum(model.f[j, i] for j in model.predecessors[i]) + 1
         )
     return model
 
 
-def solveModel(model: pyomo.ConcreteModel()):
+# If warmstart is True, the current values of the variables (e.g. set by sh.setMipStart(...)) are passed as a MIP start
+def solveModel(model: pyomo.ConcreteModel(), warmstart: bool = False):
     solver = pyomo.SolverFactory('gurobi')
-    solver.solve(model, tee=True)
+    solver.solve(model, tee=True, warmstart=warmstart)
 
 
 def displaySolution(model: pyomo.ConcreteModel(), data: dict):
     # Print total length of tours
     print('Total length of tours:', pyomo.value(model.obj))
-    # Find a tour for each vehicle
-    lastRouteStarter = 0
-    coordinatesPresent = 'xCoord' in data and 'yCoord' in data
-    for vehicle in range(1, data['m']+1):
-        print('Bil nummer', vehicle, "printes nu")
-        if coordinatesPresent:
-            displayX = [data['xCoord'][0]]
-            displayY = [data['yCoord'][0]]
-            labels = [0]
-        # Find the customer, that starts the next route
-        currentNode = 0
-        for j in model.customers:
-            if j > lastRouteStarter and pyomo.value(model.x[0, j]) >= 0.9999:
-                currentNode = j
-                if coordinatesPresent:
-                    displayX.append(data['xCoord'][currentNode])
-                    displayY.append(data['yCoord'][currentNode])
-                    labels.append(currentNode)
-                break
-        lastRouteStarter = j
-        print('The route for vehicle', vehicle, 'is:')
-        print('0->', currentNode, end='')
-        # Build the route from currenNode back to the depot
-        while currentNode != 0:
-            for j in model.nodes:
-                if currentNode != j and pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                    print('->', j, end='')
-                    currentNode = j
-                    if coordinatesPresent:
-                        displayX.append(data['xCoord'][currentNode])
-                        displayY.append(data['yCoord'][currentNode])
-                        labels.append(currentNode)
-                    break
-        print('\n')
-        if coordinatesPresent:
-            # Start plotting the solution to a coordinate system
-            if coordinatesPresent:
-                plt.plot(displayX, displayY, '-o')
-                for i, label in enumerate(labels):
-                    plt.annotate(label, (displayX[i], displayY[i]))
-    plt.show()
+    # Find a tour for each vehicle from the x[i,j] values
+    routes = rd.decodeRoutes(model, data)
+    rd.printRoutes(routes)
+    # Start plotting the solution to a coordinate system
+    rd.plotRoutes(routes, data)
 
 
-def main(filename: str):
+def main(filename: str, savingsStart: bool = True):
     data = readData(filename)
     model = buildModel(data)
-    solveModel(model)
+    # Start the solver from the routes found by the savings heuristic, if they use exactly m vehicles
+    solveModel(model, savingsStart and sh.setMipStart(model, sh.solve(data), data))
     displaySolution(model, data)
 
 
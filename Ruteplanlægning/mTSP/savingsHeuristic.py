@@ -0,0 +1,144 @@
+# The savings heuristic of Clarke and Wright for the CVRP and the mTSP, for the course "Modellering inden for
+# Prescriptive Analytics"
+# The heuristic starts with a route 0 -> i -> 0 for each customer i. Joining the route ending at customer i with the
+# route starting at customer j saves
+#     s[i][j] = d[i][0] + d[0][j] - d[i][j]
+# The savings of all pairs of customers are kept in a priority queue (a heap), and the routes are joined in order of
+# decreasing savings, as long as the total demand of the joined route does not exceed the capacity Q. Pairs whose
+# customers are no longer ends of different routes are skipped when they are taken from the queue. Joining stops when
+# m routes are left, since the models use exactly m vehicles. Building the queue takes O(n^2) time and each of the
+# O(n^2) pops O(log n) time, so the heuristic runs in O(n^2 log n) time.
+# Other restrictions on the routes (e.g. the battery and workday of the EVRP) can be added by a function isFeasible,
+# which is called with each joined route, and rejects the join by returning False.
+# If the distances are symmetric, a route may be reversed before it is joined, so all four ways of joining two routes
+# at the customers i and j are tried.
+# When the capacity is tight, the classical savings may get stuck with more than m routes. Hence solve(...) runs the
+# heuristic with the generalised savings
+#     s[i][j] = d[i][0] + d[0][j] - shape*d[i][j] + asymmetry*|d[i][0] - d[0][j]| + demandWeight*(q[i] + q[j])/mean(q)
+# for each combination of parameters in PARAMETERS, and returns the shortest routes found using at most m vehicles.
+# The mTSP is handled as a CVRP, where every customer has demand 1 and the capacity is the maximum number of customers
+# on a route S. setMipStart(...) sets the variables of the models to the routes, such that the solver can start from
+# them (e.g. by solver.solve(model, warmstart=True)).
+
+import heapq                        # Used for the priority queue of savings
+import numpy as np                  # Used for computing the savings
+
+# The combinations of the parameters (shape, asymmetry, demandWeight) of the savings tried by solve(...). The first is
+# the classical savings
+PARAMETERS = [(shape, asymmetry, demandWeight) for shape in (1.0, 0.2, 0.6, 1.4, 1.8) for asymmetry in (0.0, 1.0)
+              for demandWeight in (0.0, 1.0)]
+
+
+# Returns the demands of the nodes and the capacity of the vehicles in data. For the CVRP these are q and Q, and for the
+# mTSP each customer has demand 1 and the capacity is S
+def demandsAndCapacity(data: dict) -> tuple:
+    if 'q' in data and 'Q' in data:
+        return [float(demand) for demand in data['q'][:data['n'] + 1]], float(data['Q'])
+    return [0.0] + [1.0] * data['n'], float(data['S'])
+
+
+# Returns the routes found by the savings heuristic as a list of lists of customers (without the depot) for the
+# customers 1,...,numOfCustomers. At most numOfVehicles routes are returned if possible, and more if the capacity
+# (or isFeasible) does not allow joining the routes any further. See the top of the file for the parameters of the
+# savings
+def savingsRoutes(dist, demands: list, capacity: float, numOfVehicles: int, shape: float = 1.0,
+                  asymmetry: float = 0.0, demandWeight: float = 0.0, isFeasible=None) -> list:
+    dist = np.asarray(dist, dtype=float)
+    numOfCustomers = len(demands) - 1
+    customers = np.arange(1, numOfCustomers + 1)
+    isSymmetric = np.array_equal(dist[:numOfCustomers + 1, :numOfCustomers + 1],
+                                 dist[:numOfCustomers + 1, :numOfCustomers + 1].T)
+    toDepot, fromDepot = dist[customers, 0][:, np.newaxis], dist[0, customers]
+    savings = toDepot + fromDepot - shape * dist[np.ix_(customers, customers)]
+    if asymmetry:
+        savings += asymmetry * np.abs(toDepot - fromDepot)
+    if demandWeight:
+        customerDemands = np.asarray(demands, dtype=float)[customers]
+        meanDemand = max(customerDemands.mean(), 1e-9)
+        savings += demandWeight * (customerDemands[:, np.newaxis] + customerDemands) / meanDemand
+    tails, heads = np.nonzero(~np.eye(numOfCustomers, dtype=bool) if not isSymmetric else
+                              np.triu(np.ones((numOfCustomers, numOfCustomers), dtype=bool), 1))
+    queue = list(zip((-savings[tails, heads]).tolist(), (tails + 1).tolist(), (heads + 1).tolist()))
+    heapq.heapify(queue)
+    # Each route is stored as a list of customers. routeOf[i] is the index of the route of customer i
+    routes = {i: [i] for i in range(1, numOfCustomers + 1)}
+    routeOf = list(range(numOfCustomers + 1))
+    load = {i: demands[i] for i in range(1, numOfCustomers + 1)}
+    while queue and len(routes) > numOfVehicles:
+        _, i, j = heapq.heappop(queue)
+        first, second = routeOf[i], routeOf[j]
+        if first == second or load[first] + load[second] > capacity:
+            continue
+        firstRoute, secondRoute = routes[first], routes[second]
+        if isSymmetric:
+            # Turn the routes, such that the first route ends at i and the second route starts at j
+            if firstRoute[-1] != i and firstRoute[0] == i:
+                firstRoute.reverse()
+            if secondRoute[0] != j and secondRoute[-1] == j:
+                secondRoute.reverse()
+        if firstRoute[-1] != i or secondRoute[0] != j:
+            continue
+        if isFeasible is not None and not isFeasible(firstRoute + secondRoute):
+            continue
+        # Join the routes under the index of the longer route, such that only the customers of the shorter route
+        # change route index
+        keep, drop = (first, second) if len(firstRoute) >= len(secondRoute) else (second, first)
+        for customer in routes[drop]:
+            routeOf[customer] = keep
+        routes[keep] = firstRoute + secondRoute
+        load[keep] = load[first] + load[second]
+        del routes[drop], load[drop]
+    return sorted(routes.values())
+
+
+# Returns the total length of the routes
+def routesLength(routes: list, dist) -> float:
+    return float(sum(dist[i][j] for route in routes for i, j in zip([0] + route, route + [0])))
+
+
+# Returns the arcs (i,j) travelled by the routes, including the arcs from and to the depot
+def routeArcs(routes: list) -> list:
+    return [arc for route in routes for arc in zip([0] + route, route + [0])]
+
+
+# Sets the values of the variables of a Pyomo CVRP or mTSP model to the routes, such that they can be used as a MIP
+# start. Sets x, and u (the demand served up to and including each customer, as in the MTZ models) and f (the demand
+# served up to and including the tail of each arc used, as in the one commodity flow models) if the model has them.
+# Returns False (and changes nothing) if the routes use an arc without a variable in the model, or the number of
+# routes differs from the number of vehicles m
+def setMipStart(model, routes: list, data: dict) -> bool:
+    demands = demandsAndCapacity(data)[0]
+    arcs = routeArcs(routes)
+    if len(routes) != data['m'] or any(arc not in model.x for arc in arcs):
+        return False
+    served = {0: 0.0}
+    for route in routes:
+        total = 0.0
+        for i in route:
+            total += demands[i]
+            served[i] = total
+    for arc in model.x:
+        model.x[arc].set_value(0)
+    for i, j in arcs:
+        model.x[i, j].set_value(1)
+    if hasattr(model, 'u'):
+        for i in model.u:
+            model.u[i].set_value(served[i])
+    if hasattr(model, 'f'):
+        isUsed = set(arcs)
+        for i, j in model.f:
+            model.f[i, j].set_value(served[i] if (i, j) in isUsed else 0)
+    return True
+
+
+# Returns the shortest routes using at most m vehicles found by the savings heuristic for the data of a CVRP or mTSP
+# with the parameters in PARAMETERS. If no routes use at most m vehicles, the routes using the fewest are returned
+def solve(data: dict) -> list:
+    demands, capacity = demandsAndCapacity(data)
+    best, bestKey = None, None
+    for shape, asymmetry, demandWeight in PARAMETERS:
+        routes = savingsRoutes(data['dist'], demands, capacity, data['m'], shape, asymmetry, demandWeight)
+        key = (max(len(routes), data['m']), routesLength(routes, data['dist']))
+        if bestKey is None or key < bestKey:
+            best, bestKey = routes, key
+    return best
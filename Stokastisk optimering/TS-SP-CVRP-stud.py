@@ -21,19 +21,12 @@
 #               node i. Otherwise f[i, j, s] = 0
 import readAndWriteJson as rwJson
 import pyomo.environ as pyomo
-import math
-
-
-def makeDistanceMatrix(data: dict) -> list:
-    numNodes = len(data['xCoordinates'])
-    dist = []
-    for i in range(numNodes):
-        dist.append([])
-        for j in range(numNodes):
-            tmpDist = (data['xCoordinates'][i] - data['xCoordinates'][j]) ** 2 + (
-                    data['yCoordinates'][i] - data['yCoordinates'][j]) ** 2
-            dist[i].append(round(math.sqrt(tmpDist), 2))  # round to two decimals
-    return dist
+import numpy as np
+import distanceMatrix as dm
+
+
+def makeDistanceMatrix(data: dict) -> np.ndarray:
+    return dm.distanceMatrixFromData(data, ['xCoordinates', 'yCoordinates'], decimals=2)  # round to two decimals
 
 
 def readData(filename: str) -> dict:
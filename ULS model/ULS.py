@@ -1,7 +1,5 @@
 import pyomo.environ as pyomo
 import readAndWriteJson as rwJson
-import matplotlib.pyplot as plt
-import numpy as np
 
 
 #-------------Uncapacitated Lot Sizing-------------------#
@@ -51,6 +49,8 @@ def solveModel(model: pyomo.ConcreteModel()):
 
 def displaySolution(model: pyomo.ConcreteModel()):
     print('Optimal cost is:', pyomo.value(model.obj))
+    import matplotlib.pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
+    import numpy as np  # Only needed for the plot
     fig = plt.figure()
     # Number of periods - used to control placement on the x-axis
     numPeriods = len(model.period_labels)
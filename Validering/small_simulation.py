@@ -3,13 +3,13 @@
 
 import numpy as np
 import math
-from matplotlib import pyplot as plt
 
 
 def makeHistogram(listOfTotalDemands: list):
     bins = np.linspace(math.ceil(min(listOfTotalDemands)),
                    math.floor(max(listOfTotalDemands)),
                    20)  # fixed number of bins
+    from matplotlib import pyplot as plt  # Imported here, such that matplotlib is only loaded when a plot is drawn
     plt.xlim([min(listOfTotalDemands) - 5, max(listOfTotalDemands) + 5])
 
     plt.hist(listOfTotalDemands, bins=bins, alpha=0.5)
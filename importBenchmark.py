@@ -0,0 +1,103 @@
+# Measures the startup cost of the model scripts, i.e. the time it takes to import each of them
+# Every script is imported in a fresh Python process started with "python -X importtime", from the folder of the script
+# (such that readAndWriteJson etc. are found as when the script is run). The script is imported under its own name, so
+# the code under "if __name__ == '__main__':" is not run and no instance is read or solved.
+# For each script the total import time is printed together with the packages taking the longest time to import.
+# Scripts which run code when imported (no __main__ guard) are skipped.
+#
+# Usage: python importBenchmark.py [folder or script ...] [--repeat N] [--top K]
+
+import argparse     # Used for reading the command line arguments
+import os           # Used for finding the model scripts
+import subprocess   # Used for importing each script in a fresh process
+import sys          # Used for starting the same Python interpreter
+
+# Helper modules copied into the folders. They are imported by the model scripts and hence included in their time
+HELPER_MODULES = {'readAndWriteJson.py', 'distanceMatrix.py', 'matrixStorage.py', 'matrixModel.py', 'candidateGraph.py',
+                  'subtours.py', 'secSeparation.py', 'tspHeuristics.py', 'heldKarp.py', 'oneTreeBound.py',
+                  'routeDecoder.py', 'savingsHeuristic.py', 'capacityCuts.py', 'preprocessing.py',
+                  'chargerPaths.py', 'routeEvaluator.py', 'evrpHeuristic.py', 'importBenchmark.py'}
+
+# Written to stderr just before the script is imported. Imports made by the interpreter itself are written before it
+START_MARKER = 'importBenchmark: start'
+
+# Imports the script given as the first argument without running it as __main__
+IMPORT_CODE = ('import importlib.util, sys\n'
+               'spec = importlib.util.spec_from_file_location("benchmarkedScript", sys.argv[1])\n'
+               'print(%r, file=sys.stderr, flush=True)\n'
+               'spec.loader.exec_module(importlib.util.module_from_spec(spec))\n' % START_MARKER)
+
+
+# Returns the model scripts found in the given folders (and subfolders) and files, sorted by name
+def findScripts(paths: list) -> list:
+    scripts = []
+    for path in paths:
+        if os.path.isfile(path):
+            scripts.append(path)
+            continue
+        for folder, subfolders, files in os.walk(path):
+            subfolders[:] = [s for s in subfolders if not s.startswith('.') and s != '__pycache__']
+            scripts += [os.path.join(folder, f) for f in files if f.endswith('.py') and f not in HELPER_MODULES]
+    return sorted(scripts)
+
+
+# Returns True if the script only runs code when started as __main__
+def hasMainGuard(script: str) -> bool:
+    with open(script, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    return "__name__ == '__main__'" in text or '__name__ == "__main__"' in text
+
+
+# Parses the output of "python -X importtime". Returns a dictionary from the name of every top-level import (i.e.
+# imports not made by another module) made after START_MARKER to its cumulative import time in microseconds
+def parseImportTimes(output: str) -> dict:
+    times = {}
+    lines = output.splitlines()
+    for line in lines[lines.index(START_MARKER) + 1:]:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        selfTime, cumulative, name = line[len('import time:'):].split('|')
+        if not name[1:].startswith(' '):
+            times[name.strip()] = times.get(name.strip(), 0) + int(cumulative)
+    return times
+
+
+# Imports the script in a fresh process. Returns the dictionary of top-level import times, or an error message
+def measureScript(script: str):
+    folder, fileName = os.path.split(os.path.abspath(script))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_CODE, fileName], cwd=folder,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        lastLine = [line for line in result.stderr.splitlines() if not line.startswith('import time:')][-1:]
+        return lastLine[0] if lastLine else 'Exit code ' + str(result.returncode)
+    return parseImportTimes(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the import time of the model scripts')
+    parser.add_argument('paths', nargs='*', default=[os.path.dirname(os.path.abspath(__file__))])
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs per script (the fastest is reported)')
+    parser.add_argument('--top', type=int, default=3, help='number of most expensive imports shown per script')
+    arguments = parser.parse_args()
+    root = os.path.commonpath([os.path.abspath(p) for p in arguments.paths])
+    if os.path.isfile(root):
+        root = os.path.dirname(root)
+    print('%-60s %10s  %s' % ('Script', 'Time (ms)', 'Most expensive imports (ms)'))
+    for script in findScripts(arguments.paths):
+        name = os.path.relpath(script, root)
+        if not hasMainGuard(script):
+            print('%-60s %10s  %s' % (name, '-', 'skipped, runs code when imported'))
+            continue
+        runs = [measureScript(script) for _ in range(max(1, arguments.repeat))]
+        if isinstance(runs[0], str):
+            print('%-60s %10s  %s' % (name, '-', 'failed: ' + runs[0]))
+            continue
+        # The fastest run is the one least disturbed by other processes
+        fastest = min(runs, key=lambda times: sum(times.values()))
+        slowest = sorted(fastest.items(), key=lambda item: -item[1])[:arguments.top]
+        print('%-60s %10.1f  %s' % (name, sum(fastest.values()) / 1000,
+                                    ', '.join('%s %.1f' % (module, time / 1000) for module, time in slowest)))
+
+
+if __name__ == '__main__':
+    main()